@@ -0,0 +1,76 @@
+"""
+Mide el costo en Python por llamada de la consulta de la pantalla principal
+(PaymentModel.get_payments_page mientras se escribe un nombre).
+Ejecutar desde la raíz del proyecto: python benchmark.py [base] [--calls N]
+
+Para cada texto compara:
+- sin caché: la sentencia se vuelve a armar en cada llamada (como antes de
+  guardarlas por forma del filtro);
+- con caché: se reutiliza la sentencia armada (lo que hace la aplicación);
+- SQLite: el mismo SQL ya compilado directo sobre sqlite3, sin SQLAlchemy.
+La diferencia con SQLite es el costo de Python de cada llamada.
+"""
+import argparse
+import datetime
+import time
+from models import payment, client
+from models.database import create_connection, initialize_db
+from models.payment import PaymentModel
+
+# Lo que se va escribiendo en el buscador
+TYPED = ["", "a", "an", "ana"]
+
+
+def per_call(fn, calls):
+    """Microsegundos por llamada (después de una llamada de calentamiento)"""
+    fn()
+    started = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo por llamada de la consulta de pagos")
+    parser.add_argument("db", nargs="?", default="data.db", help="Archivo de base de datos (por defecto data.db)")
+    parser.add_argument("--calls", type=int, default=1000, help="Llamadas por medición")
+    args = parser.parse_args()
+
+    db = create_connection(args.db)
+    initialize_db(db)
+    model = PaymentModel(db)
+    today = datetime.date.today()
+    month, year = today.month, today.year
+    limit = 500
+
+    def uncached(name):
+        payment._statements.clear()
+        client._statements.clear()
+        return model.get_payments_page(name, month, year, 1, False, None, limit)
+
+    raw = db.engine.raw_connection()
+    cursor = raw.cursor()
+    print(f"{'Texto':<8}{'Filas':>8}{'Sin caché':>14}{'Con caché':>14}{'SQLite':>12}{'Python antes':>15}{'Python ahora':>15}")
+    try:
+        for name in TYPED:
+            rows = len(model.get_payments_page(name, month, year, 1, False, None, limit))
+            before = per_call(lambda: uncached(name), args.calls)
+            after = per_call(lambda: model.get_payments_page(name, month, year, 1, False, None, limit), args.calls)
+
+            statement = PaymentModel._payments_filtered_statement(
+                model._payments_schemas(year), bool(name), True, True, 1, False, False, True, True
+            )
+            compiled = statement.compile(dialect=db.engine.dialect)
+            values = compiled.construct_params(PaymentModel._payments_filtered_params(name, month, year, None, limit))
+            sql, params = str(compiled), [values[key] for key in compiled.positiontup]
+            floor = per_call(lambda: cursor.execute(sql, params).fetchall(), args.calls)
+
+            print(f"{name or '(vacío)':<8}{rows:>8}{before:>11.0f} µs{after:>11.0f} µs{floor:>9.0f} µs"
+                  f"{before - floor:>12.0f} µs{after - floor:>12.0f} µs")
+    finally:
+        raw.close()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Herramientas de línea de comandos para Iron Manager
+Ejecutar desde la raíz del proyecto: python cli.py --help
+"""
+import argparse
+import sys
+from models.database import create_connection, initialize_db
+
+
+def print_progress(rows, rows_per_sec):
+    print(f"\r  {rows:,} filas ({rows_per_sec:,.0f} filas/s)", end="", flush=True)
+
+
+def cmd_export(db, args):
+    """Exporta pagos, estado de clientes o estadísticas mensuales"""
+    from controllers.export_controller import ExportController
+
+    controller = ExportController(db, chunk_size=args.chunk_size)
+    fmt = args.format or ('imc' if args.output.endswith('.imc') else 'csv')
+
+    if args.what == 'payments':
+        success, message, _ = controller.export_payments(
+            args.output, fmt, args.name, args.month, args.year, print_progress
+        )
+    elif args.what == 'status':
+        success, message, _ = controller.export_client_status(
+            args.output, fmt, args.name, print_progress
+        )
+    else:
+        success, message, _ = controller.export_monthly_stats(
+            args.output, fmt, str(args.year) if args.year else None, print_progress
+        )
+
+    print()
+    print(message)
+    return 0 if success else 1
+
+
+def cmd_archive(db, args):
+    """Archiva un año cerrado o lista los años archivados"""
+    from models.archive import ArchiveModel
+
+    archive_model = ArchiveModel(db)
+    if args.year is None:
+        archived = archive_model.get_archived_years()
+        if not archived:
+            print("No hay años archivados.")
+        for year, filename in sorted(archived.items()):
+            print(f"{year}: {filename}")
+        return 0
+
+    success, message = archive_model.archive_year(args.year)
+    print(message)
+    return 0 if success else 1
+
+
+def cmd_maintenance(db, args):
+    """Copia de seguridad, compactación, estadísticas y reporte de tamaño"""
+    from models import maintenance
+
+    service = maintenance.MaintenanceService(
+        db, backup_dir=args.backup_dir, pages_per_step=args.pages, pause=args.pause
+    )
+    if args.action == 'report':
+        print(maintenance.format_report(maintenance.get_report(db.db_filename)))
+        return 0
+
+    if args.action == 'backup':
+        def progress(copied, total):
+            print(f"\r  {copied:,}/{total:,} páginas", end="", flush=True)
+        success, message = service.run_backup(args.output, vacuum=args.vacuum, progress=progress)
+        print()
+    elif args.action == 'compact':
+        if args.enable_incremental:
+            maintenance.enable_incremental_vacuum(db.db_filename)
+        success, message = service.run_compact()
+    elif args.action == 'optimize':
+        success, message = service.run_optimize(full=args.full)
+    else:
+        results = service.run_due()
+        if not results:
+            print("No hay tareas pendientes.")
+        success = all(ok for _, ok, _ in results)
+        message = "\n".join(f"{task}: {msg}" for task, _, msg in results)
+
+    if message:
+        print(message)
+    return 0 if success else 1
+
+
+def cmd_sync(db, args):
+    """Replicación entre sucursales por lotes de cambios"""
+    from models.sync import ChangeLogModel, SyncEngine, sync_databases
+
+    change_log = ChangeLogModel(db)
+    if args.action == 'site':
+        if args.target:
+            success, message = change_log.set_local_site_id(args.target)
+            print(message)
+            return 0 if success else 1
+        print(change_log.local_site_id())
+        return 0
+    if args.action == 'capture':
+        print(f"{change_log.capture_existing():,} pagos existentes registrados como cambios")
+        return 0
+    if not args.target:
+        print("Falta el archivo o la base de la otra sucursal.")
+        return 1
+
+    engine = SyncEngine(db)
+    if args.action == 'export':
+        success, message = engine.export_file(args.target, args.peer)
+    elif args.action == 'import':
+        success, message = engine.import_file(args.target)
+    else:
+        other = create_connection(args.target)
+        initialize_db(other)
+        try:
+            (success, message), (other_success, other_message) = sync_databases(db, other)
+        finally:
+            other.close()
+        message = f"Esta base: {message}\n{args.target}: {other_message}"
+        success = success and other_success
+    print(message)
+    return 0 if success else 1
+
+
+def cmd_summary(db, args):
+    """Resumen: años, total recaudado por año y clientes (consultas en paralelo)"""
+    import asyncio
+    from models.async_dal import ModelExecutor, AsyncPaymentModel, AsyncClientModel
+    from models.money import format_cents
+
+    executor = ModelExecutor(db)
+    payments = AsyncPaymentModel(executor)
+    clients = AsyncClientModel(executor)
+
+    async def load():
+        return await asyncio.gather(
+            payments.get_distinct_years(),
+            payments.get_all_monthly_stats(),
+            clients.get_all_names(),
+        )
+
+    try:
+        years, stats, names = asyncio.run(load())
+    finally:
+        executor.shutdown()
+
+    totals = {}
+    for year, _, total in stats:
+        totals[year] = totals.get(year, 0) + (total or 0)
+    print(f"Clientes: {len(names):,}")
+    print(f"Años con pagos: {', '.join(str(year) for year in years) or '-'}")
+    for year in sorted(totals, reverse=True):
+        print(f"  {year}: {format_cents(totals[year])}")
+    return 0
+
+
+def cmd_gaps(db, args):
+    """Meses sin pagar por cliente (todos los huecos, no solo el último)"""
+    from models.payment import PaymentModel
+    from models.client import ClientModel
+    from models.months import current_index, from_index
+
+    def month_text(index):
+        year, month = from_index(index)
+        return f"{month:02d}/{year}"
+
+    until = current_index() if args.until_now else None
+    payment_model = PaymentModel(db)
+    if args.summary:
+        rows = payment_model.get_gap_summary(until, args.limit)
+        for _, name, gaps, missing, first, last in rows:
+            print(f"{name}: {missing} meses en {gaps} huecos ({month_text(first)} a {month_text(last)})")
+        print(f"{len(rows):,} clientes con meses sin pagar")
+        return 0
+
+    client_id = None
+    if args.name:
+        client = ClientModel(db).get_client_by_name(args.name)
+        if client is None:
+            print(f"No existe el cliente {args.name}")
+            return 1
+        client_id = client[0]
+    total = 0
+    for _, name, first, last, missing in payment_model.iter_gaps(client_id, until):
+        span = month_text(first) if first == last else f"{month_text(first)} a {month_text(last)}"
+        print(f"{name}: {span} ({missing})")
+        total += missing
+    print(f"{total:,} meses sin pagar")
+    return 0
+
+
+def cmd_reports(db, args):
+    """Vistas de reportes para el cierre de mes (ver models.reports)"""
+    from models.reports import ReportModel
+    from models.money import format_cents
+
+    model = ReportModel(db)
+    if args.action == 'refresh':
+        from models.maintenance import MaintenanceService
+        success, message = MaintenanceService(db).run_reports(full=args.full)
+        print(message)
+        return 0 if success else 1
+
+    if args.action == 'status':
+        for view in model.get_status():
+            refreshed = view['refreshed_at'].replace('T', ' ') if view['refreshed_at'] else 'nunca'
+            state = 'desactualizada' if view['stale'] else 'al día'
+            pending = '-' if view['pending'] is None else f"{view['pending']:,}"
+            print(f"{view['title']}: {state}, actualizada {refreshed}, {view['rows']:,} filas, "
+                  f"{pending} pagos nuevos, {view['dirty_periods']} meses a recalcular")
+        return 0
+
+    periods = model.get_periods()
+    if not periods:
+        print("No hay reportes. Corra 'reports refresh' primero.")
+        return 1
+    year, month = periods[0]
+    if args.year:
+        year = args.year
+    if args.month:
+        month = args.month
+    print(f"Cierre {month:02d}/{year}")
+    print("Por descripción:")
+    for description, total, payments in model.get_description_totals(year, month):
+        print(f"  {description or '(sin descripción)'}: {format_cents(total)} ({payments:,} pagos)")
+    print("Por monto:")
+    for label, total, payments in model.get_tier_totals(year, month):
+        print(f"  {label}: {format_cents(total)} ({payments:,} pagos)")
+    print("Clientes:")
+    for y, m, clients, new, returning in model.get_client_activity(year):
+        if m == month or not args.month:
+            print(f"  {m:02d}/{y}: {clients:,} ({new:,} nuevos, {returning:,} recurrentes)")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Iron Manager - herramientas de consola")
+    parser.add_argument("--db", default="data.db", help="Archivo de base de datos (por defecto data.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export = subparsers.add_parser("export", help="Exportar datos a CSV o columnar (.imc)")
+    export.add_argument("what", choices=["payments", "status", "stats"])
+    export.add_argument("output", help="Archivo de salida")
+    export.add_argument("--format", choices=["csv", "imc"], help="Por defecto se deduce de la extensión")
+    export.add_argument("--name", help="Filtrar por nombre de cliente")
+    export.add_argument("--month", type=int, help="Filtrar por mes (solo payments)")
+    export.add_argument("--year", type=int, help="Filtrar por año (payments y stats)")
+    export.add_argument("--chunk-size", type=int, default=5000, help="Filas por bloque")
+    export.set_defaults(func=cmd_export)
+
+    archive = subparsers.add_parser("archive", help="Mover un año cerrado a su propio archivo")
+    archive.add_argument("year", type=int, nargs="?", help="Año a archivar (sin año: listar archivados)")
+    archive.set_defaults(func=cmd_archive)
+
+    maint = subparsers.add_parser("maintenance", help="Copia de seguridad y mantenimiento de la base")
+    maint.add_argument("action", choices=["report", "backup", "compact", "optimize", "due"])
+    maint.add_argument("output", nargs="?", help="Carpeta destino (solo backup)")
+    maint.add_argument("--backup-dir", help="Carpeta de las copias programadas (por defecto backups/)")
+    maint.add_argument("--vacuum", action="store_true", help="backup: copia compactada con VACUUM INTO")
+    maint.add_argument("--full", action="store_true", help="optimize: ANALYZE completo")
+    maint.add_argument("--enable-incremental", action="store_true",
+                       help="compact: pasar a auto_vacuum incremental (VACUUM completo, cerrar la app)")
+    maint.add_argument("--pages", type=int, default=256, help="Páginas por paso")
+    maint.add_argument("--pause", type=float, default=0.05, help="Pausa entre pasos (segundos)")
+    maint.set_defaults(func=cmd_maintenance)
+
+    gaps = subparsers.add_parser("gaps", help="Meses sin pagar de cada cliente")
+    gaps.add_argument("--name", help="Solo este cliente")
+    gaps.add_argument("--until-now", action="store_true", help="Contar también los meses hasta el actual")
+    gaps.add_argument("--summary", action="store_true", help="Una línea por cliente, de más a menos meses")
+    gaps.add_argument("--limit", type=int, help="--summary: cantidad de clientes")
+    gaps.set_defaults(func=cmd_gaps)
+
+    reports = subparsers.add_parser("reports", help="Reportes de cierre de mes")
+    reports.add_argument("action", choices=["refresh", "status", "show"])
+    reports.add_argument("--full", action="store_true", help="refresh: armar todas las vistas de nuevo")
+    reports.add_argument("--year", type=int, help="show: año (por defecto el último con pagos)")
+    reports.add_argument("--month", type=int, help="show: mes (por defecto el último con pagos)")
+    reports.set_defaults(func=cmd_reports)
+
+    summary = subparsers.add_parser("summary", help="Resumen de clientes y recaudación por año")
+    summary.set_defaults(func=cmd_summary)
+
+    sync = subparsers.add_parser("sync", help="Replicar pagos entre sucursales")
+    sync.add_argument("action", choices=["site", "capture", "export", "import", "with"],
+                      help="site [nombre]: ver o fijar la sucursal local; capture: registrar pagos existentes; "
+                           "export/import: lote por archivo; with: sincronizar con otra base")
+    sync.add_argument("target", nargs="?", help="Nombre de sucursal, archivo de lote o base de la otra sucursal")
+    sync.add_argument("--peer", help="export: sucursal destino (manda solo lo que le falta)")
+    sync.set_defaults(func=cmd_sync)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    db = create_connection(args.db)
+    initialize_db(db)
+    try:
+        return args.func(db, args)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import time
+from models.client import ClientModel
+from models.payment import PaymentModel
+from models.export_formats import CsvWriter, ColumnarWriter
+
+# Formatos disponibles: extensión -> escritor
+FORMATS = {
+    'csv': CsvWriter,
+    'imc': ColumnarWriter,
+}
+
+PAYMENT_COLUMNS = [
+    ('PagoID', 'int'), ('Cliente', 'str'), ('Monto', 'cents'),
+    ('Fecha de Pago', 'str'), ('Descripcion', 'str'),
+]
+STATUS_COLUMNS = [('Cliente', 'str'), ('Último Mes', 'int'), ('Último Año', 'int')]
+STATS_COLUMNS = [('Año', 'int'), ('Mes', 'int'), ('Total Recaudado', 'cents')]
+
+
+class ExportController:
+    """Controlador para exportar pagos, estado de clientes y estadísticas"""
+
+    def __init__(self, db, chunk_size: int = 5000):
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def export_payments(self, path: str, fmt: str = 'csv', name: str = None, month: int = None,
+                        year: int = None, progress=None):
+        """
+        Exporta los pagos filtrados (mismos filtros que la pantalla principal).
+        Retorna (success: bool, message: str, stats: dict)
+        """
+        session = self.db.Session()
+        try:
+            rows = PaymentModel(self.db, session).iter_payments_filtered(
+                name, month, year, self.chunk_size
+            )
+            return self._export(path, fmt, PAYMENT_COLUMNS, rows, progress)
+        finally:
+            session.close()
+
+    def export_client_status(self, path: str, fmt: str = 'csv', name_filter: str = None, progress=None):
+        """
+        Exporta el estado de los clientes (último mes/año pagado).
+        Retorna (success: bool, message: str, stats: dict)
+        """
+        session = self.db.Session()
+        try:
+            rows = ClientModel(self.db, session).iter_client_status(name_filter, self.chunk_size)
+            # '-' marca "sin pagos" en la pantalla; en el archivo va vacío
+            rows = (
+                (row[0], None if row[1] == '-' else row[1], None if row[2] == '-' else row[2])
+                for row in rows
+            )
+            return self._export(path, fmt, STATUS_COLUMNS, rows, progress)
+        finally:
+            session.close()
+
+    def export_monthly_stats(self, path: str, fmt: str = 'csv', year: str = None, progress=None):
+        """
+        Exporta el total recaudado por mes de un año (o de todos si year es None).
+        Retorna (success: bool, message: str, stats: dict)
+        """
+        session = self.db.Session()
+        try:
+            payment_model = PaymentModel(self.db, session)
+            years = [year] if year else payment_model.get_years_from_dates()
+            rows = (
+                (int(y), row[0], row[1])
+                for y in years
+                for row in payment_model.get_monthly_stats(y)
+            )
+            return self._export(path, fmt, STATS_COLUMNS, rows, progress)
+        finally:
+            session.close()
+
+    def _export(self, path, fmt, columns, rows, progress):
+        """
+        Escribe las filas por bloques de chunk_size.
+        progress(rows_written, rows_per_sec) se llama por bloque; si retorna
+        False se cancela la exportación.
+        """
+        writer_class = FORMATS.get(fmt)
+        if writer_class is None:
+            return False, f"Formato desconocido: {fmt}", None
+
+        start = time.perf_counter()
+        total = 0
+        cancelled = False
+        try:
+            with writer_class(path, columns) as writer:
+                chunk = []
+                for row in rows:
+                    chunk.append(row)
+                    if len(chunk) >= self.chunk_size:
+                        writer.write_rows(chunk)
+                        total += len(chunk)
+                        chunk = []
+                        if progress and progress(total, self._rate(total, start)) is False:
+                            cancelled = True
+                            break
+                if chunk and not cancelled:
+                    writer.write_rows(chunk)
+                    total += len(chunk)
+        except Exception as e:
+            print(f"Error exporting: {e}")
+            return False, f"No se pudo exportar: {e}", None
+
+        elapsed = time.perf_counter() - start
+        stats = {'rows': total, 'seconds': elapsed, 'rows_per_sec': self._rate(total, start)}
+        if progress:
+            progress(total, stats['rows_per_sec'])
+        if cancelled:
+            return False, "Exportación cancelada", stats
+
+        return True, f"{total:,} filas exportadas ({stats['rows_per_sec']:,.0f} filas/s)", stats
+
+    @staticmethod
+    def _rate(rows, start):
+        elapsed = time.perf_counter() - start
+        return rows / elapsed if elapsed > 0 else 0.0
@@ -1,23 +1,56 @@
 from models.client import ClientModel
-from models.payment import PaymentModel
+from models.payment import PaymentModel, VersionConflict
+from models.archive import ArchiveModel
+from models.sync import ChangeLogModel
+from models.due_list import DueListModel
+from models.months import next_month
+from models.metrics import timed
+from models.events import (
+    PaymentCreated, PaymentUpdated, PaymentDeleted, ClientCreated, ClientDeleted
+)
 
 
 class PaymentController:
     """Controlador para gestionar la lógica de negocio de pagos"""
 
-    def __init__(self, db):
-        self.db = db
-        self.client_model = ClientModel(db)
-        self.payment_model = PaymentModel(db)
+    # Mensaje cuando una escritura encuentra el pago cambiado (ver VersionConflict)
+    CONFLICT_MESSAGE = (
+        "El pago fue modificado por otro usuario desde que se abrió. "
+        "Revise los datos actuales y vuelva a intentar."
+    )
 
-    def register_payment(self, name: str, amount: float, month: int, year: int, description: str = "",
+    def __init__(self, db, session=None, events=None):
+        """
+        session: por defecto la compartida (ver PaymentModel).
+        events: dónde publicar los eventos; por defecto db.events (el
+        PaymentWriter los junta y los publica recién después del commit).
+        """
+        self.db = db
+        self.events = events if events is not None else db.events
+        self.client_model = ClientModel(db, session)
+        self.payment_model = PaymentModel(db, session)
+        self.archive_model = ArchiveModel(db, session)
+        # Registro de cambios para replicar entre sucursales (ver models.sync)
+        self.change_log = ChangeLogModel(db, session)
+        self.due_list = DueListModel(db, session)
+
+    def _archived_message(self, year):
+        return f"El año {year} está archivado y no se puede modificar."
+
+    @timed('controller.register_payment')
+    def register_payment(self, name: str, amount_cents: int, month: int, year: int, description: str = "",
                          skip_validation: bool = False):
         """
-        Registra un nuevo pago.
+        Registra un nuevo pago (monto en centavos).
         Retorna (success: bool, message: str, should_confirm: bool, expected_month: int, expected_year: int)
+        Publica PaymentCreated (y ClientCreated si corresponde) en db.events.
         """
+        if self.archive_model.is_archived(year):
+            return False, self._archived_message(year), False, None, None
+
         # Buscar o crear cliente
         client_data = self.client_model.get_client_by_name(name)
+        client_created = False
         if client_data:
             client_id, last_payment_id = client_data
         else:
@@ -25,6 +58,7 @@ class PaymentController:
             if not client_id:
                 return False, "No se pudo crear el cliente", False, None, None
             last_payment_id = None
+            client_created = True
 
         # Verificar duplicado
         if self.payment_model.check_duplicate_payment(client_id, month, year):
@@ -36,13 +70,8 @@ class PaymentController:
         if last_payment_id is not None:
             last_month, last_year = self.payment_model.get_last_payment_info(last_payment_id)
             if last_month is not None and last_year is not None:
-                # Calcular mes/año esperado
-                if last_month == 12:
-                    expected_month = 1
-                    expected_year = last_year + 1
-                else:
-                    expected_month = last_month + 1
-                    expected_year = last_year
+                # Mes/año esperado: el siguiente al último pago
+                expected_year, expected_month = next_month(last_year, last_month)
 
                 # Si no coincide, pedir confirmación
                 if not skip_validation:
@@ -50,60 +79,130 @@ class PaymentController:
                         return True, "", True, expected_month, expected_year
 
         # Crear el pago
-        new_payment_id = self.payment_model.create_payment(client_id, amount, month, year, description)
+        new_payment_id = self.payment_model.create_payment(client_id, amount_cents, month, year, description)
         if not new_payment_id:
             return False, "No se pudo registrar el pago", False, None, None
 
         # Actualizar último pago del cliente (delegado al modelo)
         self.payment_model.update_client_last_payment(client_id)
 
+        if client_created:
+            self.events.publish(ClientCreated(client_id, name))
+        row = self.payment_model.get_payment_row(new_payment_id)
+        self.change_log.record_upsert(name, month, year, amount_cents, row[3], description)
+        self.due_list.refresh_client(client_id)
+        self.events.publish(PaymentCreated(
+            new_payment_id, client_id, month, year, amount_cents, row[3], tuple(row)
+        ))
         return True, "Pago registrado correctamente", False, None, None
 
-    def update_payment(self, payment_id: int, amount: float, month: int, year: int, description: str = ""):
+    @timed('controller.update_payment')
+    def update_payment(self, payment_id: int, amount_cents: int, month: int, year: int, description: str = "",
+                       expected_version: int = None):
         """
-        Actualiza un pago existente.
+        Actualiza un pago existente (monto en centavos).
+        expected_version: versión del pago que vio el usuario; si otro lo
+        modificó después, no se escribe y se retorna CONFLICT_MESSAGE.
         Retorna (success: bool, message: str)
+        Publica PaymentUpdated en db.events.
         """
         # Obtener datos del pago
         payment_data = self.payment_model.get_payment_by_id(payment_id)
         if not payment_data:
             return False, "No se pudo cargar el pago."
+        if expected_version is not None and payment_data['version'] != expected_version:
+            return False, self.CONFLICT_MESSAGE
+        period_changed = (month, year) != (payment_data['month'], payment_data['year'])
+        for checked_year in (payment_data['year'], year):
+            if self.archive_model.is_archived(checked_year):
+                return False, self._archived_message(checked_year)
 
         client_id = payment_data['client_id']
 
-        # Verificar duplicado (excluyendo este pago)
-        if self.payment_model.check_duplicate_payment(client_id, month, year, payment_id):
+        # Verificar duplicado (excluyendo este pago); solo si cambió el período
+        if period_changed and self.payment_model.check_duplicate_payment(client_id, month, year, payment_id):
             return False, "El cliente ya pagó ese mes."
 
-        # Actualizar el pago
-        if not self.payment_model.update_payment(payment_id, amount, month, year, description):
-            return False, "No se pudo actualizar el pago"
+        # Actualizar el pago, solo si sigue en la versión que se leyó arriba
+        try:
+            if not self.payment_model.update_payment(
+                    payment_id, amount_cents, month, year, description, payment_data['version']):
+                return False, "No se pudo actualizar el pago"
+        except VersionConflict:
+            return False, self.CONFLICT_MESSAGE
 
         # Actualizar último pago del cliente (delegado al modelo)
         self.payment_model.update_client_last_payment(client_id)
 
+        if period_changed:
+            self.change_log.record_delete(payment_data['name'], payment_data['month'], payment_data['year'])
+        self.change_log.record_upsert(payment_data['name'], month, year, amount_cents, payment_data['date'], description)
+        self.due_list.refresh_client(client_id)
+
+        row = self.payment_model.get_payment_row(payment_id)
+        self.events.publish(PaymentUpdated(
+            payment_id, client_id, month, year, amount_cents, payment_data['date'], tuple(row),
+            payment_data['month'], payment_data['year'], payment_data['amount_cents']
+        ))
         return True, "Pago actualizado correctamente"
 
-    def delete_payment(self, payment_id: int):
+    @timed('controller.delete_payment')
+    def delete_payment(self, payment_id: int, expected_version: int = None):
         """
         Elimina un pago y actualiza el cliente.
+        expected_version: ver update_payment.
         Retorna (success: bool, message: str)
+        Publica PaymentDeleted (y ClientDeleted si corresponde) en db.events.
         """
-        # Eliminar el pago y obtener client_id
-        client_id = self.payment_model.delete_payment(payment_id)
+        # Datos del pago para el evento
+        payment_data = self.payment_model.get_payment_by_id(payment_id)
+        if not payment_data:
+            return False, "No se encontró el pago o no se pudo borrar."
+        if expected_version is not None and payment_data['version'] != expected_version:
+            return False, self.CONFLICT_MESSAGE
+        if self.archive_model.is_archived(payment_data['year']):
+            return False, self._archived_message(payment_data['year'])
+
+        # Eliminar el pago (si sigue en la versión leída) y obtener client_id
+        try:
+            client_id = self.payment_model.delete_payment(payment_id, payment_data['version'])
+        except VersionConflict:
+            return False, self.CONFLICT_MESSAGE
         if client_id is None:
             return False, "No se encontró el pago o no se pudo borrar."
 
-        # Buscar el pago más reciente del cliente
+        self.change_log.record_delete(payment_data['name'], payment_data['month'], payment_data['year'])
+
+        deleted = PaymentDeleted(
+            payment_id, client_id, payment_data['month'], payment_data['year'],
+            payment_data['amount_cents'], payment_data['date']
+        )
+
+        # Buscar el pago más reciente del cliente (la versión se lee antes:
+        # si otro le registra un pago mientras tanto, el cliente no se borra)
+        client_version = self.client_model.get_client_version(client_id)
         last_payment_id = self.payment_model.get_latest_payment_for_client(client_id)
+        if not last_payment_id:
+            # Puede tener pagos en años archivados: el más reciente vuelve a la
+            # base principal para que last_payment_id lo pueda referenciar
+            last_payment_id = self.archive_model.restore_latest_payment(client_id)
 
         if last_payment_id:
             # Actualizar último pago del cliente (delegado al modelo)
-            if not self.payment_model.update_client_last_payment(client_id):
+            updated = self.payment_model.update_client_last_payment(client_id)
+            self.events.publish(deleted)
+            if not updated:
                 return False, "No se pudo actualizar el último pago del cliente."
         else:
             # No hay más pagos, eliminar el cliente
-            if not self.client_model.delete_client(client_id):
-                return False, "No se pudo borrar el cliente."
-
+            self.events.publish(deleted)
+            try:
+                if not self.client_model.delete_client(client_id, client_version):
+                    return False, "No se pudo borrar el cliente."
+                self.events.publish(ClientDeleted(client_id, payment_data['name']))
+            except VersionConflict:
+                # Otro le registró un pago: el cliente sigue, con ese último pago
+                self.payment_model.update_client_last_payment(client_id)
+
+        self.due_list.refresh_client(client_id)
         return True, "Pago eliminado correctamente"
\ No newline at end of file
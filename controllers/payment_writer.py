@@ -0,0 +1,235 @@
+"""
+Cola de escritura de pagos con commit agrupado.
+
+Cada alta, edición o baja hecha con PaymentController directamente termina
+en varios commits, y cada commit de SQLite espera al disco. Con varias
+ventanas (o clientes) registrando pagos en el mismo segundo, el límite es
+la cantidad de commits por segundo y no el trabajo en sí.
+
+PaymentWriter recibe los comandos en una cola y los ejecuta en un único
+hilo. Los comandos que llegan dentro de BATCH_WINDOW segundos del primero
+se ejecutan en una sola transacción (un commit para todo el grupo). Cada
+comando corre entero sobre su propio SAVEPOINT: dentro del escritor los
+session.commit() de los modelos solo hacen flush (ver _CommandSession), y
+el escritor libera el savepoint al terminar el comando o lo deshace entero
+si falla o retorna un error. Así un comando nunca queda a medias y los
+demás del grupo no se ven afectados. Cada llamador recibe su propio
+resultado.
+
+La durabilidad es la misma: el resultado se entrega recién después del
+COMMIT del grupo, y los eventos (PaymentCreated, ...) se publican también
+después, así nadie ve datos sin confirmar. Si falla el COMMIT, todos los
+comandos del grupo reciben el error.
+
+    writer = get_payment_writer(db)
+    success, message, *_ = writer.register_payment('ANA', 100000, 3, 2026)
+
+Tiene los mismos métodos que PaymentController, así las ventanas lo usan en
+su lugar (ver gui/window_pool.py).
+"""
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+
+from sqlalchemy.orm import Session
+
+from controllers.payment_controller import PaymentController
+
+# Un escritor por instancia de Database
+_writers = weakref.WeakKeyDictionary()
+
+
+class _CollectedEvents:
+    """Junta los eventos de un grupo para publicarlos después del commit"""
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, event):
+        self.events.append(event)
+
+
+class _CommandSession(Session):
+    """
+    Sesión de un comando del escritor. commit() solo hace flush (y vence los
+    objetos, como un commit): lo confirma o deshace el escritor al terminar
+    el comando. rolled_back indica que un modelo deshizo lo hecho ante un
+    error, con lo que el comando ya no está completo.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rolled_back = False
+
+    def commit(self):
+        self.flush()
+        self.expire_all()
+
+    def rollback(self):
+        self.rolled_back = True
+        super().rollback()
+
+    def release(self):
+        """Libera el SAVEPOINT del comando (el commit real es el del grupo)"""
+        super().commit()
+
+
+class PaymentWriter:
+    """Único hilo de escritura de pagos, con commit agrupado"""
+
+    # Espera por más comandos después del primero (segundos)
+    BATCH_WINDOW = 0.005
+    MAX_BATCH = 200
+
+    # Comandos aceptados (métodos de PaymentController)
+    COMMANDS = ('register_payment', 'update_payment', 'delete_payment')
+    CONFLICT_MESSAGE = PaymentController.CONFLICT_MESSAGE
+    # Cuando un paso falló y el comando se deshizo entero
+    FAILED_MESSAGE = "No se pudo completar la operación; no se guardó ningún cambio."
+
+    def __init__(self, db):
+        self.db = db
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Grupos y comandos ejecutados (para diagnóstico)
+        self.batches = 0
+        self.commands = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='payment-writer', daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=5):
+        """Termina el hilo después de ejecutar los comandos ya encolados"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def submit(self, command, *args, **kwargs):
+        """
+        Encola command (ver COMMANDS) con sus argumentos. Retorna un
+        concurrent.futures.Future con el mismo resultado que daría
+        PaymentController.
+        """
+        if command not in self.COMMANDS:
+            raise ValueError(f"Comando desconocido: {command}")
+        future = Future()
+        self.start()
+        self._queue.put((future, command, args, kwargs))
+        return future
+
+    def register_payment(self, *args, **kwargs):
+        return self.submit('register_payment', *args, **kwargs).result()
+
+    def update_payment(self, *args, **kwargs):
+        return self.submit('update_payment', *args, **kwargs).result()
+
+    def delete_payment(self, *args, **kwargs):
+        return self.submit('delete_payment', *args, **kwargs).result()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.BATCH_WINDOW
+            while len(batch) < self.MAX_BATCH:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._execute(batch)
+
+    def _failed(self, command):
+        """Resultado de un comando deshecho, con la forma del de PaymentController"""
+        if command == 'register_payment':
+            return False, self.FAILED_MESSAGE, False, None, None
+        return False, self.FAILED_MESSAGE
+
+    def _execute_command(self, connection, collected, command, args, kwargs):
+        """
+        Ejecuta un comando en su propio SAVEPOINT y lo libera o lo deshace
+        entero. Retorna (ok, resultado o excepción).
+        """
+        published = len(collected.events)
+        session = _CommandSession(bind=connection, join_transaction_mode='create_savepoint')
+        try:
+            result = getattr(PaymentController(self.db, session, collected), command)(*args, **kwargs)
+            if session.rolled_back and result[0]:
+                # Un modelo deshizo los pasos anteriores y el resto siguió
+                result = self._failed(command)
+            if result[0]:
+                session.release()
+            else:
+                session.rollback()
+                del collected.events[published:]
+            return True, result
+        except Exception as e:
+            # Solo se deshace este comando; lo anterior del grupo sigue
+            session.rollback()
+            del collected.events[published:]
+            return False, e
+        finally:
+            session.close()
+
+    def _execute(self, batch):
+        from models.archive import ArchiveModel
+
+        collected = _CollectedEvents()
+        results = []
+        outer = self.db.Session()
+        try:
+            # ATTACH no se puede dentro de una transacción: los archivos
+            # (para restaurar el último pago de un cliente) se adjuntan antes
+            archive_model = ArchiveModel(self.db, outer)
+            archived = archive_model.get_archived_years()
+            archive_model.attach(archived, archived)
+
+            connection = outer.connection()
+            # IMMEDIATE: el lock de escritura se toma al empezar y no a mitad del grupo
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            for _, command, args, kwargs in batch:
+                results.append(self._execute_command(connection, collected, command, args, kwargs))
+            outer.commit()
+        except Exception as e:
+            outer.rollback()
+            print(f"Error committing payment batch: {e}")
+            for future, *_ in batch:
+                future.set_exception(e)
+            return
+        finally:
+            outer.close()
+
+        self.batches += 1
+        self.commands += len(batch)
+        for event in collected.events:
+            self.db.events.publish(event)
+        for (future, *_), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+
+def get_payment_writer(db):
+    """Obtiene (o crea) el escritor compartido de una base"""
+    writer = _writers.get(db)
+    if writer is None:
+        writer = PaymentWriter(db)
+        _writers[db] = writer
+    return writer
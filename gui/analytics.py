@@ -0,0 +1,163 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QGridLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PySide6.QtCore import Qt, QTimer
+import math
+from models.analytics import AnalyticsModel
+from models.money import format_cents
+from models.months import from_index
+from gui.events import get_event_bridge
+from gui.async_bridge import get_async_bridge
+
+MONTH_SHORT = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+
+
+def month_label(month_index):
+    """Índice de mes (year * 12 + month - 1) -> 'Ene 2024'"""
+    year, month = from_index(month_index)
+    return f"{MONTH_SHORT[month - 1]} {year}"
+
+
+def percent(value):
+    return "-" if value is None or math.isnan(value) else f"{value * 100:.1f}%"
+
+
+class AnalyticsPanel(QWidget):
+    """
+    Indicadores de retención, abandono y crecimiento. Se calculan en segundo
+    plano, solo con el panel visible y una vez por ráfaga de cambios
+    (RELOAD_DELAY_MS); las respuestas viejas se descartan.
+    """
+
+    # Cohortes mostradas en la tabla de retención (las más recientes)
+    COHORTS_SHOWN = 12
+    RELOAD_DELAY_MS = 300
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        # La caché de arreglos se comparte entre los hilos de las consultas
+        self.analytics_model = AnalyticsModel(self.db)
+        self._dirty = True
+        # Sube con cada cálculo pedido
+        self._generation = 0
+
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(self.RELOAD_DELAY_MS)
+        self.reload_timer.timeout.connect(self.refresh)
+
+        self.setup_ui()
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        kpi_layout = QGridLayout()
+        self.kpi_labels = {}
+        kpis = [
+            ('active', "Clientes activos (último mes):"),
+            ('churn', "Abandono (último mes cerrado):"),
+            ('growth', "Crecimiento mensual:"),
+            ('avg_months', "Meses pagados por cliente (promedio):"),
+        ]
+        for row, (key, text) in enumerate(kpis):
+            kpi_layout.addWidget(QLabel(text), row, 0)
+            value = QLabel("-")
+            value.setStyleSheet("font-weight: bold; font-size: 14px;")
+            kpi_layout.addWidget(value, row, 1)
+            self.kpi_labels[key] = value
+        layout.addLayout(kpi_layout)
+
+        layout.addWidget(QLabel("Recaudación por perfil de cliente"))
+        self.profile_table = QTableWidget(0, 4)
+        self.profile_table.setHorizontalHeaderLabels(["Perfil", "Clientes", "Recaudado", "Promedio por cliente"])
+        self.profile_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.profile_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.profile_table)
+
+        layout.addWidget(QLabel("Retención por cohorte (meses desde el primer pago)"))
+        self.retention_table = QTableWidget(0, AnalyticsModel.RETENTION_MONTHS + 1)
+        self.retention_table.setHorizontalHeaderLabels(
+            ["Clientes"] + [str(i) for i in range(AnalyticsModel.RETENTION_MONTHS)]
+        )
+        self.retention_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.retention_table)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._dirty:
+            self.refresh()
+
+    def on_database_event(self, event):
+        """Recalcula solo si el panel está visible; si no, al mostrarse"""
+        self.analytics_model.note_event(event)
+        self._dirty = True
+        if self.isVisible():
+            self.reload_timer.start()
+
+    def refresh(self):
+        self.reload_timer.stop()
+        self._dirty = False
+        self._generation += 1
+        generation = self._generation
+        model = self.analytics_model
+
+        def apply(results):
+            # Si mientras tanto se pidió otro cálculo, se espera ese
+            if generation == self._generation:
+                self.set_report(results['report'])
+
+        bridge = get_async_bridge(self.db)
+        bridge.gather(
+            {'report': lambda session: model.get_report(session)},
+            apply,
+            context=self,
+        )
+
+    def set_report(self, report):
+        if len(report.months) == 0:
+            for label in self.kpi_labels.values():
+                label.setText("-")
+            self.profile_table.setRowCount(0)
+            self.retention_table.setRowCount(0)
+            return
+
+        self.kpi_labels['active'].setText(
+            f"{int(report.active_clients[-1])} ({month_label(report.months[-1])})"
+        )
+        # El último mes todavía está en curso: se muestra el anterior
+        closed = -2 if len(report.months) > 1 else -1
+        self.kpi_labels['churn'].setText(
+            f"{percent(report.churn_rate[closed])} ({month_label(report.months[closed])})"
+        )
+        self.kpi_labels['growth'].setText(
+            f"{percent(report.growth[closed])} ({month_label(report.months[closed])})"
+        )
+        self.kpi_labels['avg_months'].setText(f"{report.avg_months_per_client:.1f}")
+
+        self.profile_table.setRowCount(len(report.profile_names))
+        for row, name in enumerate(report.profile_names):
+            clients = int(report.profile_clients[row])
+            revenue = int(report.profile_revenue[row])
+            average = revenue // clients if clients else 0
+            values = [name, str(clients), format_cents(revenue), format_cents(average)]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.profile_table.setItem(row, col, item)
+
+        cohorts = report.cohorts[-self.COHORTS_SHOWN:]
+        sizes = report.cohort_sizes[-self.COHORTS_SHOWN:]
+        retention = report.retention[-self.COHORTS_SHOWN:]
+        self.retention_table.setRowCount(len(cohorts))
+        self.retention_table.setVerticalHeaderLabels([month_label(c) for c in cohorts])
+        last_month = report.months[-1]
+        for row, cohort in enumerate(cohorts):
+            self.retention_table.setItem(row, 0, QTableWidgetItem(str(int(sizes[row]))))
+            for age in range(AnalyticsModel.RETENTION_MONTHS):
+                # Meses que todavía no ocurrieron quedan vacíos
+                text = percent(retention[row, age]) if cohort + age <= last_month else ""
+                self.retention_table.setItem(row, age + 1, QTableWidgetItem(text))
+        self.retention_table.resizeColumnsToContents()
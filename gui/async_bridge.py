@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import weakref
+from PySide6.QtCore import QObject, Signal
+from shiboken6 import isValid
+from models.async_dal import ModelExecutor, AsyncPaymentModel, AsyncClientModel
+
+# Un puente por instancia de Database
+_bridges = weakref.WeakKeyDictionary()
+
+
+class AsyncBridge(QObject):
+    """
+    Une asyncio con Qt. Las corrutinas corren en un loop de asyncio en un
+    hilo propio (las consultas en sí van al pool de ModelExecutor) y el
+    resultado vuelve al hilo de la GUI por una señal, así la ventana sigue
+    pintando mientras espera.
+
+        async def load():
+            return await asyncio.gather(bridge.payments.get_distinct_years(),
+                                        bridge.clients.get_all_names())
+        bridge.run(load(), self.on_loaded, context=self)
+    """
+    resolved = Signal(object)
+
+    def __init__(self, db):
+        super().__init__()
+        self.executor = ModelExecutor(db)
+        self.payments = AsyncPaymentModel(self.executor)
+        self.clients = AsyncClientModel(self.executor)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name='asyncio', daemon=True)
+        self._thread.start()
+        self.resolved.connect(self._deliver)
+
+    def run(self, coroutine, callback, error_callback=None, context=None):
+        """
+        Corre la corrutina y llama callback(resultado) en el hilo de la GUI.
+        Si context (un QObject) ya no existe cuando termina, no se llama.
+        Retorna el concurrent.futures.Future.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+        self.when_done(future, callback, error_callback, context)
+        return future
+
+    def gather(self, jobs, callback, error_callback=None, context=None):
+        """
+        Lanza las lecturas de {clave: job} en paralelo (ver ModelExecutor.gather)
+        y llama callback({clave: resultado}) en el hilo de la GUI.
+        """
+        future = self.executor.gather(jobs)
+        self.when_done(future, callback, error_callback, context)
+        return future
+
+    def when_done(self, future, callback, error_callback=None, context=None):
+        """Igual que run() pero para un Future ya lanzado (por ejemplo model.future(...))"""
+        context_ref = weakref.ref(context) if context is not None else None
+        future.add_done_callback(
+            lambda done: self.resolved.emit((done, callback, error_callback, context_ref))
+        )
+
+    def _deliver(self, item):
+        future, callback, error_callback, context_ref = item
+        if future.cancelled():
+            return
+        if context_ref is not None:
+            context = context_ref()
+            if context is None or not isValid(context):
+                return
+        error = future.exception()
+        if error is not None:
+            if error_callback:
+                error_callback(error)
+            else:
+                print(f"Error in async query: {error}")
+            return
+        callback(future.result())
+
+    def shutdown(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self.executor.shutdown()
+
+
+def get_async_bridge(db):
+    """Obtiene (o crea) el puente asíncrono compartido para una base"""
+    bridge = _bridges.get(db)
+    if bridge is None:
+        bridge = AsyncBridge(db)
+        _bridges[db] = bridge
+    return bridge
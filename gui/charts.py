@@ -0,0 +1,173 @@
+from PySide6.QtWidgets import QWidget
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QPainter, QPen, QColor, QPolygonF, QFontMetrics
+
+MONTH_SHORT = ["Ene", "Feb", "Mar", "Abr", "May", "Jun", "Jul", "Ago", "Sep", "Oct", "Nov", "Dic"]
+
+# Colores para cada año comparado (del más reciente al más antiguo)
+SERIES_COLORS = ["#2E7D32", "#1565C0", "#EF6C00", "#6A1B9A", "#00838F", "#AD1457"]
+
+
+def downsample_lttb(points, threshold):
+    """
+    Reduce una serie [(x, y), ...] a threshold puntos con Largest-Triangle-
+    Three-Buckets: conserva la forma (picos y valles) a diferencia de tomar
+    uno de cada N puntos.
+    """
+    count = len(points)
+    if threshold >= count or threshold < 3:
+        return list(points)
+
+    sampled = [points[0]]
+    bucket_size = (count - 2) / (threshold - 2)
+    a = 0
+
+    for i in range(threshold - 2):
+        # Promedio del bucket siguiente
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        next_bucket = points[next_start:next_end] or [points[-1]]
+        avg_x = sum(p[0] for p in next_bucket) / len(next_bucket)
+        avg_y = sum(p[1] for p in next_bucket) / len(next_bucket)
+
+        # Punto del bucket actual que forma el triángulo de mayor área
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = points[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            x, y = points[j]
+            area = abs((ax - avg_x) * (y - ay) - (ax - x) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+
+        sampled.append(points[best])
+        a = best
+
+    sampled.append(points[-1])
+    return sampled
+
+
+class _LineChart(QWidget):
+    """Base para gráficos de líneas dibujados con QPainter"""
+
+    MARGIN_LEFT = 90
+    MARGIN_RIGHT = 20
+    MARGIN_TOP = 30
+    MARGIN_BOTTOM = 40
+
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.setMinimumHeight(220)
+
+    def plot_rect(self):
+        return QRectF(
+            self.MARGIN_LEFT, self.MARGIN_TOP,
+            max(1, self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT),
+            max(1, self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM)
+        )
+
+    def draw_frame(self, painter, rect, max_value):
+        painter.fillRect(self.rect(), QColor("#ffffff"))
+        painter.setPen(QColor("#000000"))
+        painter.drawText(QRectF(0, 4, self.width(), self.MARGIN_TOP - 8), Qt.AlignCenter, self.title)
+
+        # Líneas horizontales de referencia con su valor
+        grid_pen = QPen(QColor("#dddddd"))
+        metrics = QFontMetrics(painter.font())
+        for step in range(5):
+            value = max_value * step / 4
+            y = rect.bottom() - rect.height() * step / 4
+            painter.setPen(grid_pen)
+            painter.drawLine(QPointF(rect.left(), y), QPointF(rect.right(), y))
+            painter.setPen(QColor("#555555"))
+            label = f"${value:,.0f}"
+            painter.drawText(
+                QPointF(rect.left() - metrics.horizontalAdvance(label) - 6, y + metrics.ascent() / 2),
+                label
+            )
+
+    def draw_series(self, painter, rect, points, x_max, max_value, color):
+        """points: [(x, y)] con x en [0, x_max]"""
+        if not points:
+            return
+        polygon = QPolygonF()
+        for x, y in points:
+            px = rect.left() + (rect.width() * x / x_max if x_max else 0)
+            py = rect.bottom() - (rect.height() * y / max_value if max_value else 0)
+            polygon.append(QPointF(px, py))
+        painter.setPen(QPen(QColor(color), 2))
+        painter.drawPolyline(polygon)
+
+
+class YearComparisonChart(_LineChart):
+    """Una línea por año con el total de cada mes, para comparar años entre sí"""
+
+    def __init__(self, parent=None):
+        super().__init__("Comparación interanual", parent)
+        self.series = {}  # año -> [total de Enero, Febrero, ...]
+
+    def set_series(self, series):
+        self.series = series
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.plot_rect()
+        max_value = max((max(values, default=0) for values in self.series.values()), default=0) or 1
+        self.draw_frame(painter, rect, max_value)
+
+        painter.setPen(QColor("#555555"))
+        for month in range(12):
+            x = rect.left() + rect.width() * month / 11
+            painter.drawText(QRectF(x - 20, rect.bottom() + 4, 40, 16), Qt.AlignCenter, MONTH_SHORT[month])
+
+        years = sorted(self.series, reverse=True)
+        for i, year in enumerate(years):
+            color = SERIES_COLORS[i % len(SERIES_COLORS)]
+            points = list(enumerate(self.series[year]))
+            self.draw_series(painter, rect, points, 11, max_value, color)
+            # Leyenda
+            painter.setPen(QColor(color))
+            painter.drawText(QPointF(rect.left() + 8 + i * 60, rect.bottom() + 32), str(year))
+        painter.end()
+
+
+class HistoryChart(_LineChart):
+    """Recaudación mensual de toda la historia, reducida al ancho disponible"""
+
+    def __init__(self, parent=None):
+        super().__init__("Historia mensual", parent)
+        self.points = []  # [(índice de mes, total)]
+
+    def set_points(self, points):
+        self.points = points
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        rect = self.plot_rect()
+        max_value = max((y for _, y in self.points), default=0) or 1
+        self.draw_frame(painter, rect, max_value)
+
+        if self.points:
+            first = self.points[0][0]
+            x_max = self.points[-1][0] - first
+            # Un punto cada ~3 píxeles alcanza para la forma de la curva
+            sampled = downsample_lttb(self.points, max(3, int(rect.width() / 3)))
+            self.draw_series(
+                painter, rect, [(x - first, y) for x, y in sampled], x_max, max_value, SERIES_COLORS[0]
+            )
+
+            painter.setPen(QColor("#555555"))
+            for x in (self.points[0][0], self.points[-1][0]):
+                year, month = divmod(x, 12)
+                label = f"{MONTH_SHORT[month]} {year}"
+                px = rect.left() + (rect.width() * (x - first) / x_max if x_max else 0)
+                # Mantener la etiqueta dentro del widget
+                left = min(max(0, px - 40), self.width() - 80)
+                painter.drawText(QRectF(left, rect.bottom() + 4, 80, 16), Qt.AlignCenter, label)
+        painter.end()
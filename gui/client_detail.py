@@ -0,0 +1,164 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableView, QHeaderView, QPushButton
+)
+from PySide6.QtCore import Qt
+from models.payment import PaymentModel
+from models.money import format_cents
+from models.months import from_index
+from models.resultset import INT, DATE, VALUE
+from gui.paging import KeysetTableModel
+from gui.status_clients import StatusColorModel
+from gui.events import get_event_bridge
+from gui.async_bridge import get_async_bridge
+from models.events import (
+    PaymentCreated, PaymentUpdated, PaymentDeleted, ClientDeleted, ExternalChange
+)
+
+
+def period_text(index):
+    year, month = from_index(index)
+    return f"{StatusColorModel.MONTHS_ES[month]} {year}"
+
+
+class HistoryTableModel(KeysetTableModel):
+    """
+    Pagos de un cliente, del más reciente al más antiguo, por páginas
+    (ver PaymentModel.get_client_history). El orden es fijo.
+    """
+
+    # Mismas columnas que get_client_history
+    COLUMNS = [
+        ('PagoID', INT), ('Período', INT), ('Monto', INT),
+        ('Fecha de Pago', DATE), ('Descripcion', VALUE), ('Versión', INT),
+    ]
+    # PagoID y Versión no se muestran
+    HIDDEN_COLUMNS = (0, 5)
+
+    def __init__(self, fetch_page, first_page=None):
+        super().__init__(self.COLUMNS, fetch_page, PaymentModel.history_sort_key, 1, True, first_page)
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        return
+
+    def build_cache(self, row):
+        payment_id, period, amount_cents, date, description, version = row
+        return (
+            str(payment_id), period_text(period), format_cents(amount_cents),
+            date or "", description or "", str(version)
+        )
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.cached_row(index.row())[index.column()]
+        if role == Qt.TextAlignmentRole and index.column() == 2:
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+
+class ClientDetailWindow(QWidget):
+    """
+    Ficha de un cliente: resumen (total pagado, meses pagos, racha) e
+    historial completo, incluidos los años archivados. El resumen llega con
+    la primera página en la misma consulta, así un socio de diez años abre
+    igual de rápido que uno nuevo.
+    """
+
+    def __init__(self, db, client_id: int, name: str):
+        super().__init__()
+        self.setWindowTitle(f"Cliente: {name}")
+        self.resize(700, 600)
+        self.db = db
+        self.client_id = client_id
+        self.name = name
+        self.last_month = None
+        self.payment_window = None
+
+        self.payment_model = PaymentModel(self.db)
+
+        self.setup_ui()
+        self.load_history()
+
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        header_layout = QHBoxLayout()
+        name_label = QLabel(self.name)
+        name_label.setStyleSheet("font-weight: bold; font-size: 16px;")
+        header_layout.addWidget(name_label)
+        header_layout.addStretch()
+        self.register_btn = QPushButton("Registrar Pago")
+        self.register_btn.setStyleSheet("background-color: #4CAF50; color: white;")
+        self.register_btn.clicked.connect(self.register_payment)
+        header_layout.addWidget(self.register_btn)
+        layout.addLayout(header_layout)
+
+        self.stats_label = QLabel("Cargando historial...")
+        self.stats_label.setWordWrap(True)
+        layout.addWidget(self.stats_label)
+
+        self.table = QTableView()
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.table)
+
+    def on_database_event(self, event):
+        if isinstance(event, ClientDeleted) and event.client_id == self.client_id:
+            self.close()
+        elif isinstance(event, ExternalChange) or (
+            isinstance(event, (PaymentCreated, PaymentUpdated, PaymentDeleted))
+            and event.client_id == self.client_id
+        ):
+            self.load_history()
+
+    def load_history(self):
+        """Primera página y resumen en segundo plano"""
+        bridge = get_async_bridge(self.db)
+        bridge.gather(
+            {'history': bridge.payments.job(
+                'get_client_history', self.client_id, None, HistoryTableModel.PAGE_SIZE
+            )},
+            lambda results: self.set_history(*results['history']),
+            context=self,
+        )
+
+    def set_history(self, rows, stats):
+        # Las páginas siguientes se piden al hacer scroll
+        def fetch_page(sort_column, descending, after, limit):
+            return self.payment_model.get_client_history(self.client_id, after, limit)[0]
+
+        model = HistoryTableModel(fetch_page, rows)
+        self.table.setModel(model)
+        for column in HistoryTableModel.HIDDEN_COLUMNS:
+            self.table.hideColumn(column)
+
+        self.last_month = stats['last_month']
+        if not stats['months']:
+            self.stats_label.setText("No hay pagos registrados.")
+            return
+        streak = stats['streak']
+        self.stats_label.setText(
+            f"Total pagado: {format_cents(stats['total_cents'])}   |   "
+            f"Meses pagos: {stats['months']}   |   "
+            f"Racha: {streak} {'mes' if streak == 1 else 'meses'} seguidos\n"
+            f"Primer pago: {period_text(stats['first_month'])}   |   "
+            f"Último pago: {period_text(stats['last_month'])}"
+        )
+
+    def register_payment(self):
+        """Alta de pago para este cliente, por el mes siguiente al último pago"""
+        from gui.payment import PaymentWindow
+        from gui.window_pool import get_window_pool
+
+        year = month = None
+        if self.last_month is not None:
+            year, month = from_index(self.last_month + 1)
+        self.payment_window = get_window_pool(self.db, PaymentWindow).acquire()
+        self.payment_window.reset(self.name, year, month)
+        self.payment_window.show()
+        self.payment_window.raise_()
+        self.payment_window.activateWindow()
@@ -0,0 +1,222 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableView, QHeaderView, QCheckBox
+)
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from models.months import current_index, from_index, month_index
+from gui.status_clients import StatusColorModel
+from gui.events import get_event_bridge
+from gui.async_bridge import get_async_bridge
+from models.events import PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange
+
+
+def month_text(index):
+    year, month = from_index(index)
+    return f"{StatusColorModel.MONTHS_ES[month]} {year}"
+
+
+def ranges_text(months):
+    """[(año, mes), ...] consecutivos agrupados: 'Marzo 2025 a Mayo 2025, Agosto 2025'"""
+    indexes = [month_index(year, month) for year, month in months]
+    parts = []
+    start = previous = None
+    for index in indexes + [None]:
+        if previous is not None and index == previous + 1:
+            previous = index
+            continue
+        if start is not None:
+            parts.append(month_text(start) if start == previous else f"{month_text(start)} a {month_text(previous)}")
+        start = previous = index
+    return ", ".join(parts)
+
+
+class GapTableModel(QAbstractTableModel):
+    """Clientes con meses sin pagar (ver PaymentModel.get_gap_summary)"""
+
+    HEADERS = ["Cliente", "Meses sin pagar", "Huecos", "Desde", "Hasta"]
+
+    def __init__(self, rows):
+        super().__init__()
+        self._rows = rows
+        # (client_id, nombre, huecos, meses, primer mes, último mes) -> textos
+        self._display = [
+            (name, str(missing), str(gaps), month_text(first), month_text(last))
+            for _, name, gaps, missing, first, last in rows
+        ]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._display[index.row()][index.column()]
+        if role == Qt.TextAlignmentRole and index.column() in (1, 2):
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def row_at(self, row):
+        return self._rows[row]
+
+    def rows(self):
+        return self._rows
+
+
+class CollectionsViewer(QWidget):
+    """
+    Cobranzas: todos los meses sin pagar de cada cliente (no solo el
+    siguiente al último pago). La consulta corre en segundo plano.
+
+    Un pago solo cambia los huecos de su cliente: se vuelve a calcular esa
+    fila. Los cambios de afuera recargan todo, una vez por ráfaga
+    (RELOAD_DELAY_MS). Las respuestas que llegan después de pedir otra más
+    nueva se descartan.
+    """
+
+    RELOAD_DELAY_MS = 300
+
+    def __init__(self, db):
+        super().__init__()
+        self.setWindowTitle("Cobranzas")
+        self.resize(800, 600)
+        self.db = db
+        self.payment_window = None
+        # Sube con cada recarga completa; los pedidos de un cliente se numeran
+        self._generation = 0
+        self._requests = 0
+        self._client_requests = {}
+        self._loading = False
+
+        self.reload_timer = QTimer(self)
+        self.reload_timer.setSingleShot(True)
+        self.reload_timer.setInterval(self.RELOAD_DELAY_MS)
+        self.reload_timer.timeout.connect(self.update_table)
+
+        self.setup_ui()
+        self.update_table()
+
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel("Buscando meses sin pagar...")
+        self.summary_label.setStyleSheet("font-weight: bold; font-size: 14px;")
+        self.include_current = QCheckBox("Contar hasta el mes actual")
+        self.include_current.setChecked(True)
+        self.include_current.toggled.connect(self.update_table)
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(self.summary_label)
+        header_layout.addStretch()
+        header_layout.addWidget(self.include_current)
+        layout.addLayout(header_layout)
+
+        self.table = QTableView()
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setSelectionMode(QTableView.SingleSelection)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.doubleClicked.connect(self.register_payment)
+        layout.addWidget(self.table)
+
+        self.detail_label = QLabel("Seleccione un cliente para ver sus meses sin pagar. "
+                                   "Doble clic para registrar el primero.")
+        self.detail_label.setWordWrap(True)
+        layout.addWidget(self.detail_label)
+
+    def until(self):
+        return current_index() if self.include_current.isChecked() else None
+
+    def on_database_event(self, event):
+        if isinstance(event, (PaymentCreated, PaymentUpdated, PaymentDeleted)):
+            if self._loading or self.reload_timer.isActive():
+                # La recarga en curso puede no tener este pago: se pide otra
+                self.schedule_reload()
+            else:
+                self.update_client(event.client_id)
+        elif isinstance(event, ExternalChange):
+            self.schedule_reload()
+
+    def schedule_reload(self):
+        # Lo que está en curso ya quedó viejo
+        self._generation += 1
+        self.reload_timer.start()
+
+    def update_table(self):
+        self.reload_timer.stop()
+        self._generation += 1
+        generation = self._generation
+        self._loading = True
+
+        def apply(results):
+            if generation != self._generation:
+                return
+            self._loading = False
+            self._client_requests.clear()
+            self.set_rows(results['gaps'])
+
+        bridge = get_async_bridge(self.db)
+        bridge.gather(
+            {'gaps': bridge.payments.job('get_gap_summary', self.until())},
+            apply,
+            context=self,
+        )
+
+    def update_client(self, client_id):
+        """Vuelve a calcular solo la fila de client_id"""
+        self._requests += 1
+        request = self._client_requests[client_id] = self._requests
+        generation = self._generation
+
+        def apply(results):
+            # Si mientras tanto hubo una recarga u otro pedido para el cliente
+            if generation != self._generation or request != self._client_requests.get(client_id):
+                return
+            rows = [row for row in self.table.model().rows() if row[0] != client_id] + results['gaps']
+            # El mismo orden que get_gap_summary
+            rows.sort(key=lambda row: (-row[3], row[1]))
+            self.set_rows(rows)
+
+        bridge = get_async_bridge(self.db)
+        bridge.gather(
+            {'gaps': bridge.payments.job('get_gap_summary', self.until(), None, client_id)},
+            apply,
+            context=self,
+        )
+
+    def set_rows(self, rows):
+        self.table.setModel(GapTableModel(rows))
+        self.table.selectionModel().currentRowChanged.connect(self.show_detail)
+        missing = sum(row[3] for row in rows)
+        self.summary_label.setText(f"{len(rows)} clientes con {missing} meses sin pagar")
+
+    def show_detail(self, current, previous=None):
+        if not current.isValid():
+            return
+        client_id, name = self.table.model().row_at(current.row())[:2]
+        bridge = get_async_bridge(self.db)
+        bridge.gather(
+            {'months': bridge.clients.job('get_missing_months', client_id, self.until())},
+            lambda results: self.detail_label.setText(f"{name}: {ranges_text(results['months'])}"),
+            context=self,
+        )
+
+    def register_payment(self, index):
+        """Abre la ventana de pago con el cliente y su primer mes sin pagar"""
+        from gui.payment import PaymentWindow
+        from gui.window_pool import get_window_pool
+
+        _, name, _, _, first_missing, _ = self.table.model().row_at(index.row())
+        year, month = from_index(first_missing)
+        self.payment_window = get_window_pool(self.db, PaymentWindow).acquire()
+        self.payment_window.reset(name, year, month)
+        self.payment_window.show()
+        self.payment_window.raise_()
+        self.payment_window.activateWindow()
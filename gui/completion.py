@@ -0,0 +1,54 @@
+from PySide6.QtWidgets import QCompleter
+from PySide6.QtCore import Qt, QAbstractListModel, QModelIndex
+from models.name_index import get_name_index
+
+
+class NameCompletionModel(QAbstractListModel):
+    """
+    Modelo de completado que pide al índice compartido (models.name_index)
+    los mejores K nombres para el texto escrito, en lugar de filtrar una
+    lista completa en cada tecla.
+    """
+
+    def __init__(self, db, limit=10, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.limit = limit
+        self._names = []
+
+    def set_query(self, text):
+        self.beginResetModel()
+        self._names = get_name_index(self.db).search(text, self.limit) if text else []
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if index.isValid() and role in (Qt.DisplayRole, Qt.EditRole):
+            return self._names[index.row()]
+        return None
+
+
+def attach_name_completer(line_edit, db, limit=10, parent=None):
+    """
+    Agrega a line_edit un autocompletado de nombres de clientes sobre el
+    índice compartido. Retorna el QCompleter.
+    """
+    model = NameCompletionModel(db, limit, parent or line_edit)
+    completer = QCompleter(model, parent or line_edit)
+    # El modelo ya viene filtrado y ordenado por relevancia
+    completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+    completer.setCaseSensitivity(Qt.CaseInsensitive)
+    completer.setMaxVisibleItems(limit)
+    line_edit.setCompleter(completer)
+
+    def on_text_edited(text):
+        model.set_query(text)
+        if model.rowCount():
+            completer.complete()
+        else:
+            completer.popup().hide()
+
+    line_edit.textEdited.connect(on_text_edited)
+    return completer
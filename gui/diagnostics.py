@@ -0,0 +1,151 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QGridLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PySide6.QtCore import Qt, QTimer
+from shiboken6 import isValid
+from models.metrics import get_metrics
+from gui.paging import open_models
+
+
+def size_text(size):
+    if size is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+def ratio_text(hits, total):
+    return "-" if not total else f"{hits / total * 100:.1f}% ({total:,} consultas)"
+
+
+def ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}"
+
+
+class DiagnosticsWindow(QWidget):
+    """
+    Diagnóstico en vivo: tiempos de las consultas (p50 / p95), commits por
+    segundo, tamaño de la base y del WAL, cachés, memoria y filas cargadas
+    en las tablas abiertas. Lee el registro de models.metrics una vez por
+    segundo y solo mientras la ventana está visible.
+    """
+
+    INTERVAL_MS = 1000
+
+    def __init__(self, db):
+        super().__init__()
+        self.setWindowTitle("Diagnóstico")
+        self.resize(700, 600)
+        self.db = db
+        self.metrics = get_metrics(self.db)
+        # (commits, instante) de la lectura anterior, para commits por segundo
+        self._previous = None
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(self.INTERVAL_MS)
+        self.timer.timeout.connect(self.update_view)
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        grid = QGridLayout()
+        self.labels = {}
+        rows = [
+            ('database', "Base de datos:"),
+            ('wal', "WAL:"),
+            ('commits', "Commits por segundo:"),
+            ('writer', "Escritor de pagos:"),
+            ('memory', "Memoria del proceso:"),
+            ('rows_cache', "Caché de filas (tablas):"),
+            ('amounts_cache', "Caché de montos:"),
+            ('names_cache', "Índice de nombres (con resultados):"),
+            ('models', "Filas en tablas abiertas:"),
+        ]
+        for row, (key, text) in enumerate(rows):
+            grid.addWidget(QLabel(text), row, 0)
+            value = QLabel("-")
+            value.setStyleSheet("font-weight: bold;")
+            value.setWordWrap(True)
+            grid.addWidget(value, row, 1)
+            self.labels[key] = value
+        layout.addLayout(grid)
+
+        layout.addWidget(QLabel("Consultas (últimas ejecuciones de cada una)"))
+        self.timings_table = QTableWidget(0, 5)
+        self.timings_table.setHorizontalHeaderLabels(["Consulta", "Llamadas", "p50 (ms)", "p95 (ms)", "Máx (ms)"])
+        self.timings_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.timings_table.horizontalHeader().setStretchLastSection(True)
+        self.timings_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        layout.addWidget(self.timings_table)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self._previous = None
+        self.update_view()
+        self.timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.timer.stop()
+
+    def update_view(self):
+        snapshot = self.metrics.snapshot()
+        labels = self.labels
+
+        labels['database'].setText(size_text(snapshot['storage']['database']))
+        labels['wal'].setText(size_text(snapshot['storage']['wal']))
+
+        commits = snapshot['counters'].get('commits', 0)
+        uptime = snapshot['uptime']
+        if self._previous is None:
+            labels['commits'].setText(f"- ({commits:,} en total)")
+        else:
+            previous_commits, previous_uptime = self._previous
+            rate = (commits - previous_commits) / max(uptime - previous_uptime, 1e-6)
+            labels['commits'].setText(f"{rate:.1f} ({commits:,} en total)")
+        self._previous = (commits, uptime)
+
+        from controllers.payment_writer import _writers
+        writer = _writers.get(self.db)
+        if writer is None or not writer.batches:
+            labels['writer'].setText("sin escrituras")
+        else:
+            labels['writer'].setText(
+                f"{writer.commands:,} operaciones en {writer.batches:,} commits "
+                f"({writer.commands / writer.batches:.1f} por commit)"
+            )
+
+        memory = snapshot['memory']
+        labels['memory'].setText(f"{size_text(memory['resident'])} ({memory['blocks']:,} bloques de Python)")
+
+        models = [model for model in open_models() if isValid(model)]
+        lookups = sum(model.cache_lookups for model in models)
+        builds = sum(model.cache_builds for model in models)
+        labels['rows_cache'].setText(ratio_text(lookups - builds, lookups))
+        labels['amounts_cache'].setText(ratio_text(*snapshot['caches']['amounts']))
+        names = snapshot['caches'].get('names')
+        labels['names_cache'].setText(ratio_text(*names) if names else "sin cargar")
+
+        rows_by_model = {}
+        for model in models:
+            name = type(model).__name__
+            rows_by_model[name] = rows_by_model.get(name, 0) + model.rowCount()
+        total = sum(rows_by_model.values())
+        detail = ", ".join(f"{name}: {rows:,}" for name, rows in sorted(rows_by_model.items()))
+        labels['models'].setText(f"{total:,} ({detail})" if detail else "0")
+
+        # Las más lentas primero
+        timings = sorted(snapshot['timings'].items(), key=lambda item: item[1][2], reverse=True)
+        self.timings_table.setRowCount(len(timings))
+        for row, (name, (calls, p50, p95, slowest)) in enumerate(timings):
+            values = [name, f"{calls:,}", ms(p50), ms(p95), ms(slowest)]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.timings_table.setItem(row, col, item)
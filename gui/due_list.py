@@ -0,0 +1,111 @@
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QTableView, QHeaderView
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+from models.due_list import DueListModel
+from gui.status_clients import StatusColorModel
+from gui.events import get_event_bridge
+from models.events import PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange
+
+
+class DueTableModel(QAbstractTableModel):
+    """Clientes que deben, del más atrasado al menos (ver models.due_list)"""
+
+    HEADERS = ["Cliente", "Debe desde", "Meses adeudados"]
+
+    def __init__(self, rows):
+        super().__init__()
+        self._rows = rows
+        # (client_id, nombre, mes, año, meses) -> textos de cada columna
+        self._display = [
+            (name, f"{StatusColorModel.MONTHS_ES[month]} {year}", str(owed))
+            for _, name, month, year, owed in rows
+        ]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self._display[index.row()][index.column()]
+        if role == Qt.BackgroundRole:
+            owed = self._rows[index.row()][4]
+            return StatusColorModel.COLOR_WARN if owed <= 1 else StatusColorModel.COLOR_LATE
+        if role == Qt.TextAlignmentRole and index.column() == 2:
+            return Qt.AlignRight | Qt.AlignVCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def name_at(self, row):
+        return self._rows[row][1]
+
+
+class DueListViewer(QWidget):
+    """Lista de trabajo de la recepción: quién debe el mes actual o más"""
+
+    # Revisa cada tanto si cambió el mes (rollover de la lista)
+    ROLLOVER_CHECK_MS = 60 * 60 * 1000
+
+    def __init__(self, db):
+        super().__init__()
+        self.setWindowTitle("Pendientes de Pago")
+        self.resize(600, 600)
+        self.db = db
+
+        self.due_model = DueListModel(self.db)
+        self.payment_window = None
+
+        self.setup_ui()
+        self.update_table()
+
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.update_table)
+        self.timer.start(self.ROLLOVER_CHECK_MS)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.summary_label = QLabel()
+        self.summary_label.setStyleSheet("font-weight: bold; font-size: 14px;")
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(self.summary_label)
+        header_layout.addStretch()
+        header_layout.addWidget(QLabel("Doble clic para registrar el pago"))
+        layout.addLayout(header_layout)
+
+        self.table = QTableView()
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.table.doubleClicked.connect(self.register_payment)
+        layout.addWidget(self.table)
+
+    def on_database_event(self, event):
+        # La lista ya está actualizada en la base: leerla es recorrer un índice
+        if isinstance(event, (PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange)):
+            self.update_table()
+
+    def update_table(self):
+        rows = self.due_model.get_due_list()
+        self.table.setModel(DueTableModel(rows))
+        late = sum(1 for row in rows if row[4] > 1)
+        self.summary_label.setText(f"{len(rows)} clientes deben ({late} con más de un mes)")
+
+    def register_payment(self, index):
+        """Abre la ventana de pago con el cliente ya cargado"""
+        from gui.payment import PaymentWindow
+        from gui.window_pool import get_window_pool
+
+        name = self.table.model().name_at(index.row())
+        self.payment_window = get_window_pool(self.db, PaymentWindow).acquire()
+        self.payment_window.reset(name)
+        self.payment_window.show()
+        self.payment_window.raise_()
+        self.payment_window.activateWindow()
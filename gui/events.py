@@ -0,0 +1,36 @@
+from PySide6.QtCore import QObject, QTimer, Signal
+import weakref
+from models.events import ExternalChangeWatcher
+
+# Un puente por instancia de Database
+_bridges = weakref.WeakKeyDictionary()
+
+
+class EventBridge(QObject):
+    """
+    Reenvía los eventos de db.events como señal Qt.
+    Si el evento se publica desde otro hilo, Qt lo entrega en el hilo de la GUI.
+    """
+    event_received = Signal(object)
+
+    POLL_INTERVAL_MS = 2000
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        db.events.subscribe(self.event_received.emit)
+
+        # Detectar escrituras de otros procesos sobre el mismo archivo
+        self.watcher = ExternalChangeWatcher(db)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.watcher.poll)
+        self.timer.start(self.POLL_INTERVAL_MS)
+
+
+def get_event_bridge(db):
+    """Obtiene (o crea) el puente de eventos compartido para una base"""
+    bridge = _bridges.get(db)
+    if bridge is None:
+        bridge = EventBridge(db)
+        _bridges[db] = bridge
+    return bridge
@@ -0,0 +1,63 @@
+from PySide6.QtWidgets import QFileDialog, QProgressDialog, QMessageBox
+from PySide6.QtCore import QThread, Signal, Qt
+
+
+class ExportWorker(QThread):
+    """Ejecuta una exportación en segundo plano para no bloquear la ventana"""
+    progress = Signal(int, float)
+    finished_export = Signal(bool, str)
+
+    def __init__(self, job, parent=None):
+        super().__init__(parent)
+        self.job = job  # job(progress) -> (success, message, stats)
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def _report(self, rows, rows_per_sec):
+        self.progress.emit(rows, rows_per_sec)
+        return not self._cancelled
+
+    def run(self):
+        success, message, _ = self.job(self._report)
+        self.finished_export.emit(success, message)
+
+
+def start_export(parent, title, default_name, job):
+    """
+    Pide el archivo de destino y lanza la exportación con un diálogo de progreso.
+    job(path, fmt, progress) debe llamar a un método de ExportController.
+    """
+    path, selected_filter = QFileDialog.getSaveFileName(
+        parent, title, default_name, "CSV (*.csv);;Columnar comprimido (*.imc)"
+    )
+    if not path:
+        return None
+
+    fmt = 'imc' if path.endswith('.imc') or '*.imc' in selected_filter else 'csv'
+    if not path.endswith(f".{fmt}"):
+        path += f".{fmt}"
+
+    dialog = QProgressDialog("Exportando...", "Cancelar", 0, 0, parent)
+    dialog.setWindowTitle(title)
+    dialog.setWindowModality(Qt.WindowModal)
+
+    worker = ExportWorker(lambda progress: job(path, fmt, progress), parent)
+    worker.progress.connect(
+        lambda rows, rate: dialog.setLabelText(f"Exportando... {rows:,} filas ({rate:,.0f} filas/s)")
+    )
+    dialog.canceled.connect(worker.cancel)
+
+    def on_finished(success, message):
+        dialog.reset()
+        if success:
+            QMessageBox.information(parent, "Exportación", message)
+        else:
+            QMessageBox.warning(parent, "Exportación", message)
+        worker.deleteLater()
+
+    worker.finished_export.connect(on_finished)
+    dialog.show()
+    worker.start()
+    return worker
@@ -1,69 +1,118 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout,
     QTableView, QLabel, QLineEdit, QComboBox,
-    QPushButton, QMessageBox, QHeaderView, QCompleter, QStackedLayout, QTableWidget, QTableWidgetItem
+    QPushButton, QMessageBox, QHeaderView, QStackedLayout, QTableWidget, QTableWidgetItem,
+    QMenu
 )
-from PySide6.QtCore import Qt, QAbstractTableModel
+from PySide6.QtCore import Qt, QModelIndex
 from PySide6.QtGui import QStandardItemModel, QStandardItem
 import datetime
 from gui.payment import PaymentWindow
 from gui.statistics import StatisticsWindow
 from gui.status_clients import ClientStatusViewer
+from gui.due_list import DueListViewer
+from gui.collections import CollectionsViewer
+from gui.diagnostics import DiagnosticsWindow
 from gui.payment_edit import PaymentEditWindow
 from models.payment import PaymentModel
 from models.client import ClientModel
+from models.money import format_cents
+from models.resultset import INT, DATE, VALUE
+from gui.paging import KeysetTableModel
 from controllers.payment_controller import PaymentController
+from controllers.export_controller import ExportController
+from controllers.payment_writer import get_payment_writer
+from gui.export import start_export
+from gui.events import get_event_bridge
+from gui.async_bridge import get_async_bridge
+from gui.completion import attach_name_completer
+from gui.window_pool import get_window_pool
+from models.name_index import preload_name_index
+from models.events import (
+    PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange
+)
 
 
-class SQLAlchemyTableModel(QAbstractTableModel):
-    """Modelo personalizado para mostrar resultados de SQLAlchemy en QTableView"""
+# Columnas de la tabla de pagos (mismas que get_payments_page)
+PAYMENT_COLUMNS = [
+    ('PagoID', INT), ('Cliente', VALUE), ('Monto', INT),
+    ('Fecha de Pago', DATE), ('Descripcion', VALUE),
+    ('Mes', INT), ('Año', INT), ('Versión', INT),
+]
 
-    def __init__(self, data, headers):
-        super().__init__()
-        self._data = data
-        self._headers = headers
 
-    def rowCount(self, parent=None):
-        return len(self._data)
+class SQLAlchemyTableModel(KeysetTableModel):
+    """
+    Modelo personalizado para mostrar resultados de SQLAlchemy en QTableView.
+    Ordena y pagina en la base (ver KeysetTableModel); por defecto por cliente.
+    """
 
-    def columnCount(self, parent=None):
-        return len(self._headers) if self._data else 0
+    # Mes, Año y Versión (las últimas columnas) no se muestran: son para editar
+    VISIBLE_COLUMNS = 5
+
+    def __init__(self, fetch_page, sort_column=1, descending=False, first_page=None):
+        super().__init__(PAYMENT_COLUMNS, fetch_page, PaymentModel.sort_key, sort_column, descending, first_page)
+        self._alignments = [
+            Qt.AlignRight | Qt.AlignVCenter if col == 2 else Qt.AlignLeft | Qt.AlignVCenter
+            for col in range(self.VISIBLE_COLUMNS)
+        ]
+
+    def columnCount(self, parent=QModelIndex()):
+        return self.VISIBLE_COLUMNS
+
+    def find_payment(self, payment_id):
+        """Devuelve la fila que contiene el pago o -1"""
+        return self._data.find(0, payment_id)
+
+    def payment_id_at(self, row):
+        """Devuelve el PagoID de una fila"""
+        return self._data.value_at(row, 0)
+
+    def payment_row_at(self, row):
+        """Fila completa de un pago (ver PAYMENT_COLUMNS), para editarlo sin consultar"""
+        return self._data[row]
+
+    def insert_payment(self, row):
+        """Inserta una fila respetando el orden actual de la tabla"""
+        return self.insert_row(row)
+
+    def update_payment(self, row):
+        """Reemplaza la fila de un pago ya presente"""
+        position = self.find_payment(row[0])
+        if position < 0:
+            return False
+        self.replace_row(position, row)
+        return True
+
+    def remove_payment(self, payment_id):
+        """Quita la fila de un pago si está presente"""
+        position = self.find_payment(payment_id)
+        if position < 0:
+            return False
+        self.remove_row(position)
+        return True
+
+    def build_cache(self, row):
+        """Textos de una fila, formateados la primera vez que se piden"""
+        # Formatear la columna Monto (centavos) como moneda
+        return tuple(
+            format_cents(value) if col == 2 else str(value)
+            for col, value in enumerate(row[:self.VISIBLE_COLUMNS])
+        )
 
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
 
-        row = self._data[index.row()]
-        col = index.column()
-
         if role == Qt.DisplayRole:
-            try:
-                value = row[col]
-            except Exception:
-                value = ""
-
-            # Formatear la columna Monto como moneda
-            if col == 2:
-                try:
-                    amount = float(value) if value is not None else 0.0
-                    return f"${amount:,.2f}"
-                except Exception:
-                    return str(value)
-
-            return str(value)
+            return self.cached_row(index.row())[index.column()]
 
         # Alinear montos a la derecha
         if role == Qt.TextAlignmentRole:
-            if col == 2:
-                return Qt.AlignRight | Qt.AlignVCenter
-            return Qt.AlignLeft | Qt.AlignVCenter
+            return self._alignments[index.column()]
 
         return None
 
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self._headers[section]
-        return None
 
 
 class PagosViewer(QWidget):
@@ -77,10 +126,13 @@ class PagosViewer(QWidget):
         self.payment_model = PaymentModel(self.db)
         self.client_model = ClientModel(self.db)
         self.payment_controller = PaymentController(self.db)
+        self.export_controller = ExportController(self.db)
 
         self.setup_ui()
-        self.load_filters()
-        self.update_table()
+        self.load_initial_data()
+
+        # Cambios hechos desde cualquier ventana (o por otro proceso)
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -128,10 +180,31 @@ class PagosViewer(QWidget):
         self.status_btn.clicked.connect(self.open_status)
         filter_layout.addWidget(self.status_btn)
 
+        self.due_btn = QPushButton("Pendientes")
+        self.due_btn.clicked.connect(self.open_due_list)
+        filter_layout.addWidget(self.due_btn)
+
+        self.collections_btn = QPushButton("Cobranzas")
+        self.collections_btn.clicked.connect(self.open_collections)
+        filter_layout.addWidget(self.collections_btn)
+
         self.stats_button = QPushButton("Estadisticas")
         self.stats_button.clicked.connect(self.open_statistics)
         filter_layout.addWidget(self.stats_button)
 
+        self.diagnostics_btn = QPushButton("Diagnóstico")
+        self.diagnostics_btn.clicked.connect(self.open_diagnostics)
+        self.diagnostics_window = None
+
+        self.export_button = QPushButton("Exportar")
+        export_menu = QMenu(self.export_button)
+        export_menu.addAction("Pagos (filtro actual)", self.export_payments)
+        export_menu.addAction("Estado de clientes", self.export_client_status)
+        export_menu.addAction("Estadísticas mensuales", self.export_monthly_stats)
+        self.export_button.setMenu(export_menu)
+        filter_layout.addWidget(self.export_button)
+        filter_layout.addWidget(self.diagnostics_btn)
+
         self.statistics_window = None
 
         filter_layout.addWidget(self.search_input)
@@ -146,6 +219,7 @@ class PagosViewer(QWidget):
         self.table = QTableView()
         self.table.setAlternatingRowColors(True)
         self.table.setSortingEnabled(True)
+        self.table.sortByColumn(1, Qt.AscendingOrder)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.setSelectionBehavior(QTableView.SelectRows)
 
@@ -163,25 +237,55 @@ class PagosViewer(QWidget):
 
         self.setup_autocomplete()
 
-    def setup_autocomplete(self):
-        """Configura el autocompletado usando SQLAlchemy"""
-        names = self.client_model.get_all_names()
+    def load_initial_data(self):
+        """
+        Años, nombres y primera página de pagos en paralelo (son lecturas
+        independientes); la ventana se muestra enseguida y se llena cuando
+        llegan. La página se pide para el año actual, que es el que queda
+        elegido si tiene pagos.
+        """
+        current_year = datetime.datetime.now().year
+        month = self.month_combo.currentData()
+        header = self.table.horizontalHeader()
+        sort_column = header.sortIndicatorSection()
+        descending = header.sortIndicatorOrder() == Qt.DescendingOrder
+
+        bridge = get_async_bridge(self.db)
+        bridge.gather({
+            'years': bridge.payments.job('get_distinct_years'),
+            # El índice de nombres (compartido por todos los autocompletados)
+            # se arma en el hilo de la consulta
+            'names': lambda session: preload_name_index(self.db, ClientModel(self.db, session).get_all_names()),
+            'page': bridge.payments.job(
+                'get_payments_page', None, month, current_year, sort_column, descending,
+                None, SQLAlchemyTableModel.PAGE_SIZE
+            ),
+        }, self.on_initial_data, self.on_initial_data_error, context=self)
+
+    def on_initial_data(self, results):
+        self.load_filters(results['years'])
+
+        # Si mientras tanto cambió algún filtro (o el año actual no tiene
+        # pagos), la página precargada no sirve: se consulta de nuevo
+        year = self.year_combo.currentData()
+        if (self.search_input.text() or year != datetime.datetime.now().year
+                or isinstance(self.table.model(), SQLAlchemyTableModel)):
+            self.update_table()
+        else:
+            self.load_payments(first_page=results['page'])
 
-        self.completer = QCompleter(names, self)
-        self.completer.setCaseSensitivity(Qt.CaseInsensitive)
-        self.completer.setFilterMode(Qt.MatchContains)
-        self.completer.setCompletionMode(QCompleter.PopupCompletion)
-        self.completer.setMaxVisibleItems(10)
+        # Formularios de alta y edición armados de antemano
+        get_window_pool(self.db, PaymentWindow).prewarm()
+        get_window_pool(self.db, PaymentEditWindow).prewarm()
 
-        self.search_input.setCompleter(self.completer)
+    def on_initial_data_error(self, error):
+        print(f"Error loading initial data: {error}")
+        self.load_filters()
+        self.update_table()
 
-    def refresh_autocomplete(self):
-        """Refresca el autocompletado con los nombres actualizados"""
-        try:
-            names = self.client_model.get_all_names()
-            self.completer.model().setStringList(names)
-        except Exception as e:
-            print("DEBUG: refresh_autocomplete failed:", e)
+    def setup_autocomplete(self):
+        """Autocompletado sobre el índice de nombres compartido (se actualiza solo)"""
+        self.completer = attach_name_completer(self.search_input, self.db)
 
     def open_statistics(self):
         if self.statistics_window is None:
@@ -190,19 +294,92 @@ class PagosViewer(QWidget):
         self.statistics_window.raise_()
         self.statistics_window.activateWindow()
 
+    def export_payments(self):
+        name = self.search_input.text()
+        month = self.month_combo.currentData()
+        year = self.year_combo.currentData()
+        self.export_worker = start_export(
+            self, "Exportar pagos", f"pagos_{year or 'todos'}_{month:02d}",
+            lambda path, fmt, progress: self.export_controller.export_payments(
+                path, fmt, name, month, year, progress
+            )
+        )
+
+    def export_client_status(self):
+        self.export_worker = start_export(
+            self, "Exportar estado de clientes", "estado_clientes",
+            lambda path, fmt, progress: self.export_controller.export_client_status(
+                path, fmt, progress=progress
+            )
+        )
+
+    def export_monthly_stats(self):
+        self.export_worker = start_export(
+            self, "Exportar estadísticas", "estadisticas_mensuales",
+            lambda path, fmt, progress: self.export_controller.export_monthly_stats(
+                path, fmt, progress=progress
+            )
+        )
+
     def open_payment_window(self):
-        self.payment_window = PaymentWindow(self.db)
-        self.payment_window.payment_added.connect(self.on_payment_added)
+        self.payment_window = get_window_pool(self.db, PaymentWindow).acquire()
+        self.payment_window.reset()
         self.payment_window.show()
+        self.payment_window.raise_()
+        self.payment_window.activateWindow()
 
     def open_status(self):
         self.status_window = ClientStatusViewer(self.db)
         self.status_window.show()
 
-    def on_payment_added(self):
-        self.load_filters()
-        self.update_table()
-        self.refresh_autocomplete()
+    def open_due_list(self):
+        self.due_window = DueListViewer(self.db)
+        self.due_window.show()
+
+    def open_collections(self):
+        self.collections_window = CollectionsViewer(self.db)
+        self.collections_window.show()
+
+    def open_diagnostics(self):
+        if self.diagnostics_window is None:
+            self.diagnostics_window = DiagnosticsWindow(self.db)
+        self.diagnostics_window.show()
+        self.diagnostics_window.raise_()
+        self.diagnostics_window.activateWindow()
+
+    def on_database_event(self, event):
+        """Aplica un evento del bus sobre la tabla sin volver a consultarla"""
+        model = self.table.model()
+        if isinstance(event, ExternalChange) or not isinstance(model, SQLAlchemyTableModel):
+            self.load_filters()
+            self.update_table()
+            return
+
+        if isinstance(event, (PaymentCreated, PaymentUpdated)):
+            if self.matches_filters(event):
+                if not model.update_payment(event.row):
+                    model.insert_payment(event.row)
+            else:
+                model.remove_payment(event.payment_id)
+            self.add_year_filter(event.year)
+        elif isinstance(event, PaymentDeleted):
+            model.remove_payment(event.payment_id)
+
+        self.update_empty_state(model)
+
+    def matches_filters(self, event):
+        """Indica si el pago del evento pertenece a los filtros visibles"""
+        name = self.search_input.text()
+        # LIKE de SQLite no distingue mayúsculas en ASCII
+        if name and name.lower() not in str(event.row[1]).lower():
+            return False
+        month = self.month_combo.currentData()
+        if month and event.month != month:
+            return False
+        year = self.year_combo.currentData()
+        if year and event.year != year:
+            return False
+        return True
 
     def edit_payment(self):
         index = self.table.currentIndex()
@@ -213,9 +390,14 @@ class PagosViewer(QWidget):
         if payment_id is None:
             QMessageBox.warning(self, "Error", "No se pudo obtener el ID del pago.")
             return
-        self.payment_window = PaymentEditWindow(self.db, payment_id=payment_id)
-        self.payment_window.payment_added.connect(self.update_table)
+        if self.is_archived_year_selected():
+            return
+        # El formulario se completa con la fila ya cargada en la tabla
+        self.payment_window = get_window_pool(self.db, PaymentEditWindow).acquire()
+        self.payment_window.load_row(self.table.model().payment_row_at(index.row()))
         self.payment_window.show()
+        self.payment_window.raise_()
+        self.payment_window.activateWindow()
 
     def borrar_pago(self):
         index = self.table.currentIndex()
@@ -226,6 +408,8 @@ class PagosViewer(QWidget):
         if payment_id is None:
             QMessageBox.warning(self, "Error", "No se pudo obtener el ID del pago.")
             return
+        if self.is_archived_year_selected():
+            return
 
         reply = QMessageBox.question(
             self,
@@ -237,33 +421,43 @@ class PagosViewer(QWidget):
         if reply != QMessageBox.Yes:
             return
 
-        # Usar el controlador para eliminar el pago
-        success, message = self.payment_controller.delete_payment(payment_id)
+        # Usar el controlador para eliminar el pago (si nadie lo cambió desde
+        # que se cargó la fila)
+        version = self.table.model().payment_row_at(index.row())[7]
+        success, message = get_payment_writer(self.db).delete_payment(payment_id, version)
 
         if success:
             QMessageBox.information(self, "Éxito", message)
-            self.update_table()
         else:
             QMessageBox.critical(self, "Error", message)
 
+    def is_archived_year_selected(self):
+        """Avisa y retorna True si el año elegido está archivado (solo lectura)"""
+        year = self.year_combo.currentData()
+        if not self.payment_controller.archive_model.is_archived(year):
+            return False
+        QMessageBox.warning(
+            self, "Año archivado", f"Los pagos de {year} están archivados y son de solo lectura."
+        )
+        return True
+
     def get_selected_payment_id(self):
         """Obtiene el ID del pago seleccionado"""
         index = self.table.currentIndex()
         if not index.isValid():
             return None
-        row = index.row()
-        model = self.table.model()
         # La primera columna (índice 0) contiene el PagoID
-        return model.data(model.index(row, 0), Qt.DisplayRole)
+        return self.table.model().payment_id_at(index.row())
 
-    def load_filters(self):
-        """Carga los años disponibles en el combo"""
+    def load_filters(self, years=None):
+        """Carga los años disponibles en el combo (years: ya consultados)"""
         self.year_combo.blockSignals(True)
         self.year_combo.clear()
         current_year = datetime.datetime.now().year
 
         # Usar el modelo para obtener los años
-        years = self.payment_model.get_distinct_years()
+        if years is None:
+            years = self.payment_model.get_distinct_years()
 
         default_index = 0
         for i, year in enumerate(years):
@@ -276,18 +470,39 @@ class PagosViewer(QWidget):
 
         self.year_combo.blockSignals(False)
 
+    def add_year_filter(self, year):
+        """Agrega un año al combo (orden descendente) sin cambiar la selección"""
+        if self.year_combo.findData(year) >= 0:
+            return
+        position = 0
+        while position < self.year_combo.count() and self.year_combo.itemData(position) > year:
+            position += 1
+        self.year_combo.blockSignals(True)
+        self.year_combo.insertItem(position, str(year), year)
+        self.year_combo.blockSignals(False)
+
     def update_table(self):
         """Actualiza la tabla con los pagos filtrados"""
+        self.load_payments()
+
+    def load_payments(self, first_page=None):
+        """Arma el modelo de la tabla para los filtros actuales (first_page: ya consultada)"""
         name = self.search_input.text()
         month = self.month_combo.currentData()
         year = self.year_combo.currentData()
 
-        # Usar el modelo para obtener los pagos filtrados
-        results = self.payment_model.get_payments_filtered(name, month, year)
+        # La tabla pide los pagos por páginas, ordenados en la base según el
+        # encabezado elegido (por defecto, por cliente)
+        def fetch_page(sort_column, descending, after, limit):
+            return self.payment_model.get_payments_page(
+                name, month, year, sort_column, descending, after, limit
+            )
 
-        # Convertir resultados a formato para el modelo
-        headers = ['PagoID', 'Cliente', 'Monto', 'Fecha de Pago', 'Descripcion']
-        model = SQLAlchemyTableModel(results, headers)
+        header = self.table.horizontalHeader()
+        model = SQLAlchemyTableModel(
+            fetch_page, header.sortIndicatorSection(), header.sortIndicatorOrder() == Qt.DescendingOrder,
+            first_page
+        )
         self.table.setModel(model)
 
         header = self.table.horizontalHeader()
@@ -295,7 +510,11 @@ class PagosViewer(QWidget):
 
         self.table.hideColumn(0)  # Ocultar columna PagoID
 
-        if len(results) == 0:
+        self.update_empty_state(model)
+
+    def update_empty_state(self, model):
+        """Muestra el mensaje de 'sin pagos' cuando la tabla queda vacía"""
+        if model.rowCount() == 0:
             self.stacked_layout.setCurrentWidget(self.no_data_label)
         else:
             self.stacked_layout.setCurrentWidget(self.table)
\ No newline at end of file
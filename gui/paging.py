@@ -0,0 +1,152 @@
+import weakref
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from models.resultset import ColumnarRows
+
+# Modelos vivos, para la ventana de diagnóstico (ver open_models)
+_open_models = weakref.WeakSet()
+
+
+def open_models():
+    """Modelos de tabla paginados que siguen abiertos"""
+    return list(_open_models)
+
+
+class KeysetTableModel(QAbstractTableModel):
+    """
+    Base de los modelos de tabla que ordena y pagina en la base de datos.
+
+    Al hacer clic en un encabezado, sort() vuelve a pedir la primera página
+    con ORDER BY de esa columna (y desempate estable); al hacer scroll, la
+    vista llama a fetchMore() que pide la página siguiente a partir de la
+    clave de la última fila cargada.
+
+    fetch_page(sort_column, descending, after, limit) -> filas
+    sort_key(row, sort_column) -> clave de orden (la misma que usa la consulta)
+    first_page: primera página ya consultada (por ejemplo en paralelo con
+    otras lecturas); si no se pasa, se pide con fetch_page.
+    """
+
+    PAGE_SIZE = 500
+
+    def __init__(self, columns, fetch_page, sort_key, sort_column=0, descending=False, first_page=None):
+        super().__init__()
+        self._columns = columns
+        self._headers = [name for name, _ in columns]
+        self._fetch_page = fetch_page
+        self._sort_key = sort_key
+        self.sort_column = sort_column
+        self.descending = descending
+        # Pedidos a cached_row y cuántos tuvieron que armar la fila
+        self.cache_lookups = 0
+        self.cache_builds = 0
+        self._load(first_page)
+        _open_models.add(self)
+
+    def _load(self, rows=None):
+        if rows is None:
+            rows = self._fetch_page(self.sort_column, self.descending, None, self.PAGE_SIZE)
+        self._data = ColumnarRows(self._columns, rows)
+        # Valor calculado por fila (textos, colores...) la primera vez que
+        # la vista lo pide; paralela a _data
+        self._cache = [None] * len(self._data)
+        self._has_more = len(self._data) == self.PAGE_SIZE
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._data)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self._headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self._headers[section]
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Ordena en la base: solo se vuelve a leer la primera página"""
+        descending = order == Qt.DescendingOrder
+        if column < 0 or (column, descending) == (self.sort_column, self.descending):
+            return
+        self.beginResetModel()
+        self.sort_column = column
+        self.descending = descending
+        self._load()
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self._has_more:
+            return
+        after = self._sort_key(self._data[-1], self.sort_column) if len(self._data) else None
+        rows = list(self._fetch_page(self.sort_column, self.descending, after, self.PAGE_SIZE))
+        self._has_more = len(rows) == self.PAGE_SIZE
+        if not rows:
+            return
+        start = len(self._data)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self._data.extend(rows)
+        self._cache.extend([None] * len(rows))
+        self.endInsertRows()
+
+    def _position_for(self, row):
+        """Posición donde va la fila según el orden actual (búsqueda binaria)"""
+        key = self._sort_key(row, self.sort_column)
+        low, high = 0, len(self._data)
+        while low < high:
+            middle = (low + high) // 2
+            current = self._sort_key(self._data[middle], self.sort_column)
+            if (current > key) if self.descending else (current < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def insert_row(self, row):
+        """
+        Inserta una fila en su lugar. Si cae después de la última fila
+        cargada y quedan páginas, no se agrega: llegará con fetchMore.
+        """
+        position = self._position_for(row)
+        if position == len(self._data) and self._has_more:
+            return False
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._data.insert(position, tuple(row))
+        self._cache.insert(position, None)
+        self.endInsertRows()
+        return True
+
+    def replace_row(self, position, row):
+        """Reemplaza una fila; si cambió su clave de orden, la mueve"""
+        old_key = self._sort_key(self._data[position], self.sort_column)
+        if self._sort_key(row, self.sort_column) == old_key:
+            self._data[position] = tuple(row)
+            self._cache[position] = None
+            self.dataChanged.emit(self.index(position, 0), self.index(position, self.columnCount() - 1))
+            return
+        self.remove_row(position)
+        self.insert_row(row)
+
+    def remove_row(self, position):
+        self.beginRemoveRows(QModelIndex(), position, position)
+        del self._data[position]
+        del self._cache[position]
+        self.endRemoveRows()
+
+    def cached_row(self, position):
+        """Valor calculado de una fila (ver build_cache), una sola vez por fila"""
+        self.cache_lookups += 1
+        cached = self._cache[position]
+        if cached is None:
+            self.cache_builds += 1
+            cached = self.build_cache(self._data[position])
+            self._cache[position] = cached
+        return cached
+
+    def build_cache(self, row):
+        raise NotImplementedError
+
+    def memory_report(self):
+        """Memoria usada por las filas cargadas (ver ColumnarRows.memory_report)"""
+        return self._data.memory_report()
@@ -1,25 +1,27 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QFormLayout, QLineEdit,
-    QComboBox, QPushButton, QMessageBox, QCompleter
+    QComboBox, QPushButton, QMessageBox
 )
 from PySide6.QtGui import QDoubleValidator, QFont
 from PySide6.QtCore import Signal, Qt
 import datetime
 from models.client import ClientModel
+from models.money import to_cents
 from controllers.payment_controller import PaymentController
+from gui.completion import attach_name_completer
 
 
 class PaymentWindow(QWidget):
     payment_added = Signal()
 
-    def __init__(self, db):
+    def __init__(self, db, payment_controller=None):
         super().__init__()
         self.setWindowTitle("Agregar Pago")
         self.db = db  # SQLAlchemy Database instance
 
         # Inicializar modelos y controladores
         self.client_model = ClientModel(self.db)
-        self.payment_controller = PaymentController(self.db)
+        self.payment_controller = payment_controller or PaymentController(self.db)
 
         # Configurar tamaño de ventana
         self.setMinimumSize(500, 250)
@@ -44,13 +46,9 @@ class PaymentWindow(QWidget):
         self.nombre_input.setMinimumHeight(30)
         self.nombre_input.setFont(field_font)
 
-        # Autocomplete setup usando el modelo
-        names = self.client_model.get_all_names()
-        completer = QCompleter(names, self)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        completer.setMaxVisibleItems(10)
+        # Autocompletado sobre el índice de nombres compartido
+        completer = attach_name_completer(self.nombre_input, self.db)
         completer.popup().setStyleSheet("QListView { font-size: 11pt; }")
-        self.nombre_input.setCompleter(completer)
 
         # Enter to register payment
         self.nombre_input.returnPressed.connect(self.register_payment)
@@ -102,6 +100,19 @@ class PaymentWindow(QWidget):
         layout.addLayout(form_layout)
         layout.addWidget(self.submit_btn)
 
+    def reset(self, name: str = "", year: int = None, month: int = None):
+        """
+        Deja el formulario como recién abierto (para reutilizar la ventana),
+        opcionalmente con cliente y período ya elegidos.
+        """
+        now = datetime.datetime.now()
+        self.nombre_input.setText(name)
+        self.monto_input.clear()
+        self.descripcion_input.clear()
+        self.month_combo.setCurrentIndex((month or now.month) - 1)
+        self.year_combo.setCurrentText(str(year or now.year))
+        (self.monto_input if name else self.nombre_input).setFocus()
+
     def register_payment(self):
         nombre = self.nombre_input.text().strip().upper()
         monto_text = self.monto_input.text().strip()
@@ -114,7 +125,7 @@ class PaymentWindow(QWidget):
 
         # Validar monto
         try:
-            monto = float(monto_text)
+            monto = to_cents(monto_text)
         except ValueError:
             QMessageBox.warning(self, "Error", "Monto inválido. Ingrese un número válido.")
             return
@@ -6,28 +6,40 @@ from PySide6.QtGui import QDoubleValidator, QFont
 from PySide6.QtCore import Signal, Qt
 import datetime
 from models.payment import PaymentModel
+from models.money import to_cents, cents_to_text
 from controllers.payment_controller import PaymentController
 
 
 class PaymentEditWindow(QWidget):
     payment_added = Signal()
 
-    def __init__(self, db, payment_id):
+    def __init__(self, db, payment_id=None, row=None, payment_controller=None):
+        """
+        row: fila de la tabla principal (ver get_payments_page); si se pasa,
+        el formulario se completa con ella sin consultar la base.
+        """
         super().__init__()
         self.setWindowTitle("Editar Pago")
         self.db = db  # SQLAlchemy Database instance
         self.payment_id = payment_id
+        # Valores cargados (amount_text, amount_cents, month, year, description)
+        self._original = None
+        # Versión del pago cargado: si otro lo modifica, guardar da conflicto
+        self.version = None
 
         # Inicializar modelos y controladores
         self.payment_model = PaymentModel(self.db)
-        self.payment_controller = PaymentController(self.db)
+        self.payment_controller = payment_controller or PaymentController(self.db)
 
         # Configurar tamaño de ventana
         self.setMinimumSize(500, 250)
         self.resize(550, 300)
 
         self.setup_ui()
-        self.load_payment()
+        if row is not None:
+            self.load_row(row)
+        elif payment_id is not None:
+            self.load_payment()
 
     def setup_ui(self):
         layout = QVBoxLayout(self)
@@ -92,52 +104,85 @@ class PaymentEditWindow(QWidget):
         layout.addLayout(form_layout)
         layout.addWidget(self.submit_btn)
 
-    def load_payment(self):
+    def load_payment(self, payment_id=None):
         """Carga los datos del pago a editar"""
+        if payment_id is not None:
+            self.payment_id = payment_id
         # Usar el modelo para obtener los datos del pago
         payment_data = self.payment_model.get_payment_by_id(self.payment_id)
 
         if payment_data:
-            self.name_input.setText(payment_data['name'])
-            self.amount_input.setText(str(payment_data['amount']))
-            month = payment_data['month']
-            year = payment_data['year']
-            self.client_id = payment_data['client_id']
-            self.month_combo.setCurrentIndex(month - 1)
-            idx = self.year_combo.findData(year)
-            self.description_input.setText(payment_data['description'] or "")
-            if idx >= 0:
-                self.year_combo.setCurrentIndex(idx)
+            self.fill_form(
+                payment_data['name'], payment_data['amount_cents'], payment_data['month'],
+                payment_data['year'], payment_data['description']
+            )
+            self.version = payment_data['version']
         else:
             QMessageBox.critical(self, "Error", "No se pudo cargar el pago.")
             self.close()
 
+    def load_row(self, row):
+        """Carga el pago desde una fila de get_payments_page (sin consultar)"""
+        payment_id, name, amount_cents, _, description, month, year, version = row
+        self.payment_id = payment_id
+        self.fill_form(name, amount_cents, month, year, description)
+        self.version = version
+
+    def fill_form(self, name, amount_cents, month, year, description):
+        amount_text = cents_to_text(amount_cents)
+        description = description or ""
+        self.name_input.setText(name)
+        self.amount_input.setText(amount_text)
+        self.month_combo.setCurrentIndex(month - 1)
+        idx = self.year_combo.findData(year)
+        if idx < 0:
+            # Año fuera del rango del combo
+            self.year_combo.addItem(str(year), year)
+            idx = self.year_combo.count() - 1
+        self.year_combo.setCurrentIndex(idx)
+        self.description_input.setText(description)
+        self._original = (amount_text, amount_cents, month, year, description)
+        self.amount_input.setFocus()
+        self.amount_input.selectAll()
+
     def save_changes(self):
-        """Guarda los cambios del pago editado"""
+        """Guarda los cambios del pago editado (solo se validan los campos modificados)"""
+        original_text, original_cents, original_month, original_year, original_description = self._original
         amount_text = self.amount_input.text().strip()
         month = self.month_combo.currentData()
         year = self.year_combo.currentData()
+        description = self.description_input.text().strip()
 
-        if not amount_text:
-            QMessageBox.warning(self, "Error", "Debe completar todos los campos")
-            return
-
-        try:
-            amount = float(amount_text)
-        except ValueError:
-            QMessageBox.warning(self, "Error", "Monto inválido. Ingrese un número válido.")
+        if amount_text == original_text:
+            amount_cents = original_cents
+        else:
+            if not amount_text:
+                QMessageBox.warning(self, "Error", "Debe completar todos los campos")
+                return
+            try:
+                amount_cents = to_cents(amount_text)
+            except ValueError:
+                QMessageBox.warning(self, "Error", "Monto inválido. Ingrese un número válido.")
+                return
+
+        if (amount_cents, month, year, description) == (
+                original_cents, original_month, original_year, original_description):
+            # Nada que guardar
+            self.close()
             return
 
-        description = self.description_input.text().strip()
-
         # Usar el controlador para actualizar el pago
         success, message = self.payment_controller.update_payment(
-            self.payment_id, amount, month, year, description
+            self.payment_id, amount_cents, month, year, description, self.version
         )
 
         if success:
             QMessageBox.information(self, "Éxito", message)
             self.payment_added.emit()
             self.close()
+        elif message == self.payment_controller.CONFLICT_MESSAGE:
+            # Otro lo modificó: se muestran los datos actuales
+            QMessageBox.warning(self, "Pago modificado", message)
+            self.load_payment()
         else:
             QMessageBox.critical(self, "Error", message)
\ No newline at end of file
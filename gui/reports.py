@@ -0,0 +1,196 @@
+from PySide6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView
+)
+from PySide6.QtCore import Qt
+from models.reports import ReportModel, refresh_in_background
+from models.money import format_cents
+from gui.status_clients import StatusColorModel
+from gui.events import get_event_bridge
+from gui.async_bridge import get_async_bridge
+from models.events import PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange
+
+
+def period_text(year, month):
+    return f"{StatusColorModel.MONTHS_ES[month]} {year}"
+
+
+class ReportsPanel(QWidget):
+    """
+    Cierre de mes: totales por descripción y por tramo de monto, y clientes
+    nuevos y recurrentes. Lee las vistas de models.reports (no agrega pagos
+    al abrirse); "Actualizar" las pone al día en segundo plano.
+    """
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        self._dirty = True
+        self._refreshing = False
+
+        self.setup_ui()
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+
+        header_layout = QHBoxLayout()
+        header_layout.addWidget(QLabel("Período:"))
+        self.period_selector = QComboBox()
+        self.period_selector.currentIndexChanged.connect(self.load_period)
+        header_layout.addWidget(self.period_selector)
+        header_layout.addStretch()
+        self.refresh_btn = QPushButton("Actualizar")
+        self.refresh_btn.clicked.connect(self.refresh_views)
+        header_layout.addWidget(self.refresh_btn)
+        layout.addLayout(header_layout)
+
+        self.status_label = QLabel("-")
+        self.status_label.setWordWrap(True)
+        layout.addWidget(self.status_label)
+
+        layout.addWidget(QLabel("Recaudación por descripción"))
+        self.description_table = self._table(["Descripción", "Total", "Pagos"])
+        layout.addWidget(self.description_table)
+
+        layout.addWidget(QLabel("Recaudación por monto"))
+        self.tier_table = self._table(["Tramo", "Total", "Pagos"])
+        layout.addWidget(self.tier_table)
+
+        layout.addWidget(QLabel("Clientes por mes (año del período)"))
+        self.activity_table = self._table(["Mes", "Clientes", "Nuevos", "Recurrentes"])
+        layout.addWidget(self.activity_table)
+
+    @staticmethod
+    def _table(headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        return table
+
+    @staticmethod
+    def _fill(table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col > 0:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                table.setItem(row, col, item)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._dirty:
+            self.load()
+
+    def on_database_event(self, event):
+        """Los pagos nuevos no cambian las vistas hasta actualizarlas: solo el aviso"""
+        if isinstance(event, (PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange)):
+            self._dirty = True
+            if self.isVisible():
+                self.load_status()
+
+    def _read(self, jobs, callback):
+        """Lecturas de ReportModel en el pool de la GUI"""
+        db = self.db
+        bridge = get_async_bridge(db)
+        bridge.gather(
+            {key: (lambda session, method=method, args=args: getattr(ReportModel(db, session), method)(*args))
+             for key, (method, *args) in jobs.items()},
+            callback,
+            context=self,
+        )
+
+    def load(self):
+        """Estado de las vistas y lista de períodos"""
+        self._dirty = False
+        self._read(
+            {'status': ('get_status',), 'periods': ('get_periods',)},
+            self.set_periods,
+        )
+
+    def load_status(self):
+        self._read({'status': ('get_status',)}, lambda results: self.set_status(results['status']))
+
+    def set_periods(self, results):
+        self.set_status(results['status'])
+        current = self.period_selector.currentData()
+        self.period_selector.blockSignals(True)
+        self.period_selector.clear()
+        for year, month in results['periods']:
+            self.period_selector.addItem(period_text(year, month), (year, month))
+        index = self.period_selector.findData(current) if current else -1
+        self.period_selector.setCurrentIndex(index if index >= 0 else 0)
+        self.period_selector.blockSignals(False)
+        self.load_period()
+
+    def set_status(self, status):
+        if self._refreshing:
+            return
+        if any(view['refreshed_at'] is None for view in status):
+            self.status_label.setText("Los reportes todavía no se armaron. Presione \"Actualizar\".")
+            return
+        refreshed = min(view['refreshed_at'] for view in status).replace('T', ' ')
+        if any(view['stale'] for view in status):
+            pending = max(view['pending'] for view in status)
+            dirty = status[0]['dirty_periods']
+            self.status_label.setText(
+                f"Actualizado el {refreshed}. Desde entonces hay {pending} pagos nuevos "
+                f"y {dirty} meses con cambios."
+            )
+        else:
+            self.status_label.setText(f"Al día (actualizado el {refreshed}).")
+
+    def load_period(self):
+        period = self.period_selector.currentData()
+        if period is None:
+            for table in (self.description_table, self.tier_table, self.activity_table):
+                table.setRowCount(0)
+            return
+        year, month = period
+        self._read(
+            {
+                'descriptions': ('get_description_totals', year, month),
+                'tiers': ('get_tier_totals', year, month),
+                'activity': ('get_client_activity', year),
+            },
+            self.set_period,
+        )
+
+    def set_period(self, results):
+        self._fill(self.description_table, [
+            (description or "(sin descripción)", format_cents(total), str(payments))
+            for description, total, payments in results['descriptions']
+        ])
+        self._fill(self.tier_table, [
+            (label, format_cents(total), str(payments))
+            for label, total, payments in results['tiers']
+        ])
+        self._fill(self.activity_table, [
+            (period_text(year, month), str(clients), str(new), str(returning))
+            for year, month, clients, new, returning in results['activity']
+        ])
+
+    def refresh_views(self):
+        """Pone las vistas al día en un hilo aparte"""
+        self._refreshing = True
+        self.refresh_btn.setEnabled(False)
+        self.status_label.setText("Actualizando reportes...")
+        get_async_bridge(self.db).when_done(
+            refresh_in_background(self.db), self.on_refreshed, self.on_refresh_error, context=self
+        )
+
+    def on_refreshed(self, result):
+        success, message = result
+        self._refreshing = False
+        self.refresh_btn.setEnabled(True)
+        if not success:
+            self.status_label.setText(message)
+            return
+        self.load()
+
+    def on_refresh_error(self, error):
+        self._refreshing = False
+        self.refresh_btn.setEnabled(True)
+        self.status_label.setText(f"Error al actualizar los reportes: {error}")
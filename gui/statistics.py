@@ -1,6 +1,15 @@
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableView
-from PySide6.QtCore import Qt, QAbstractTableModel
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QTableView, QTabWidget
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+import bisect
 from models.payment import PaymentModel
+from models.money import format_cents
+from models.months import month_index, from_index
+from gui.events import get_event_bridge
+from gui.async_bridge import get_async_bridge
+from gui.analytics import AnalyticsPanel
+from gui.reports import ReportsPanel
+from gui.charts import YearComparisonChart, HistoryChart
+from models.events import PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange
 
 
 class SQLAlchemyStatsModel(QAbstractTableModel):
@@ -8,13 +17,16 @@ class SQLAlchemyStatsModel(QAbstractTableModel):
 
     def __init__(self, data):
         super().__init__()
-        self._data = data
+        self._data = [tuple(row) for row in data]
         self._headers = ['Mes', 'Total Recaudado']
         # Nombres de meses en español
         self._month_names = [
             'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
             'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre'
         ]
+        # Textos ya formateados (paralela a _data)
+        self._display = [self._format_row(row) for row in self._data]
+        self._alignments = [Qt.AlignLeft | Qt.AlignVCenter, Qt.AlignRight | Qt.AlignVCenter]
 
     def rowCount(self, parent=None):
         return len(self._data)
@@ -22,30 +34,23 @@ class SQLAlchemyStatsModel(QAbstractTableModel):
     def columnCount(self, parent=None):
         return 2
 
+    def _format_row(self, row):
+        # Convertir número de mes a nombre
+        month_num = int(row[0]) if row[0] else 0
+        if 1 <= month_num <= 12:
+            month_text = self._month_names[month_num - 1]
+        else:
+            month_text = str(row[0])
+        # Formatear el monto (centavos) con separadores de miles y 2 decimales
+        return month_text, format_cents(row[1] or 0)
+
     def data(self, index, role=Qt.DisplayRole):
         if role == Qt.DisplayRole:
-            row = self._data[index.row()]
-            col = index.column()
-
-            if col == 0:  # Columna de Mes
-                # Convertir número de mes a nombre
-                month_num = int(row[0]) if row[0] else 0
-                if 1 <= month_num <= 12:
-                    return self._month_names[month_num - 1]
-                return str(row[0])
-            elif col == 1:  # Columna de Total Recaudado
-                # Formatear el monto con separadores de miles y 2 decimales
-                try:
-                    amount = float(row[1]) if row[1] else 0
-                    return f"${amount:,.2f}"
-                except (ValueError, TypeError):
-                    return str(row[1])
+            return self._display[index.row()][index.column()]
 
         elif role == Qt.TextAlignmentRole:
             # Alinear números a la derecha
-            if index.column() == 1:
-                return Qt.AlignRight | Qt.AlignVCenter
-            return Qt.AlignLeft | Qt.AlignVCenter
+            return self._alignments[index.column()]
 
         return None
 
@@ -54,48 +59,156 @@ class SQLAlchemyStatsModel(QAbstractTableModel):
             return self._headers[section]
         return None
 
+    def add_amount(self, month, delta):
+        """Suma delta al total de un mes, agregando la fila si no existía"""
+        position = bisect.bisect_left(self._data, month, key=lambda r: r[0])
+        if position < len(self._data) and self._data[position][0] == month:
+            total = (self._data[position][1] or 0) + delta
+            self._data[position] = (month, total)
+            self._display[position] = self._format_row(self._data[position])
+            self.dataChanged.emit(self.index(position, 1), self.index(position, 1))
+            return
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._data.insert(position, (month, delta))
+        self._display.insert(position, self._format_row((month, delta)))
+        self.endInsertRows()
+
+    def total(self):
+        """Total de todos los meses"""
+        return sum(row[1] or 0 for row in self._data)
+
 
 class StatisticsWindow(QWidget):
+    # Años que se comparan en el gráfico (los más recientes)
+    COMPARE_YEARS = 4
+
     def __init__(self, db):
         super().__init__()
         self.setWindowTitle("Estadísticas de Recaudación")
-        self.resize(400, 400)
+        self.resize(700, 600)
         self.db = db  # SQLAlchemy Database instance
 
         # Inicializar modelo
         self.payment_model = PaymentModel(self.db)
         self.model = None
+        # Totales de todos los años: año -> {mes: total}. Cambiar de año no consulta la base
+        self.series = {}
 
         self.setup_ui()
-        self.load_years()
-        self.update_table()
+        self.load_series()
 
-    def showEvent(self, event):
-        """Se ejecuta cuando la ventana se muestra"""
-        super().showEvent(event)
-        self.refresh()
+        # Los cambios llegan por el bus; no hace falta recalcular al mostrarse
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+
+    def on_database_event(self, event):
+        """Ajusta el total del mes afectado sin volver a agregar nada"""
+        if isinstance(event, ExternalChange):
+            self.refresh()
+            return
+
+        if isinstance(event, PaymentCreated):
+            delta = event.amount_cents
+        elif isinstance(event, PaymentUpdated):
+            delta = event.amount_cents - event.old_amount_cents
+        elif isinstance(event, PaymentDeleted):
+            delta = -event.amount_cents
+        else:
+            return
+        if not delta:
+            return
+
+        # Las estadísticas agrupan por la fecha de pago (YYYY-MM-DD)
+        year, month = int(event.date[:4]), int(event.date[5:7])
+        new_year = year not in self.series
+        months = self.series.setdefault(year, {})
+        months[month] = months.get(month, 0) + delta
+
+        # Se borró (o bajó a 0) lo último del mes: get_all_monthly_stats ya
+        # no lo devolvería, ni tampoco el año si no le quedan meses
+        removed = not months[month] and isinstance(event, (PaymentUpdated, PaymentDeleted))
+        if removed:
+            del months[month]
+            if not months:
+                del self.series[year]
+
+        if new_year or year not in self.series:
+            self.load_years()
+        elif str(year) == self.year_selector.currentText() and self.model is not None:
+            if removed:
+                self.update_table()
+            else:
+                self.model.add_amount(month, delta)
+                self.total_label.setText(f"Total Anual: {format_cents(self.model.total())}")
+        self.update_charts()
+
+    def load_series(self):
+        """
+        Carga el total mensual de todos los años en una sola consulta, en
+        segundo plano: la ventana se muestra mientras tanto.
+        """
+        bridge = get_async_bridge(self.db)
+        version = self.db.events.version
+        bridge.gather(
+            {'stats': bridge.payments.job('get_all_monthly_stats')},
+            lambda results: self.set_series(results['stats'], version),
+            context=self,
+        )
+
+    def set_series(self, stats, version=None):
+        # Si llegó un evento mientras se consultaba, el resultado puede no
+        # incluirlo: se vuelve a pedir
+        if version is not None and version != self.db.events.version:
+            self.load_series()
+            return
+        self.series = {}
+        for year, month, total in stats:
+            self.series.setdefault(year, {})[month] = total or 0
+        self.load_years()
+        self.update_charts()
 
     def update_table(self):
-        """Actualiza la tabla con las estadísticas del año seleccionado"""
+        """Actualiza la tabla con las estadísticas del año seleccionado (desde la caché)"""
         year = self.year_selector.currentText()
         if not year:
             self.table.setModel(None)
             self.total_label.setText("")
             return
 
-        # Obtener estadísticas mensuales
-        results = self.payment_model.get_monthly_stats(year)
-
-        # Calcular el total anual
-        total_annual = sum(float(row[1]) if row[1] else 0 for row in results)
-        self.total_label.setText(f"Total Anual: ${total_annual:,.2f}")
+        results = sorted(self.series.get(int(year), {}).items())
 
         # Crear modelo personalizado con los resultados
         self.model = SQLAlchemyStatsModel(results)
         self.table.setModel(self.model)
 
+        # Calcular el total anual
+        self.total_label.setText(f"Total Anual: {format_cents(self.model.total())}")
+
+    def update_charts(self):
+        """Redibuja los gráficos a partir de la caché"""
+        years = sorted(self.series, reverse=True)[:self.COMPARE_YEARS]
+        # Cada línea llega hasta el último mes con pagos de ese año (en pesos)
+        self.comparison_chart.set_series({
+            year: [self.series[year].get(month, 0) / 100 for month in range(1, max(self.series[year]) + 1)]
+            for year in years
+        })
+
+        # Serie continua (meses sin pagos en 0) desde el primer al último mes
+        indexes = [month_index(year, month) for year, months in self.series.items() for month in months]
+        points = []
+        if indexes:
+            for index in range(min(indexes), max(indexes) + 1):
+                year, month = from_index(index)
+                points.append((index, self.series.get(year, {}).get(month, 0) / 100))
+        self.history_chart.set_points(points)
+
     def setup_ui(self):
-        layout = QVBoxLayout(self)
+        main_layout = QVBoxLayout(self)
+        self.tabs = QTabWidget()
+        main_layout.addWidget(self.tabs)
+
+        # Pestaña "Mensual": total recaudado por mes del año elegido
+        monthly_tab = QWidget()
+        layout = QVBoxLayout(monthly_tab)
 
         year_layout = QHBoxLayout()
         year_layout.addWidget(QLabel("Año:"))
@@ -119,19 +232,38 @@ class StatisticsWindow(QWidget):
         self.table.setColumnWidth(0, 150)  # Columna de mes más estrecha
 
         layout.addWidget(self.table)
+        self.tabs.addTab(monthly_tab, "Mensual")
+
+        # Pestaña "Comparación": gráficos interanuales e historia completa
+        charts_tab = QWidget()
+        charts_layout = QVBoxLayout(charts_tab)
+        self.comparison_chart = YearComparisonChart()
+        self.history_chart = HistoryChart()
+        charts_layout.addWidget(self.comparison_chart)
+        charts_layout.addWidget(self.history_chart)
+        self.tabs.addTab(charts_tab, "Comparación")
+
+        # Pestaña "Indicadores": retención, abandono y crecimiento
+        self.analytics_panel = AnalyticsPanel(self.db)
+        self.tabs.addTab(self.analytics_panel, "Indicadores")
+
+        # Pestaña "Cierre": reportes de cierre de mes (vistas materializadas)
+        self.reports_panel = ReportsPanel(self.db)
+        self.tabs.addTab(self.reports_panel, "Cierre")
 
     def load_years(self):
-        """Obtiene años existentes a partir de payment_date."""
+        """Llena el selector con los años en caché, conservando el elegido."""
+        current = self.year_selector.currentText()
+
+        self.year_selector.blockSignals(True)
         self.year_selector.clear()
+        self.year_selector.addItems([str(year) for year in sorted(self.series, reverse=True)])
+        index = self.year_selector.findText(current)
+        self.year_selector.setCurrentIndex(index if index >= 0 else 0)
+        self.year_selector.blockSignals(False)
 
-        # Usar el modelo para obtener los años
-        years = self.payment_model.get_years_from_dates()
-        self.year_selector.addItems(years)
+        self.update_table()
 
     def refresh(self):
-        """Refresca la lista de años y actualiza la tabla"""
-        self.year_selector.clear()
-        self.load_years()
-        if self.year_selector.count() > 0:
-            self.year_selector.setCurrentIndex(0)
-        self.update_table()
\ No newline at end of file
+        """Vuelve a cargar todos los años y actualiza la tabla y los gráficos"""
+        self.load_series()
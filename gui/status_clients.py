@@ -1,14 +1,25 @@
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QTableView, QCompleter, QHeaderView
+    QWidget, QVBoxLayout, QHBoxLayout, QLineEdit, QLabel, QTableView, QHeaderView
 )
-from PySide6.QtCore import Qt, QAbstractTableModel
+from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
 import datetime
 from models.client import ClientModel
+from models.resultset import VALUE
+from gui.paging import KeysetTableModel
+from gui.events import get_event_bridge
+from gui.completion import attach_name_completer
+from models.months import month_index, current_index
+from models.events import (
+    PaymentCreated, PaymentUpdated, PaymentDeleted, ClientDeleted, ExternalChange
+)
 
 
-class StatusColorModel(QAbstractTableModel):
-    """Modelo personalizado para mostrar el estado de clientes con colores y meses por nombre"""
+class StatusColorModel(KeysetTableModel):
+    """
+    Modelo personalizado para mostrar el estado de clientes con colores y meses por nombre.
+    Ordena y pagina en la base (ver KeysetTableModel); por defecto por cliente.
+    """
 
     MONTHS_ES = {
         1: "Enero", 2: "Febrero", 3: "Marzo", 4: "Abril",
@@ -21,16 +32,31 @@ class StatusColorModel(QAbstractTableModel):
     COLOR_WARN = QColor("#FFA726")    # Naranja: debe el mes actual (atraso leve)
     COLOR_LATE = QColor("#FF5252")    # Rojo: más de 1 mes o nunca pagó (atraso grave)
 
-    def __init__(self, data):
-        super().__init__()
-        self._data = data
-        self._headers = ["Cliente", "Último Mes", "Último Año"]
+    # Mes y año se repiten mucho (o son '-'): se guardan internados
+    COLUMNS = [("Cliente", VALUE), ("Último Mes", VALUE), ("Último Año", VALUE)]
+
+    def __init__(self, fetch_page, sort_column=0, descending=False):
+        # El estado se calcula contra el mes en que se cargó la tabla
+        self._now = datetime.datetime.now()
+        super().__init__(self.COLUMNS, fetch_page, ClientModel.status_sort_key, sort_column, descending)
 
-    def rowCount(self, parent=None):
-        return len(self._data)
+    def find_client(self, name):
+        """Devuelve la fila del cliente o -1"""
+        return self._data.find(0, name)
 
-    def columnCount(self, parent=None):
-        return 3
+    def upsert_client(self, row):
+        """Reemplaza la fila del cliente o la inserta en orden"""
+        position = self.find_client(row[0])
+        if position >= 0:
+            self.replace_row(position, row)
+        else:
+            self.insert_row(row)
+
+    def remove_client(self, name):
+        """Quita la fila del cliente si está presente"""
+        position = self.find_client(name)
+        if position >= 0:
+            self.remove_row(position)
 
     def _status_for_row(self, row):
         """
@@ -46,10 +72,7 @@ class StatusColorModel(QAbstractTableModel):
 
         if month != "-" and year != "-":
             try:
-                month_num = int(month)
-                year_num = int(year)
-                now = datetime.datetime.now()
-                months_ago = (now.year - year_num) * 12 + (now.month - month_num)
+                months_ago = current_index(self._now) - month_index(int(year), int(month))
 
                 if months_ago <= 0:
                     return 0, "Al día (pagó este mes)", self.COLOR_OK
@@ -61,55 +84,50 @@ class StatusColorModel(QAbstractTableModel):
 
         return None, "Atraso grave (nunca pagó o sin datos)", self.COLOR_LATE
 
+    def _month_text(self, raw):
+        """Mes por nombre para la columna Último Mes"""
+        if raw == "-":
+            return "-"
+        try:
+            month_num = int(raw)
+            return self.MONTHS_ES.get(month_num, str(raw))
+        except Exception:
+            return str(raw)
+
+    def build_cache(self, row):
+        """Textos, color y tooltip de una fila (se calculan una sola vez)"""
+        texts = (str(row[0]), self._month_text(row[1]), str(row[2]))
+        months_ago, status_text, color = self._status_for_row(row)
+
+        # Mostrar detalle adicional
+        if months_ago is None:
+            detail = "No hay pagos registrados."
+        elif months_ago == 0:
+            detail = "Último pago corresponde al mes actual."
+        elif months_ago == 1:
+            detail = "El último pago es del mes anterior."
+        else:
+            detail = f"El último pago fue hace {months_ago} meses."
+
+        return texts, color, f"{status_text}\n{detail}"
+
     def data(self, index, role=Qt.DisplayRole):
         if not index.isValid():
             return None
 
-        row = self._data[index.row()]
-        col = index.column()
-
         if role == Qt.DisplayRole:
-            # Mostrar mes por nombre en la columna "Último Mes"
-            if col == 1:
-                raw = row[1]
-                if raw == "-":
-                    return "-"
-                try:
-                    month_num = int(raw)
-                    return self.MONTHS_ES.get(month_num, str(raw))
-                except Exception:
-                    return str(raw)
-
-            return str(row[col])
+            return self.cached_row(index.row())[0][index.column()]
 
         # Colorear toda la fila (todas las columnas) según el estado
-        if role == Qt.BackgroundRole and col in (0, 1, 2):
-            _, _, color = self._status_for_row(row)
-            return color
+        if role == Qt.BackgroundRole:
+            return self.cached_row(index.row())[1]
 
         # Tooltip para que se entienda al pasar el mouse
         if role == Qt.ToolTipRole:
-            months_ago, status_text, _ = self._status_for_row(row)
-
-            # Mostrar detalle adicional
-            if months_ago is None:
-                detail = "No hay pagos registrados."
-            elif months_ago == 0:
-                detail = "Último pago corresponde al mes actual."
-            elif months_ago == 1:
-                detail = "El último pago es del mes anterior."
-            else:
-                detail = f"El último pago fue hace {months_ago} meses."
-
-            return f"{status_text}\n{detail}"
+            return self.cached_row(index.row())[2]
 
         return None
 
-    def headerData(self, section, orientation, role=Qt.DisplayRole):
-        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
-            return self._headers[section]
-        return None
-
 
 class ClientStatusViewer(QWidget):
     def __init__(self, db):
@@ -126,6 +144,24 @@ class ClientStatusViewer(QWidget):
         self.setup_ui()
         self.update_table()
 
+        get_event_bridge(self.db).event_received.connect(self.on_database_event)
+
+    def on_database_event(self, event):
+        """Actualiza solo la fila del cliente afectado"""
+        if isinstance(event, ExternalChange):
+            self.update_table()
+            return
+
+        model = self.table.model()
+        if isinstance(event, (PaymentCreated, PaymentUpdated, PaymentDeleted)):
+            row = self.client_model.get_client_status_row(event.client_id)
+            name = self.search_input.text()
+            # LIKE de SQLite no distingue mayúsculas en ASCII
+            if row is not None and (not name or name.lower() in row[0].lower()):
+                model.upsert_client(row)
+        elif isinstance(event, ClientDeleted):
+            model.remove_client(event.name)
+
     def setup_ui(self):
         layout = QVBoxLayout(self)
 
@@ -152,8 +188,10 @@ class ClientStatusViewer(QWidget):
         self.table = QTableView()
         self.table.setAlternatingRowColors(True)
         self.table.setSortingEnabled(True)
+        self.table.sortByColumn(0, Qt.AscendingOrder)
         self.table.horizontalHeader().setStretchLastSection(True)
         self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.doubleClicked.connect(self.open_client_detail)
         layout.addWidget(self.table)
 
         # Leyenda de colores (explica el significado)
@@ -187,25 +225,34 @@ class ClientStatusViewer(QWidget):
 
         self.setup_autocomplete()
 
-    def setup_autocomplete(self):
-        """Configura el autocompletado usando SQLAlchemy"""
-        names = self.client_model.get_all_names()
+    def open_client_detail(self, index):
+        """Ficha con el historial completo del cliente de la fila"""
+        from gui.client_detail import ClientDetailWindow
+
+        name = index.siblingAtColumn(0).data()
+        client = self.client_model.get_client_by_name(name)
+        if client is None:
+            return
+        self.detail_window = ClientDetailWindow(self.db, client[0], name)
+        self.detail_window.show()
 
-        completer = QCompleter(names, self)
-        completer.setCompletionColumn(0)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        completer.setFilterMode(Qt.MatchContains)
-        self.search_input.setCompleter(completer)
+    def setup_autocomplete(self):
+        """Autocompletado sobre el índice de nombres compartido (se actualiza solo)"""
+        self.completer = attach_name_completer(self.search_input, self.db)
 
     def update_table(self):
         """Actualiza la tabla con el estado de los clientes"""
         name = self.search_input.text()
 
-        # Usar el modelo para obtener el estado de los clientes
-        results = self.client_model.get_client_status(name)
+        # La tabla pide el estado de los clientes por páginas, ordenado en la base
+        def fetch_page(sort_column, descending, after, limit):
+            return self.client_model.get_client_status_page(name, sort_column, descending, after, limit)
 
         # Crear modelo personalizado con colores + meses por nombre
-        model = StatusColorModel(results)
+        header = self.table.horizontalHeader()
+        model = StatusColorModel(
+            fetch_page, header.sortIndicatorSection(), header.sortIndicatorOrder() == Qt.DescendingOrder
+        )
         self.table.setModel(model)
 
         # Configuración del header de la tabla
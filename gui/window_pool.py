@@ -0,0 +1,60 @@
+from PySide6.QtCore import Qt
+import weakref
+from shiboken6 import isValid
+
+# Pools de ventanas por instancia de Database
+_pools = weakref.WeakKeyDictionary()
+
+
+class WindowPool:
+    """
+    Ventanas reutilizables de un mismo tipo (alta y edición de pagos).
+
+    Armar los widgets de un formulario cuesta más que completarlo: al
+    cerrarse, la ventana solo se oculta y acquire() la devuelve la próxima
+    vez. Si todas las del pool están abiertas se crea una más que se
+    destruye al cerrarse.
+    """
+
+    def __init__(self, factory, size=2):
+        self.factory = factory
+        self.size = size
+        self._windows = []
+
+    def acquire(self):
+        """Una ventana oculta lista para completar y mostrar"""
+        self._windows = [window for window in self._windows if isValid(window)]
+        for window in self._windows:
+            if not window.isVisible():
+                return window
+        window = self.factory()
+        if len(self._windows) < self.size:
+            self._windows.append(window)
+        else:
+            window.setAttribute(Qt.WA_DeleteOnClose)
+        return window
+
+    def prewarm(self):
+        """Crea de antemano una ventana (por ejemplo al abrir la pantalla principal)"""
+        if not self._windows:
+            self._windows.append(self.factory())
+
+
+def get_window_pool(db, window_class, size=2):
+    """
+    Obtiene (o crea) el pool compartido de window_class para una base.
+    Las ventanas del pool escriben a través del PaymentWriter compartido
+    (mismos métodos que PaymentController, con commit agrupado).
+    """
+    pools = _pools.get(db)
+    if pools is None:
+        pools = {}
+        _pools[db] = pools
+    pool = pools.get(window_class)
+    if pool is None:
+        from controllers.payment_writer import get_payment_writer
+
+        writer = get_payment_writer(db)
+        pool = WindowPool(lambda: window_class(db, payment_controller=writer), size)
+        pools[window_class] = pool
+    return pool
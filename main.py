@@ -74,7 +74,21 @@ if __name__ == '__main__':
     db = create_connection()
     initialize_db(db)
 
+    # Copias de seguridad y mantenimiento programados, en segundo plano
+    from models.maintenance import MaintenanceService
+    maintenance = MaintenanceService(db)
+    maintenance.start()
+    app.aboutToQuit.connect(maintenance.stop)
+
     window = PagosViewer(db)  # Pasar db como parámetro
+
+    # Al salir: primero el escritor y los lectores en paralelo, después la
+    # conexión principal
+    from gui.async_bridge import get_async_bridge
+    from controllers.payment_writer import get_payment_writer
+    app.aboutToQuit.connect(get_payment_writer(db).stop)
+    app.aboutToQuit.connect(get_async_bridge(db).shutdown)
+    app.aboutToQuit.connect(db.close)
     # Aumentar fuente del header
     header = window.table.horizontalHeader()
     font = header.font()
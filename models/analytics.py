@@ -0,0 +1,268 @@
+"""
+Indicadores de recaudación, retención y abandono calculados con NumPy.
+
+Se leen todos los pagos en una sola consulta columnar (client_id, year,
+month, amount_cents) y las métricas se calculan con operaciones vectorizadas.
+Los arreglos quedan en caché hasta que note_event avisa un cambio: con solo
+pagos nuevos (PaymentCreated) se leen los de id mayor al último leído y se
+intercalan; cualquier otro cambio vuelve a leer todo. Los años archivados se
+leen de sus archivos una sola vez (no cambian) y se agregan a los de la
+base principal.
+"""
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+from sqlalchemy import select
+
+from models.payment import Payment
+from models.archive import ArchiveModel, ArchivedYear
+from models.events import PaymentCreated, PaymentUpdated, PaymentDeleted, ExternalChange
+
+# Perfiles por antigüedad (meses pagados): (desde, hasta, nombre)
+CLIENT_PROFILES = [
+    (1, 3, 'Nuevo'),
+    (4, 12, 'Regular'),
+    (13, None, 'Fiel'),
+]
+
+PAYMENT_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('client_id', np.int64),
+    ('year', np.int32),
+    ('month', np.int32),
+    ('amount_cents', np.int64),
+])
+
+
+@dataclass
+class AnalyticsReport:
+    months: np.ndarray              # Índice de mes (year * 12 + month - 1) de cada columna
+    revenue: np.ndarray             # Recaudación por mes pagado (centavos)
+    active_clients: np.ndarray      # Clientes con pago en el mes
+    churn_rate: np.ndarray          # Fracción de activos del mes anterior que no pagaron (NaN el primero)
+    growth: np.ndarray              # Variación de recaudación respecto del mes anterior (NaN el primero)
+    cohorts: np.ndarray             # Mes de inicio de cada cohorte
+    cohort_sizes: np.ndarray
+    retention: np.ndarray           # [cohorte, meses desde el inicio] -> fracción activa
+    avg_months_per_client: float
+    profile_names: list
+    profile_clients: np.ndarray
+    profile_revenue: np.ndarray     # Centavos
+
+
+class AnalyticsModel:
+    """Calcula indicadores sobre todos los pagos"""
+
+    RETENTION_MONTHS = 12
+
+    # Columnas leídas (el id solo sirve para saber hasta dónde se leyó)
+    _COLUMNS = (Payment.id, Payment.client_id, Payment.year, Payment.month, Payment.amount_cents)
+
+    def __init__(self, db, session=None):
+        """
+        session: la de las lecturas; load_arrays y get_report aceptan otra
+        (por ejemplo la de un hilo de ModelExecutor). Con varias sesiones,
+        la caché se comparte y se protege con un lock.
+        """
+        self.db = db
+        self.session = session if session is not None else db.get_session()
+        self._lock = threading.Lock()
+        # Aparte: note_event (hilo de la GUI) no espera a una carga en curso
+        self._stale_lock = threading.Lock()
+        self._arrays = None
+        # None: la caché está al día; 'append': solo hay pagos nuevos; 'full'
+        self._stale = 'full'
+        self._max_id = 0      # Mayor id leído de la base principal
+        self._report = None
+        self._archived = {}   # (año, pagos archivados) -> arreglo
+
+    def note_event(self, event):
+        """Marca la caché como vieja según el evento (ver models.events)"""
+        with self._stale_lock:
+            if isinstance(event, PaymentCreated):
+                self._stale = self._stale or 'append'
+            elif isinstance(event, (PaymentUpdated, PaymentDeleted, ExternalChange)):
+                self._stale = 'full'
+
+    def load_arrays(self, session=None):
+        """
+        Devuelve los pagos como arreglos ordenados por (cliente, mes).
+        Reutiliza la copia en caché mientras note_event no avise cambios.
+        """
+        with self._lock:
+            return self._load_arrays(session if session is not None else self.session)
+
+    def _load_arrays(self, session):
+        with self._stale_lock:
+            stale, self._stale = self._stale, None
+        if self._arrays is None:
+            stale = 'full'
+        if stale is None:
+            return self._arrays
+        try:
+            return self._reload(session, stale)
+        except Exception:
+            with self._stale_lock:
+                self._stale = 'full'
+            raise
+
+    def _reload(self, session, stale):
+        # Cursor DB-API directo: evita crear un Row de SQLAlchemy por pago
+        connection = session.connection().connection
+        if stale == 'append':
+            statement = select(*self._COLUMNS).where(Payment.id > self._max_id)
+            sql, params = self._compiled(statement)
+            added = self._read(connection, sql, params)
+            if len(added):
+                self._max_id = max(self._max_id, int(added['id'].max()))
+                self._arrays = self._insert_sorted(self._arrays, added)
+                self._report = None
+            return self._arrays
+
+        sql, params = self._compiled(select(*self._COLUMNS))
+        arrays = self._read(connection, sql, params)
+        self._max_id = int(arrays['id'].max()) if len(arrays) else 0
+
+        archived = self._load_archived(sql, session)
+        if archived:
+            arrays = np.concatenate([arrays] + archived)
+
+        month_index = self._month_index(arrays)
+        order = np.lexsort((month_index, arrays['client_id']))
+
+        self._arrays = {
+            'client_id': arrays['client_id'][order],
+            'month_index': month_index[order],
+            'amount_cents': arrays['amount_cents'][order],
+        }
+        self._report = None
+        return self._arrays
+
+    def _compiled(self, statement):
+        compiled = statement.compile(self.db.engine)
+        return str(compiled), tuple(compiled.params[key] for key in compiled.positiontup or ())
+
+    @staticmethod
+    def _month_index(arrays):
+        return arrays['year'].astype(np.int64) * 12 + arrays['month'] - 1
+
+    @classmethod
+    def _insert_sorted(cls, cached, added):
+        """Intercala pagos nuevos en los arreglos ordenados, sin volver a ordenar todo"""
+        month_index = cls._month_index(added)
+        order = np.lexsort((month_index, added['client_id']))
+        client_ids, month_index = added['client_id'][order], month_index[order]
+        # (cliente, mes) como una sola clave ordenable
+        keys = cached['client_id'] * (1 << 32) + cached['month_index']
+        positions = np.searchsorted(keys, client_ids * (1 << 32) + month_index, side='right')
+        return {
+            'client_id': np.insert(cached['client_id'], positions, client_ids),
+            'month_index': np.insert(cached['month_index'], positions, month_index),
+            'amount_cents': np.insert(cached['amount_cents'], positions, added['amount_cents'][order]),
+        }
+
+    @staticmethod
+    def _read(connection, sql, params=()):
+        cursor = connection.cursor()
+        try:
+            cursor.execute(sql, params)
+            return np.fromiter(cursor, dtype=PAYMENT_DTYPE)
+        finally:
+            cursor.close()
+
+    def _load_archived(self, sql, session):
+        """Arreglos de los años archivados, leídos de cada archivo una sola vez"""
+        archive_model = ArchiveModel(self.db, session)
+        counts = dict(session.query(ArchivedYear.year, ArchivedYear.payments))
+        cached = {}
+        for years, path in archive_model.iter_archive_files():
+            key = (path.name, tuple((year, counts[year]) for year in years))
+            if key not in self._archived:
+                connection = archive_model.open_read_only(path)
+                try:
+                    self._archived[key] = self._read(connection, sql)
+                finally:
+                    connection.close()
+            cached[key] = self._archived[key]
+        self._archived = cached
+        return list(cached.values())
+
+    def get_report(self, session=None):
+        """Calcula (o devuelve de caché) todos los indicadores"""
+        with self._lock:
+            arrays = self._load_arrays(session if session is not None else self.session)
+            if self._report is None:
+                self._report = self._compute(arrays['client_id'], arrays['month_index'], arrays['amount_cents'])
+            return self._report
+
+    @staticmethod
+    def _sum_by(groups, cents, length):
+        """Suma de centavos por grupo, en enteros (sin pasar por float)"""
+        totals = np.zeros(length, dtype=np.int64)
+        np.add.at(totals, groups, cents)
+        return totals
+
+    def _compute(self, client_ids, month_index, amounts):
+        if len(client_ids) == 0:
+            empty = np.zeros(0)
+            return AnalyticsReport(
+                empty, empty, empty, empty, empty, empty, empty,
+                np.zeros((0, self.RETENTION_MONTHS)), 0.0,
+                [name for _, _, name in CLIENT_PROFILES],
+                np.zeros(len(CLIENT_PROFILES), dtype=np.int64), np.zeros(len(CLIENT_PROFILES), dtype=np.int64),
+            )
+
+        # Cliente -> posición 0..n-1 (los datos vienen ordenados por cliente)
+        _, first_row, client_pos = np.unique(client_ids, return_index=True, return_inverse=True)
+        first_month = month_index[first_row]
+        payments_per_client = np.bincount(client_pos)
+
+        # Serie mensual por mes pagado
+        base = month_index.min()
+        span = month_index.max() - base + 1
+        offsets = month_index - base
+        months = np.arange(base, base + span)
+        revenue = self._sum_by(offsets, amounts, span)
+        active = np.bincount(offsets, minlength=span)
+
+        # Abandono: pagos sin pago del mismo cliente en el mes siguiente
+        same_client_next = np.zeros(len(client_ids), dtype=bool)
+        same_client_next[:-1] = (client_pos[1:] == client_pos[:-1]) & (month_index[1:] == month_index[:-1] + 1)
+        lost = np.bincount(offsets[~same_client_next], minlength=span)
+        churn_rate = np.full(span, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            churn_rate[1:] = np.where(active[:-1] > 0, lost[:-1] / active[:-1], np.nan)
+            growth = np.full(span, np.nan)
+            growth[1:] = np.where(revenue[:-1] > 0, revenue[1:] / revenue[:-1] - 1.0, np.nan)
+
+        # Retención por cohorte (mes del primer pago)
+        cohorts, cohort_pos = np.unique(first_month, return_inverse=True)
+        cohort_sizes = np.bincount(cohort_pos)
+        age = month_index - first_month[client_pos]
+        in_window = age < self.RETENTION_MONTHS
+        cells = cohort_pos[client_pos[in_window]] * self.RETENTION_MONTHS + age[in_window]
+        counts = np.bincount(cells, minlength=len(cohorts) * self.RETENTION_MONTHS)
+        retention = counts.reshape(len(cohorts), self.RETENTION_MONTHS) / cohort_sizes[:, None]
+
+        # Perfiles por cantidad de meses pagados
+        revenue_per_client = self._sum_by(client_pos, amounts, len(first_row))
+        bounds = np.array([low for low, _, _ in CLIENT_PROFILES[1:]])
+        profile = np.searchsorted(bounds, payments_per_client, side='right')
+        profile_clients = np.bincount(profile, minlength=len(CLIENT_PROFILES))
+        profile_revenue = self._sum_by(profile, revenue_per_client, len(CLIENT_PROFILES))
+
+        return AnalyticsReport(
+            months=months,
+            revenue=revenue,
+            active_clients=active,
+            churn_rate=churn_rate,
+            growth=growth,
+            cohorts=cohorts,
+            cohort_sizes=cohort_sizes,
+            retention=retention,
+            avg_months_per_client=float(payments_per_client.mean()),
+            profile_names=[name for _, _, name in CLIENT_PROFILES],
+            profile_clients=profile_clients,
+            profile_revenue=profile_revenue,
+        )
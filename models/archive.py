@@ -0,0 +1,371 @@
+"""
+Archivo de años cerrados en bases separadas.
+
+Los pagos de un año cerrado (anterior al actual) se mueven a un archivo
+SQLite propio junto a la base principal (data.db -> data_2023.db). La base
+principal queda chica y es la que se usa todos los días; los archivos se
+adjuntan (ATTACH) solo cuando una consulta pide ese año.
+
+- archived_years registra cada año archivado, su archivo y el mayor id
+  movido (los ids nuevos siempre quedan por encima, así no se repiten).
+- archived_totals guarda el total por (año, mes) de la fecha de pago de lo
+  archivado, para que las estadísticas no tengan que abrir los archivos.
+- El pago al que apunta clients.last_payment_id nunca se archiva: sigue en
+  la base principal aunque sea de un año archivado.
+- Los años archivados son de solo lectura.
+
+Los RECENT_FILES años archivados más recientes tienen archivo propio; los
+anteriores se juntan en uno solo (data_anteriores.db, ver consolidate).
+Así nunca hay más de MAX_ATTACHED - 1 archivos y una consulta sobre todos
+los años los puede adjuntar juntos.
+"""
+import datetime
+import sqlite3
+from pathlib import Path
+
+from sqlalchemy import Column, Integer, String, Table, MetaData, UniqueConstraint, func, select, text
+from models.database import Base
+from models.events import local_writes
+
+# Límite de bases adjuntas por conexión en SQLite (SQLITE_MAX_ATTACHED = 10)
+MAX_ATTACHED = 10
+
+# Años con archivo propio; el resto va a OLDER_SUFFIX (un archivo más)
+RECENT_FILES = MAX_ATTACHED - 2
+OLDER_SUFFIX = 'anteriores'
+
+
+class ArchivedYear(Base):
+    """Registro de años archivados"""
+    __tablename__ = 'archived_years'
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    filename = Column(String, nullable=False)
+    payments = Column(Integer, nullable=False, default=0)
+    max_payment_id = Column(Integer, nullable=False, default=0)
+    archived_at = Column(String, nullable=False)
+
+
+class ArchivedTotal(Base):
+    """Total recaudado archivado por (año, mes) de la fecha de pago"""
+    __tablename__ = 'archived_totals'
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    total_cents = Column(Integer, nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
+
+
+# Se lee en cada consulta de pagos (ver PaymentModel._payments_schemas):
+# sentencia armada una sola vez
+_ARCHIVED_YEARS = select(ArchivedYear.__table__.c.year, ArchivedYear.__table__.c.filename)
+
+
+def schema_name(filename):
+    """Esquema con el que se adjunta un archivo: data_2023.db -> archive_2023"""
+    return f"archive_{Path(filename).stem.rsplit('_', 1)[-1]}"
+
+
+_archive_tables = {}
+
+
+def archive_payments_table(schema):
+    """Tabla payments de un archivo adjunto (mismas columnas, sin FK a clients)"""
+    table = _archive_tables.get(schema)
+    if table is None:
+        table = Table(
+            'payments', MetaData(),
+            Column('id', Integer, primary_key=True),
+            Column('client_id', Integer, nullable=False),
+            Column('date', String, nullable=False),
+            Column('amount_cents', Integer, nullable=False),
+            Column('month', Integer, nullable=False),
+            Column('year', Integer, nullable=False),
+            Column('description', String, nullable=True),
+            UniqueConstraint('client_id', 'month', 'year', name='_client_month_year_uc'),
+            schema=schema,
+        )
+        _archive_tables[schema] = table
+    return table
+
+
+# Condición de los pagos que se mueven: del año y que no son el último pago de nadie
+_MOVABLE = """
+    FROM main.payments
+    WHERE year = :year
+      AND id NOT IN (SELECT last_payment_id FROM main.clients WHERE last_payment_id IS NOT NULL)
+"""
+
+
+class ArchiveModel:
+    """Operaciones sobre los años archivados"""
+
+    def __init__(self, db, session=None):
+        self.db = db
+        self.session = session if session is not None else db.get_session()
+
+    def get_archived_years(self):
+        """{año: nombre de archivo} de los años archivados"""
+        return {year: filename for year, filename in self.session.execute(_ARCHIVED_YEARS)}
+
+    def is_archived(self, year):
+        if year is None:
+            return False
+        return self.session.query(ArchivedYear.year).filter_by(year=int(year)).first() is not None
+
+    def max_archived_id(self):
+        """Mayor id de pago archivado (0 si no hay)"""
+        return self.session.query(func.max(ArchivedYear.max_payment_id)).scalar() or 0
+
+    def archive_path(self, suffix):
+        """Archivo de un año (o de OLDER_SUFFIX) junto a la base principal"""
+        main = Path(self.db.db_filename)
+        return main.with_name(f"{main.stem}_{suffix}{main.suffix or '.db'}")
+
+    def attach(self, years, archived=None):
+        """
+        Adjunta a la conexión de la sesión los archivos de los años pedidos que
+        todavía no estén adjuntos. Retorna la lista de esquemas, uno por
+        archivo (varios años pueden compartir el de años anteriores).
+        archived: get_archived_years() si ya se leyó.
+        """
+        if archived is None:
+            archived = self.get_archived_years()
+        filenames = sorted({archived[int(year)] for year in years if int(year) in archived})
+        if not filenames:
+            return []
+        if len(filenames) > MAX_ATTACHED - 1:
+            raise ValueError(
+                f"No se pueden consultar juntos más de {MAX_ATTACHED - 1} archivos de años archivados"
+            )
+
+        connection = self.session.connection()
+        attached = {row[1] for row in connection.exec_driver_sql("PRAGMA database_list")}
+        # Archivos que se juntaron con el de años anteriores (ver consolidate)
+        current = {schema_name(filename) for filename in set(archived.values())}
+        for schema in attached:
+            if schema.startswith('archive_') and schema not in current:
+                connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+        base_dir = Path(self.db.db_filename).parent
+        schemas = []
+        for filename in filenames:
+            schema = schema_name(filename)
+            if schema not in attached:
+                connection.exec_driver_sql(
+                    f"ATTACH DATABASE ? AS {schema}", (str(base_dir / filename),)
+                )
+            schemas.append(schema)
+        return schemas
+
+    def _target_path(self, year, archived):
+        """Archivo donde va un año: el que ya tiene, el propio o el de años anteriores"""
+        if year in archived:
+            return Path(self.db.db_filename).parent / archived[year]
+        recent = sorted(set(archived) | {year}, reverse=True)[:RECENT_FILES]
+        return self.archive_path(year if year in recent else OLDER_SUFFIX)
+
+    def archive_year(self, year):
+        """
+        Mueve los pagos de un año cerrado a su archivo.
+        Se puede volver a ejecutar sobre un año ya archivado para mover los
+        pagos que dejaron de ser el último de su cliente.
+        Retorna (success: bool, message: str)
+        """
+        year = int(year)
+        if year >= datetime.date.today().year:
+            return False, "Solo se pueden archivar años cerrados."
+        if self.db.db_filename == ':memory:':
+            return False, "No se puede archivar una base en memoria."
+
+        path = self._target_path(year, self.get_archived_years())
+        schema = schema_name(path.name)
+        table = archive_payments_table(schema)
+        params = {'year': year}
+
+        try:
+            # Las ventanas se enteran por el ExternalChange de abajo
+            with local_writes(self.db), self.db.engine.connect() as connection:
+                connection.exec_driver_sql(f"ATTACH DATABASE ? AS {schema}", (str(path),))
+                try:
+                    # Con la base principal en WAL, una transacción sobre dos
+                    # archivos no es atómica en conjunto: primero se copia al
+                    # archivo (INSERT OR IGNORE, se puede repetir) y recién
+                    # después se borra de la principal. Si algo falla en el
+                    # medio, volver a archivar el año termina el trabajo.
+                    connection.exec_driver_sql("BEGIN")
+                    table.create(connection, checkfirst=True)
+                    connection.execute(text(f"""
+                        INSERT OR IGNORE INTO {schema}.payments
+                            (id, client_id, date, amount_cents, month, year, description)
+                        SELECT id, client_id, date, amount_cents, month, year, description
+                        {_MOVABLE}
+                    """), params)
+                    connection.commit()
+
+                    connection.exec_driver_sql("BEGIN")
+                    moved, max_id = connection.execute(
+                        text(f"SELECT COUNT(*), COALESCE(MAX(id), 0) {_MOVABLE}"), params
+                    ).one()
+                    if moved:
+                        connection.execute(text(f"""
+                            INSERT INTO archived_totals (year, month, total_cents, payments)
+                            SELECT CAST(STRFTIME('%Y', date) AS INTEGER) AS y,
+                                   CAST(STRFTIME('%m', date) AS INTEGER) AS m,
+                                   SUM(amount_cents), COUNT(*)
+                            {_MOVABLE}
+                            GROUP BY y, m
+                            ON CONFLICT (year, month) DO UPDATE SET
+                                total_cents = total_cents + excluded.total_cents,
+                                payments = payments + excluded.payments
+                        """), params)
+                        connection.execute(text(f"DELETE {_MOVABLE}"), params)
+
+                    connection.execute(text("""
+                        INSERT INTO archived_years (year, filename, payments, max_payment_id, archived_at)
+                        VALUES (:year, :filename, :moved, :max_id, :now)
+                        ON CONFLICT (year) DO UPDATE SET
+                            payments = payments + excluded.payments,
+                            max_payment_id = MAX(max_payment_id, excluded.max_payment_id),
+                            archived_at = excluded.archived_at
+                    """), {
+                        'year': year, 'filename': path.name, 'moved': moved, 'max_id': max_id,
+                        'now': datetime.datetime.now().isoformat(timespec='seconds'),
+                    })
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                finally:
+                    connection.exec_driver_sql(f"DETACH DATABASE {schema}")
+        except Exception as e:
+            print(f"Error archiving year: {e}")
+            return False, f"No se pudo archivar {year}: {e}"
+
+        success, message = self.consolidate()
+        if not success:
+            return False, message
+
+        # Las ventanas abiertas vuelven a leer todo
+        from models.events import ExternalChange
+        self.session.expire_all()
+        self.db.events.publish(ExternalChange())
+        return True, f"{moved:,} pagos de {year} movidos a {path.name}"
+
+    def consolidate(self):
+        """
+        Pasa al archivo de años anteriores los años que quedaron fuera de
+        los RECENT_FILES más recientes. Primero se copia (INSERT OR IGNORE,
+        se puede repetir), después se cambia el archivo en archived_years y
+        al final se borra el archivo viejo. Retorna (success, message).
+        """
+        archived = self.get_archived_years()
+        recent = set(sorted(archived, reverse=True)[:RECENT_FILES])
+        older = self.archive_path(OLDER_SUFFIX)
+        base_dir = Path(self.db.db_filename).parent
+        folded = []
+        for year in sorted(archived):
+            # Ya en un archivo de años anteriores (aunque la base se haya renombrado)
+            if year in recent or schema_name(archived[year]) == schema_name(older.name):
+                continue
+            source = base_dir / archived[year]
+            source_schema, older_schema = schema_name(source.name), schema_name(older.name)
+            try:
+                with local_writes(self.db), self.db.engine.connect() as connection:
+                    connection.exec_driver_sql(f"ATTACH DATABASE ? AS {source_schema}", (str(source),))
+                    connection.exec_driver_sql(f"ATTACH DATABASE ? AS {older_schema}", (str(older),))
+                    try:
+                        connection.exec_driver_sql("BEGIN")
+                        archive_payments_table(older_schema).create(connection, checkfirst=True)
+                        connection.exec_driver_sql(
+                            f"INSERT OR IGNORE INTO {older_schema}.payments "
+                            f"(id, client_id, date, amount_cents, month, year, description) "
+                            f"SELECT id, client_id, date, amount_cents, month, year, description "
+                            f"FROM {source_schema}.payments"
+                        )
+                        connection.commit()
+
+                        connection.exec_driver_sql("BEGIN")
+                        connection.execute(
+                            text("UPDATE archived_years SET filename = :filename WHERE year = :year"),
+                            {'filename': older.name, 'year': year},
+                        )
+                        connection.commit()
+                    except Exception:
+                        connection.rollback()
+                        raise
+                    finally:
+                        connection.exec_driver_sql(f"DETACH DATABASE {source_schema}")
+                        connection.exec_driver_sql(f"DETACH DATABASE {older_schema}")
+            except Exception as e:
+                print(f"Error consolidating archived year: {e}")
+                return False, f"No se pudo pasar {year} a {older.name}: {e}"
+            try:
+                source.unlink()
+            except OSError as e:
+                # Otra conexión todavía lo tiene abierto (Windows): ya no se usa
+                print(f"Error removing archive file: {e}")
+            folded.append(year)
+
+        if not folded:
+            return True, ""
+        return True, f"{', '.join(str(year) for year in folded)} pasados a {older.name}"
+
+    def restore_latest_payment(self, client_id):
+        """
+        Vuelve a traer a la base principal el último pago archivado de un
+        cliente (cuando se borra el último pago que tenía en la base principal).
+        Retorna el id del pago restaurado o None.
+        """
+        for year in sorted(self.get_archived_years(), reverse=True):
+            # El archivo puede tener otros años (el de años anteriores)
+            table = archive_payments_table(self.attach([year])[0])
+            row = self.session.execute(
+                select(table).where(table.c.client_id == client_id, table.c.year == year)
+                .order_by(table.c.year.desc(), table.c.month.desc(), table.c.id.desc())
+                .limit(1)
+            ).first()
+            if row is None:
+                continue
+            try:
+                # Primero la base principal y después el archivo (cada uno en
+                # su transacción, ver archive_year): si falla en el medio, el
+                # pago queda repetido pero no se pierde
+                self.session.execute(text("""
+                    INSERT INTO main.payments (id, client_id, date, amount_cents, month, year, description)
+                    VALUES (:id, :client_id, :date, :amount_cents, :month, :year, :description)
+                """), dict(row._mapping))
+                self.session.execute(text("""
+                    UPDATE archived_totals
+                    SET total_cents = total_cents - :amount_cents, payments = payments - 1
+                    WHERE year = CAST(STRFTIME('%Y', :date) AS INTEGER)
+                      AND month = CAST(STRFTIME('%m', :date) AS INTEGER)
+                """), {'amount_cents': row.amount_cents, 'date': row.date})
+                self.session.execute(text(
+                    "UPDATE archived_years SET payments = payments - 1 WHERE year = :year"
+                ), {'year': year})
+                self.session.commit()
+                self.attach([year])
+                self.session.execute(table.delete().where(table.c.id == row.id))
+                self.session.commit()
+                return row.id
+            except Exception as e:
+                self.session.rollback()
+                print(f"Error restoring archived payment: {e}")
+                return None
+        return None
+
+    def iter_archive_files(self):
+        """
+        (años, ruta) de cada archivo (una vez aunque tenga varios años), para
+        lecturas que no pasan por la sesión
+        """
+        base_dir = Path(self.db.db_filename).parent
+        files = {}
+        for year, filename in sorted(self.get_archived_years().items()):
+            files.setdefault(filename, []).append(year)
+        for filename, years in files.items():
+            yield tuple(years), base_dir / filename
+
+    @staticmethod
+    def open_read_only(path):
+        return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
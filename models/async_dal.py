@@ -0,0 +1,191 @@
+"""
+Acceso a datos asíncrono para PaymentModel y ClientModel.
+
+No hay driver asíncrono de SQLite entre las dependencias, así que los
+métodos de lectura de los modelos corren en un pool de hilos dedicado. Cada
+hilo tiene su propia sesión (las sesiones de SQLAlchemy no se comparten
+entre hilos) sobre un pool de conexiones de solo lectura (ver
+Database.create_read_engine), y la transacción de lectura se cierra al
+terminar cada consulta para que la próxima vea los datos nuevos.
+
+gather() lanza varias lecturas independientes a la vez y junta los
+resultados: abrir una ventana tarda lo que la consulta más lenta y no la
+suma de todas.
+
+Las escrituras siguen pasando por PaymentController en el hilo de la GUI,
+que es el que publica los eventos.
+
+    executor = ModelExecutor(db)
+    payments = AsyncPaymentModel(executor)
+    years, stats = await asyncio.gather(payments.get_distinct_years(),
+                                        payments.get_all_monthly_stats())
+
+Para la GUI, gui/async_bridge.py entrega los resultados en el hilo de Qt.
+"""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from sqlalchemy.orm import sessionmaker
+
+
+class ModelExecutor:
+    """Pool de hilos con una sesión por hilo"""
+
+    def __init__(self, db, max_workers=4):
+        self.db = db
+        self.engine = db.create_read_engine(pool_size=max_workers)
+        self.Session = sessionmaker(bind=self.engine)
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dal')
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self.Session()
+            self._local.session = session
+            with self._lock:
+                self._sessions.append(session)
+        return session
+
+    def _call(self, fn, args, kwargs):
+        session = self._session()
+        try:
+            return fn(session, *args, **kwargs)
+        finally:
+            # Termina la transacción de lectura
+            session.rollback()
+
+    def submit(self, fn, *args, **kwargs):
+        """Corre fn(session, *args, **kwargs) en el pool. Retorna un concurrent.futures.Future"""
+        return self._pool.submit(self._call, fn, args, kwargs)
+
+    def gather(self, jobs):
+        """
+        Lanza en paralelo cada job(session) de {clave: job} y retorna un
+        Future que se resuelve con {clave: resultado} cuando terminan todos
+        (o con la primera excepción).
+        """
+        combined = Future()
+        results = {}
+        pending = [len(jobs)]
+        lock = threading.Lock()
+
+        def done(key, future):
+            with lock:
+                if combined.done():
+                    return
+                error = future.exception()
+                if error is not None:
+                    combined.set_exception(error)
+                    return
+                results[key] = future.result()
+                pending[0] -= 1
+                if not pending[0]:
+                    combined.set_result(results)
+
+        if not jobs:
+            combined.set_result(results)
+        for key, job in jobs.items():
+            self.submit(job).add_done_callback(lambda future, key=key: done(key, future))
+        return combined
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+        with self._lock:
+            for session in self._sessions:
+                session.close()
+            self._sessions.clear()
+        if self.engine is not self.db.engine:
+            self.engine.dispose()
+
+
+class _AsyncModel:
+    """Base: cada lectura se puede lanzar como job(), future() o corrutina"""
+
+    model_class = None
+
+    def __init__(self, executor: ModelExecutor):
+        self.executor = executor
+
+    def job(self, method, *args, **kwargs):
+        """job(session) que corre model.method(*args, **kwargs), para ModelExecutor.gather"""
+        db = self.executor.db
+        model_class = self.model_class
+        return lambda session: getattr(model_class(db, session), method)(*args, **kwargs)
+
+    def future(self, method, *args, **kwargs):
+        """Lanza model.method(*args, **kwargs) en el pool y retorna el Future"""
+        return self.executor.submit(self.job(method, *args, **kwargs))
+
+    async def _run(self, method, *args, **kwargs):
+        return await asyncio.wrap_future(self.future(method, *args, **kwargs))
+
+
+class AsyncPaymentModel(_AsyncModel):
+    """Lecturas de PaymentModel sin bloquear al que llama"""
+
+    def __init__(self, executor: ModelExecutor):
+        from models.payment import PaymentModel
+        self.model_class = PaymentModel
+        super().__init__(executor)
+
+    async def get_payment_by_id(self, payment_id: int):
+        return await self._run('get_payment_by_id', payment_id)
+
+    async def get_payment_row(self, payment_id: int):
+        return await self._run('get_payment_row', payment_id)
+
+    async def get_payments_page(self, name: str = None, month: int = None, year: int = None,
+                                sort_column: int = 1, descending: bool = False, after=None, limit: int = 500):
+        return await self._run('get_payments_page', name, month, year, sort_column, descending, after, limit)
+
+    async def get_payments_filtered(self, name: str = None, month: int = None, year: int = None):
+        return await self._run('get_payments_filtered', name, month, year)
+
+    async def get_distinct_years(self):
+        return await self._run('get_distinct_years')
+
+    async def get_years_from_dates(self):
+        return await self._run('get_years_from_dates')
+
+    async def get_monthly_stats(self, year: str):
+        return await self._run('get_monthly_stats', year)
+
+    async def get_all_monthly_stats(self):
+        return await self._run('get_all_monthly_stats')
+
+    async def get_client_history(self, client_id: int, cursor=None, limit: int = 100):
+        return await self._run('get_client_history', client_id, cursor, limit)
+
+    async def get_gap_summary(self, until: int = None, limit: int = None):
+        return await self._run('get_gap_summary', until, limit)
+
+
+class AsyncClientModel(_AsyncModel):
+    """Lecturas de ClientModel sin bloquear al que llama"""
+
+    def __init__(self, executor: ModelExecutor):
+        from models.client import ClientModel
+        self.model_class = ClientModel
+        super().__init__(executor)
+
+    async def get_client_by_name(self, name: str):
+        return await self._run('get_client_by_name', name)
+
+    async def get_all_names(self):
+        return await self._run('get_all_names')
+
+    async def get_client_status_page(self, name_filter: str = None, sort_column: int = 0,
+                                     descending: bool = False, after=None, limit: int = 500):
+        return await self._run('get_client_status_page', name_filter, sort_column, descending, after, limit)
+
+    async def get_client_status(self, name_filter: str = None):
+        return await self._run('get_client_status', name_filter)
+
+    async def get_client_status_row(self, client_id: int):
+        return await self._run('get_client_status_row', client_id)
+
+    async def get_missing_months(self, client_id: int, until: int = None):
+        return await self._run('get_missing_months', client_id, until)
@@ -1,6 +1,12 @@
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, select, bindparam, tuple_
 from sqlalchemy.orm import relationship
 from models.database import Base
+from models.metrics import timed
+
+
+# Sentencias de estado ya armadas, por forma del filtro (ver
+# PaymentModel._payments_filtered_statement)
+_statements = {}
 
 
 class Client(Base):
@@ -10,6 +16,8 @@ class Client(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False, unique=True)
     last_payment_id = Column(Integer, ForeignKey('payments.id'), nullable=True)
+    # Aumenta con cada cambio del cliente (ver delete_client)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
 
     # Relaciones
     payments = relationship('Payment', back_populates='client', foreign_keys='Payment.client_id')
@@ -19,10 +27,13 @@ class Client(Base):
 class ClientModel:
     """Modelo para operaciones CRUD de clientes"""
 
-    def __init__(self, db):
+    def __init__(self, db, session=None):
         self.db = db
-        self.session = db.get_session()
+        # Por defecto se usa la sesión compartida; los trabajos en segundo
+        # plano pasan una sesión propia
+        self.session = session if session is not None else db.get_session()
 
+    @timed('clients.get_client_by_name')
     def get_client_by_name(self, name: str):
         """Obtiene un cliente por nombre. Retorna (id, last_payment_id) o None."""
         client = self.session.query(Client).filter_by(name=name).first()
@@ -48,6 +59,7 @@ class ClientModel:
             client = self.session.query(Client).filter_by(id=client_id).first()
             if client:
                 client.last_payment_id = payment_id
+                client.version = Client.version + 1
                 self.session.commit()
                 return True
             return False
@@ -56,31 +68,61 @@ class ClientModel:
             print(f"Error updating last payment: {e}")
             return False
 
-    def delete_client(self, client_id: int):
-        """Elimina un cliente."""
+    def get_client_version(self, client_id: int):
+        """Versión actual de un cliente, o None si no existe."""
+        return self.session.query(Client.version).filter_by(id=client_id).scalar()
+
+    def delete_client(self, client_id: int, expected_version: int = None):
+        """
+        Elimina un cliente.
+        Con expected_version solo lo elimina si no cambió desde que se leyó
+        la versión; si cambió lanza VersionConflict.
+        """
+        from models.payment import VersionConflict
+
         try:
-            client = self.session.query(Client).filter_by(id=client_id).first()
-            if client:
-                self.session.delete(client)
+            query = self.session.query(Client).filter(Client.id == client_id)
+            if expected_version is not None:
+                query = query.filter(Client.version == expected_version)
+            if query.delete(synchronize_session='fetch'):
                 self.session.commit()
                 return True
-            return False
+            self.session.rollback()
         except Exception as e:
             self.session.rollback()
             print(f"Error deleting client: {e}")
             return False
-
+        if expected_version is not None and self.get_client_version(client_id) is not None:
+            raise VersionConflict('clients', client_id)
+        return False
+
+    def get_missing_months(self, client_id: int, until: int = None):
+        """
+        Meses sin pago de un cliente entre su primer y su último pago (y,
+        con until, hasta ese índice de mes). Retorna [(año, mes), ...].
+        """
+        from models.payment import PaymentModel
+        from models.months import from_index
+
+        return [
+            from_index(index)
+            for _, _, first, last, _ in PaymentModel(self.db, self.session).iter_gaps(client_id, until)
+            for index in range(first, last + 1)
+        ]
+
+    @timed('clients.get_all_names')
     def get_all_names(self):
         """Obtiene todos los nombres de clientes para autocompletado."""
         clients = self.session.query(Client.name).all()
         return [client.name for client in clients]
 
-    def get_client_status(self, name_filter: str = None):
-        """Obtiene el estado de todos los clientes con filtro opcional."""
+    @staticmethod
+    def _client_status_select():
+        """Consulta base de estado: (Cliente, Último Mes, Último Año)."""
         from models.payment import Payment
         from sqlalchemy import case
 
-        query = self.session.query(
+        return select(
             Client.name.label('Cliente'),
             case(
                 (Payment.month.isnot(None), Payment.month),
@@ -95,9 +137,101 @@ class ClientModel:
             Client.last_payment_id == Payment.id
         )
 
+    @staticmethod
+    def _status_sort_expressions():
+        """Expresión de orden de cada columna de estado ('-' ordena como 0)"""
+        from models.payment import Payment
+        from sqlalchemy import func
+
+        return [
+            Client.name,
+            func.coalesce(Payment.month, 0),
+            func.coalesce(Payment.year, 0),
+        ]
+
+    @staticmethod
+    def status_sort_key(row, sort_column: int):
+        """Clave de orden de una fila de estado, igual a la de get_client_status_page"""
+        value = row[sort_column]
+        if sort_column > 0 and value == '-':
+            value = 0
+        return value, row[0]
+
+    @classmethod
+    def _client_status_statement(cls, by_name=False, sort_column: int = 0, descending: bool = False,
+                                 paged=False, limited=False):
+        """
+        Sentencia de estado filtrada por nombre (:name), ordenada por la
+        columna sort_column y luego por cliente (único, así el orden es
+        estable). paged agrega "después de :after_value, :after_name" y
+        limited el LIMIT :limit. Se arma una sola vez por combinación.
+        """
+        key = ('status', by_name, sort_column, descending, paged, limited)
+        statement = _statements.get(key)
+        if statement is not None:
+            return statement
+
+        statement = cls._client_status_select()
+        if by_name:
+            statement = statement.where(Client.name.like(bindparam('name')))
+
+        sort_expression = cls._status_sort_expressions()[sort_column]
+        if paged:
+            key_columns = tuple_(sort_expression, Client.name)
+            after = tuple_(
+                bindparam('after_value', type_=sort_expression.type), bindparam('after_name', type_=String)
+            )
+            statement = statement.where(key_columns < after if descending else key_columns > after)
+        if descending:
+            statement = statement.order_by(sort_expression.desc(), Client.name.desc())
+        else:
+            statement = statement.order_by(sort_expression.asc(), Client.name.asc())
+        if limited:
+            statement = statement.limit(bindparam('limit', type_=Integer))
+
+        _statements[key] = statement
+        return statement
+
+    def _client_status_filtered(self, name_filter: str = None, sort_column: int = 0,
+                                descending: bool = False, after=None, limit: int = None,
+                                execution_options=None):
+        """Ejecuta _client_status_statement para estos filtros. Retorna el Result"""
+        statement = self._client_status_statement(
+            bool(name_filter), sort_column, descending, after is not None, limit is not None
+        )
+        params = {}
         if name_filter:
-            query = query.filter(Client.name.like(f"%{name_filter}%"))
-
-        query = query.order_by(Client.name)
-
-        return query.all()
\ No newline at end of file
+            params['name'] = f"%{name_filter}%"
+        if after is not None:
+            params['after_value'], params['after_name'] = after
+        if limit is not None:
+            params['limit'] = limit
+        return self.session.execute(statement, params, execution_options=execution_options or {})
+
+    @timed('clients.get_client_status_page')
+    def get_client_status_page(self, name_filter: str = None, sort_column: int = 0,
+                               descending: bool = False, after=None, limit: int = 500):
+        """
+        Una página del estado de clientes (paginación por clave).
+        after es la clave (status_sort_key) de la última fila ya cargada.
+        """
+        return self._client_status_filtered(name_filter, sort_column, descending, after, limit).all()
+
+    @timed('clients.get_client_status')
+    def get_client_status(self, name_filter: str = None):
+        """Obtiene el estado de todos los clientes con filtro opcional."""
+        return self._client_status_filtered(name_filter).all()
+
+    def iter_client_status(self, name_filter: str = None, chunk_size: int = 1000):
+        """Igual que get_client_status pero recorre el resultado por bloques."""
+        return self._client_status_filtered(name_filter, execution_options={'yield_per': chunk_size})
+
+    @timed('clients.get_client_status_row')
+    def get_client_status_row(self, client_id: int):
+        """Obtiene la fila de estado de un solo cliente, o None si no existe."""
+        statement = _statements.get('status_row')
+        if statement is None:
+            statement = _statements['status_row'] = self._client_status_select().where(
+                Client.id == bindparam('client_id')
+            )
+        return self.session.execute(statement, {'client_id': client_id}).first()
@@ -1,5 +1,7 @@
-from sqlalchemy import create_engine
+from pathlib import Path
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker, declarative_base
+from models.events import EventBus
 
 Base = declarative_base()
 
@@ -8,9 +10,12 @@ class Database:
     """Clase para manejar la conexión a la base de datos con SQLAlchemy"""
 
     def __init__(self, db_filename="data.db"):
+        self.db_filename = db_filename
         self.engine = create_engine(f'sqlite:///{db_filename}', echo=False)
         self.Session = sessionmaker(bind=self.engine)
         self._session = None
+        # Bus compartido por todas las ventanas que usan esta base
+        self.events = EventBus()
 
     def get_session(self):
         """Obtiene o crea una sesión de base de datos"""
@@ -18,6 +23,20 @@ class Database:
             self._session = self.Session()
         return self._session
 
+    def create_read_engine(self, pool_size=4):
+        """
+        Engine de solo lectura (mode=ro) con su propio pool de conexiones,
+        para consultas en paralelo desde otros hilos. Con la base en modo WAL
+        los lectores no bloquean al que escribe ni esperan por él.
+        """
+        if self.db_filename == ':memory:':
+            return self.engine
+        uri = Path(self.db_filename).resolve().as_uri()
+        return create_engine(
+            f'sqlite:///{uri}?mode=ro&uri=true', echo=False,
+            pool_size=pool_size, max_overflow=0,
+        )
+
     def close_session(self):
         """Cierra la sesión actual"""
         if self._session:
@@ -25,9 +44,54 @@ class Database:
             self._session = None
 
     def initialize_db(self):
-        """Crea todas las tablas definidas en los modelos"""
+        """Crea todas las tablas definidas en los modelos y migra bases existentes"""
+        from models import migrations
+        from models import client, payment  # noqa: F401 (registra clients y payments)
+        from models import archive  # noqa: F401 (registra las tablas de años archivados)
+        from models import maintenance  # noqa: F401 (registra maintenance_runs)
+        from models import sync  # noqa: F401 (registra las tablas de replicación)
+        from models import due_list  # noqa: F401 (registra due_list)
+        from models import reports  # noqa: F401 (registra las vistas de reportes y sus triggers)
+
+        is_new = not inspect(self.engine).has_table('payments')
+        if not is_new:
+            migrations.run_migrations(self.engine)
+        else:
+            # Solo surte efecto antes de crear la primera tabla; permite
+            # compactar en línea con PRAGMA incremental_vacuum (ver maintenance)
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+
         Base.metadata.create_all(self.engine)
 
+        if is_new:
+            with self.engine.begin() as connection:
+                migrations.set_schema_version(connection, migrations.LATEST_VERSION)
+        elif self.db_filename != ':memory:':
+            # Bases archivadas antes de juntar los años viejos en un archivo
+            # (ver ArchiveModel.consolidate): quedan en MAX_ATTACHED - 1 archivos
+            session = self.Session()
+            try:
+                archive.ArchiveModel(self, session).consolidate()
+            finally:
+                session.close()
+
+        if self.db_filename != ':memory:':
+            # WAL: las lecturas en paralelo (ver create_read_engine) no se
+            # bloquean con las escrituras. Queda guardado en el archivo
+            with self.engine.connect() as connection:
+                connection.exec_driver_sql("PRAGMA journal_mode = WAL")
+
+
+    def close(self):
+        """
+        Cierra la sesión y las conexiones. Al cerrar la última conexión SQLite
+        vuelca el WAL al archivo principal y lo borra, así data.db queda
+        completo por sí solo (por ejemplo para copiarlo a mano).
+        """
+        self.close_session()
+        self.engine.dispose()
+
 
 def create_connection(db_filename="data.db"):
     """Crea y retorna una instancia de Database"""
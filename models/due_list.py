@@ -0,0 +1,134 @@
+"""
+Lista de clientes que deben el mes actual (o más), para la recepción.
+
+due_list guarda solo a los clientes cuyo próximo mes esperado (el mes
+siguiente a su último pago, igual que en register_payment) es el actual o
+uno anterior, con ese mes como índice (ver models.months). Leerla
+ordenada por atraso es recorrer un índice, sin juntar clientes con pagos.
+
+- Cada escritura del PaymentController actualiza la fila de ese cliente.
+- Al cambiar de mes la lista se vuelve a armar con una sola sentencia
+  (rollover), desde clients.last_payment_id.
+"""
+from sqlalchemy import Column, Integer, String, Index, text
+from models.database import Base
+from models.months import current_index, from_index
+
+
+class DueEntry(Base):
+    """Cliente que debe desde next_due_index"""
+    __tablename__ = 'due_list'
+
+    client_id = Column(Integer, primary_key=True, autoincrement=False)
+    client_name = Column(String, nullable=False)
+    next_due_index = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('ix_due_list_next_due', 'next_due_index', 'client_name'),
+    )
+
+
+class DueListState(Base):
+    """Mes (índice) para el que se armó due_list; una sola fila"""
+    __tablename__ = 'due_list_state'
+
+    id = Column(Integer, primary_key=True)
+    current_index = Column(Integer, nullable=False)
+
+
+# Próximo mes esperado de cada cliente según su último pago
+_NEXT_DUE = """
+    SELECT c.id AS client_id, c.name AS client_name, p.month_index + 1 AS next_due_index
+    FROM clients c
+    JOIN payments p ON p.id = c.last_payment_id
+"""
+
+
+class DueListModel:
+    """Mantiene y consulta due_list"""
+
+    def __init__(self, db, session=None):
+        self.db = db
+        self.session = session if session is not None else db.get_session()
+
+    @staticmethod
+    def current_index(today=None):
+        return current_index(today)
+
+    def ensure_current(self, today=None):
+        """Hace el rollover si la lista es de un mes anterior. Retorna True si lo hizo"""
+        current = self.current_index(today)
+        state = self.session.get(DueListState, 1)
+        if state is not None and state.current_index == current:
+            return False
+        self.rollover(today)
+        return True
+
+    def rollover(self, today=None):
+        """Vuelve a armar la lista para el mes actual en una sola sentencia"""
+        current = self.current_index(today)
+        try:
+            self.session.execute(text("DELETE FROM due_list"))
+            self.session.execute(text(f"""
+                INSERT INTO due_list (client_id, client_name, next_due_index)
+                SELECT client_id, client_name, next_due_index FROM ({_NEXT_DUE})
+                WHERE next_due_index <= :current
+            """), {'current': current})
+            self.session.merge(DueListState(id=1, current_index=current))
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error rebuilding due list: {e}")
+
+    def refresh_clients(self, client_ids):
+        """
+        Actualiza la fila de los clientes indicados (después de una escritura).
+        Los clientes borrados salen de la lista.
+        """
+        client_ids = [client_id for client_id in client_ids if client_id is not None]
+        if not client_ids:
+            return
+        state = self.session.get(DueListState, 1)
+        current = state.current_index if state is not None else self.current_index()
+        try:
+            for start in range(0, len(client_ids), 500):
+                chunk = client_ids[start:start + 500]
+                params = {f"id{i}": client_id for i, client_id in enumerate(chunk)}
+                placeholders = ", ".join(f":id{i}" for i in range(len(chunk)))
+                self.session.execute(
+                    text(f"DELETE FROM due_list WHERE client_id IN ({placeholders})"), params
+                )
+                self.session.execute(text(f"""
+                    INSERT INTO due_list (client_id, client_name, next_due_index)
+                    SELECT client_id, client_name, next_due_index FROM ({_NEXT_DUE})
+                    WHERE client_id IN ({placeholders}) AND next_due_index <= :current
+                """), dict(params, current=current))
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error updating due list: {e}")
+
+    def refresh_client(self, client_id: int):
+        self.refresh_clients([client_id])
+
+    def get_due_list(self, limit: int = None):
+        """
+        Clientes que deben, del más atrasado al menos.
+        Retorna filas (client_id, nombre, mes esperado, año esperado, meses adeudados).
+        """
+        self.ensure_current()
+        state = self.session.get(DueListState, 1)
+        current = state.current_index
+        query = self.session.query(
+            DueEntry.client_id, DueEntry.client_name, DueEntry.next_due_index
+        ).order_by(DueEntry.next_due_index, DueEntry.client_name)
+        if limit:
+            query = query.limit(limit)
+        rows = []
+        for client_id, name, next_due in query:
+            year, month = from_index(next_due)
+            rows.append((client_id, name, month, year, current - next_due + 1))
+        return rows
+
+    def count(self):
+        return self.session.query(DueEntry).count()
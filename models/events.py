@@ -0,0 +1,203 @@
+"""
+Bus de eventos de cambios sobre la base de datos.
+
+El controlador publica un evento por cada escritura y las ventanas abiertas
+se suscriben para aplicar actualizaciones puntuales en lugar de volver a
+consultar todo. Las escrituras hechas por otros procesos sobre el mismo
+archivo se detectan con PRAGMA data_version y se publican como ExternalChange.
+Las escrituras propias que no pasan por una sesión (mantenimiento, reportes,
+archivado) se hacen dentro de local_writes(db) para no confundirlas con esas.
+"""
+import threading
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+from sqlalchemy import event
+
+
+@dataclass(frozen=True)
+class PaymentCreated:
+    payment_id: int
+    client_id: int
+    month: int
+    year: int
+    amount_cents: int
+    date: str
+    row: tuple  # Columnas de get_payments_page
+
+
+@dataclass(frozen=True)
+class PaymentUpdated:
+    payment_id: int
+    client_id: int
+    month: int
+    year: int
+    amount_cents: int
+    date: str
+    row: tuple
+    old_month: int
+    old_year: int
+    old_amount_cents: int
+
+
+@dataclass(frozen=True)
+class PaymentDeleted:
+    payment_id: int
+    client_id: int
+    month: int
+    year: int
+    amount_cents: int
+    date: str
+
+
+@dataclass(frozen=True)
+class ClientCreated:
+    client_id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class ClientDeleted:
+    client_id: int
+    name: str
+
+
+@dataclass(frozen=True)
+class ExternalChange:
+    """Otro proceso modificó la base; no se sabe qué filas cambiaron."""
+
+
+class EventBus:
+    """Publica eventos a los suscriptores registrados (seguro entre hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+        # Se incrementa con cada evento; sirve como versión de los datos
+        self.version = 0
+
+    def subscribe(self, callback, event_types=None):
+        """
+        Registra un callback(event). event_types limita los eventos recibidos
+        (tupla de clases); None recibe todos.
+        """
+        with self._lock:
+            self._subscribers.append((callback, event_types))
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s[0] != callback]
+
+    def publish(self, event):
+        with self._lock:
+            self.version += 1
+            subscribers = list(self._subscribers)
+
+        for callback, event_types in subscribers:
+            if event_types is not None and not isinstance(event, event_types):
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in event subscriber: {e}")
+
+
+# Vigilante de cada base (ver local_writes)
+_watchers = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def local_writes(db):
+    """
+    Marca como propios los commits hechos dentro del bloque por conexiones
+    que no son de una sesión (sqlite3 directo, BEGIN/COMMIT a mano, ...):
+    ExternalChangeWatcher no los publica como ExternalChange. Lo que otro
+    proceso escriba durante el bloque tampoco se distingue, así que el
+    bloque debe cubrir solo los commits. Sin vigilante (por ejemplo desde
+    cli.py) no hace nada.
+    """
+    watcher = _watchers.get(db)
+    if watcher is None:
+        yield
+        return
+    watcher.begin_local()
+    try:
+        yield
+    finally:
+        watcher.end_local()
+
+
+class ExternalChangeWatcher:
+    """
+    Detecta commits de otros procesos sobre el mismo archivo.
+
+    PRAGMA data_version cambia cuando otra conexión hace commit. Las escrituras
+    propias también usan otras conexiones del pool, así que antes de cada
+    commit local se revisa si hubo cambios ajenos y después se toma la nueva
+    versión como base. Lo mismo al entrar y salir de local_writes; mientras
+    hay uno abierto no se compara.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._connection = db.engine.raw_connection()
+        self._last_version = self._read_version()
+        self._pending = False
+        # Bloques local_writes abiertos (pueden ser de varios hilos)
+        self._local = 0
+        event.listen(db.Session, 'before_commit', self._before_local_commit)
+        event.listen(db.Session, 'after_commit', self._after_local_commit)
+        _watchers[db] = self
+
+    def _read_version(self):
+        cursor = self._connection.cursor()
+        try:
+            cursor.execute("PRAGMA data_version")
+            return cursor.fetchone()[0]
+        finally:
+            cursor.close()
+
+    def _before_local_commit(self, session):
+        with self._lock:
+            if not self._local and self._read_version() != self._last_version:
+                self._pending = True
+
+    def _after_local_commit(self, session):
+        with self._lock:
+            if not self._local:
+                self._last_version = self._read_version()
+
+    def begin_local(self):
+        with self._lock:
+            if not self._local and self._read_version() != self._last_version:
+                self._pending = True
+            self._local += 1
+
+    def end_local(self):
+        with self._lock:
+            self._local -= 1
+            if not self._local:
+                self._last_version = self._read_version()
+
+    def poll(self):
+        """Publica ExternalChange si hubo commits ajenos desde el último poll."""
+        with self._lock:
+            if self._local:
+                return False
+            version = self._read_version()
+            changed = self._pending or version != self._last_version
+            self._last_version = version
+            self._pending = False
+
+        if changed:
+            self.db.events.publish(ExternalChange())
+        return changed
+
+    def close(self):
+        if _watchers.get(self.db) is self:
+            del _watchers[self.db]
+        event.remove(self.db.Session, 'before_commit', self._before_local_commit)
+        event.remove(self.db.Session, 'after_commit', self._after_local_commit)
+        self._connection.close()
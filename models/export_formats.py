@@ -0,0 +1,203 @@
+"""
+Formatos de exportación: CSV y un archivo columnar compacto (.imc).
+
+Ambos escritores reciben filas por bloques (write_rows) y no guardan más que
+un bloque en memoria, así se puede exportar el historial completo.
+
+Formato .imc (columnar, parecido a Parquet en su idea):
+    MAGIC
+    grupo de filas 1: un bloque comprimido (zlib) por columna
+    grupo de filas 2: ...
+    pie JSON (esquema, filas y posición de cada bloque)
+    largo del pie (uint32 little-endian) + MAGIC
+Cada bloque de columna contiene un byte de validez por fila (0 = NULL)
+seguido de los valores: int64 / float64 little-endian, o para texto los
+largos uint32 y luego el UTF-8 concatenado. Los montos ('cents') se guardan
+como int64 en centavos; en CSV se escriben con dos decimales.
+"""
+import csv
+import json
+import struct
+import sys
+import zlib
+from array import array
+from models.money import cents_to_text
+
+MAGIC = b"IMCOL1\n"
+COLUMN_TYPES = ('int', 'float', 'cents', 'str')
+
+
+class CsvWriter:
+    """Escribe filas a CSV (UTF-8 con BOM para que Excel muestre bien los acentos)"""
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self._cents_columns = [i for i, (_, column_type) in enumerate(columns) if column_type == 'cents']
+        self._file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in columns])
+
+    def write_rows(self, rows):
+        if self._cents_columns:
+            rows = (self._format_cents(row) for row in rows)
+        self._writer.writerows(
+            ['' if value is None else value for value in row] for row in rows
+        )
+
+    def _format_cents(self, row):
+        row = list(row)
+        for col in self._cents_columns:
+            if row[col] is not None:
+                row[col] = cents_to_text(row[col])
+        return row
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _encode_column(values, column_type):
+    validity = bytes(0 if value is None else 1 for value in values)
+
+    if column_type in ('int', 'cents'):
+        body = _little_endian(array('q', (0 if v is None else int(v) for v in values)))
+    elif column_type == 'float':
+        body = _little_endian(array('d', (0.0 if v is None else float(v) for v in values)))
+    else:
+        encoded = [b'' if v is None else str(v).encode('utf-8') for v in values]
+        body = _little_endian(array('I', (len(v) for v in encoded))) + b''.join(encoded)
+
+    return zlib.compress(validity + body)
+
+
+def _decode_column(payload, column_type, rows):
+    data = zlib.decompress(payload)
+    validity, body = data[:rows], data[rows:]
+
+    if column_type in ('int', 'cents', 'float'):
+        values = array('d' if column_type == 'float' else 'q')
+        values.frombytes(body)
+        if sys.byteorder == 'big':
+            values.byteswap()
+    else:
+        lengths = array('I')
+        lengths.frombytes(body[:rows * 4])
+        if sys.byteorder == 'big':
+            lengths.byteswap()
+        text = body[rows * 4:]
+        values = []
+        offset = 0
+        for length in lengths:
+            values.append(text[offset:offset + length].decode('utf-8'))
+            offset += length
+
+    return [value if valid else None for value, valid in zip(values, validity)]
+
+
+class ColumnarWriter:
+    """Escribe filas al formato columnar .imc por grupos de row_group_size filas"""
+
+    def __init__(self, path, columns, row_group_size=10000):
+        for _, column_type in columns:
+            if column_type not in COLUMN_TYPES:
+                raise ValueError(f"Tipo de columna no soportado: {column_type}")
+        self.columns = columns
+        self.row_group_size = row_group_size
+        self._file = open(path, 'wb')
+        self._file.write(MAGIC)
+        self._buffer = []
+        self._row_groups = []
+        self._rows = 0
+
+    def write_rows(self, rows):
+        for row in rows:
+            self._buffer.append(row)
+            if len(self._buffer) >= self.row_group_size:
+                self._flush()
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        chunks = []
+        for col, (_, column_type) in enumerate(self.columns):
+            payload = _encode_column([row[col] for row in self._buffer], column_type)
+            chunks.append([self._file.tell(), len(payload)])
+            self._file.write(payload)
+        self._row_groups.append({'rows': len(self._buffer), 'columns': chunks})
+        self._rows += len(self._buffer)
+        self._buffer = []
+
+    def close(self):
+        self._flush()
+        footer = json.dumps({
+            'version': 1,
+            'rows': self._rows,
+            'columns': [{'name': name, 'type': column_type} for name, column_type in self.columns],
+            'row_groups': self._row_groups,
+        }).encode('utf-8')
+        self._file.write(footer)
+        self._file.write(struct.pack('<I', len(footer)))
+        self._file.write(MAGIC)
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarReader:
+    """Lee archivos .imc por grupo de filas"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError("El archivo no tiene formato columnar .imc")
+
+        self._file.seek(-(len(MAGIC) + 4), 2)
+        footer_length = struct.unpack('<I', self._file.read(4))[0]
+        self._file.seek(-(len(MAGIC) + 4 + footer_length), 2)
+        footer = json.loads(self._file.read(footer_length).decode('utf-8'))
+
+        self.columns = [(c['name'], c['type']) for c in footer['columns']]
+        self.num_rows = footer['rows']
+        self._row_groups = footer['row_groups']
+
+    def read_column(self, name):
+        """Recorre los valores de una sola columna sin leer las demás"""
+        col = [c[0] for c in self.columns].index(name)
+        column_type = self.columns[col][1]
+        for group in self._row_groups:
+            offset, length = group['columns'][col]
+            self._file.seek(offset)
+            yield from _decode_column(self._file.read(length), column_type, group['rows'])
+
+    def iter_rows(self):
+        for group in self._row_groups:
+            columns = []
+            for (offset, length), (_, column_type) in zip(group['columns'], self.columns):
+                self._file.seek(offset)
+                columns.append(_decode_column(self._file.read(length), column_type, group['rows']))
+            yield from zip(*columns)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,359 @@
+"""
+Mantenimiento de la base: copias de seguridad en línea, compactación y
+estadísticas para el planificador de consultas.
+
+Todo usa conexiones sqlite3 propias (no la sesión de la aplicación), así se
+puede correr en un hilo aparte mientras la interfaz sigue funcionando. Las
+operaciones largas avanzan por pasos de pocas páginas con una pausa entre
+pasos para no acaparar el disco.
+"""
+import datetime
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+
+from sqlalchemy import Column, Integer, String, Float
+from models.database import Base
+from models.events import local_writes
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+
+
+class MaintenanceRun(Base):
+    """Registro de cada tarea de mantenimiento ejecutada"""
+    __tablename__ = 'maintenance_runs'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    task = Column(String, nullable=False)
+    started_at = Column(String, nullable=False)
+    seconds = Column(Float, nullable=False)
+    success = Column(Integer, nullable=False)
+    message = Column(String, nullable=True)
+
+
+def _connect(path):
+    return sqlite3.connect(str(path), timeout=30)
+
+
+def _pragma(connection, name):
+    return connection.execute(f"PRAGMA {name}").fetchone()[0]
+
+
+def get_report(db_filename):
+    """
+    Tamaño y fragmentación de la base.
+    fragmentation es la fracción de páginas libres (espacio que VACUUM recuperaría).
+    """
+    connection = _connect(db_filename)
+    try:
+        page_size = _pragma(connection, 'page_size')
+        page_count = _pragma(connection, 'page_count')
+        freelist = _pragma(connection, 'freelist_count')
+        report = {
+            'file_bytes': Path(db_filename).stat().st_size,
+            'page_size': page_size,
+            'page_count': page_count,
+            'free_pages': freelist,
+            'free_bytes': freelist * page_size,
+            'fragmentation': freelist / page_count if page_count else 0.0,
+            'auto_vacuum': AUTO_VACUUM_MODES.get(_pragma(connection, 'auto_vacuum'), '?'),
+            'journal_mode': _pragma(connection, 'journal_mode'),
+        }
+    finally:
+        connection.close()
+    return report
+
+
+def format_report(report):
+    """Reporte legible (una línea por dato)"""
+    return "\n".join([
+        f"Tamaño del archivo: {report['file_bytes'] / 1024 / 1024:,.2f} MB",
+        f"Páginas: {report['page_count']:,} de {report['page_size']:,} bytes",
+        f"Páginas libres: {report['free_pages']:,} ({report['free_bytes'] / 1024 / 1024:,.2f} MB, "
+        f"{report['fragmentation'] * 100:.1f}%)",
+        f"auto_vacuum: {report['auto_vacuum']}  journal_mode: {report['journal_mode']}",
+    ])
+
+
+def backup(db_filename, target, pages_per_step=256, pause=0.05, progress=None):
+    """
+    Copia en línea con la API de backup de SQLite, de a pages_per_step
+    páginas con una pausa entre pasos. La aplicación puede seguir leyendo y
+    escribiendo mientras tanto (si otra conexión escribe, SQLite retoma la
+    copia para que quede consistente).
+    progress(copied_pages, total_pages) se llama después de cada paso.
+    """
+    source = _connect(db_filename)
+    destination = sqlite3.connect(str(target))
+
+    def step(status, remaining, total):
+        if progress:
+            progress(total - remaining, total)
+        if remaining and pause:
+            time.sleep(pause)
+
+    try:
+        source.backup(destination, pages=pages_per_step, progress=step)
+    finally:
+        destination.close()
+        source.close()
+
+
+def vacuum_into(db_filename, target):
+    """Copia compactada (sin páginas libres) en un solo paso"""
+    connection = _connect(db_filename)
+    try:
+        connection.execute("VACUUM INTO ?", (str(target),))
+    finally:
+        connection.close()
+
+
+def enable_incremental_vacuum(db_filename):
+    """
+    Pasa la base a auto_vacuum = INCREMENTAL. Requiere un VACUUM completo,
+    que bloquea la base: usar con la aplicación cerrada.
+    """
+    connection = _connect(db_filename)
+    try:
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("VACUUM")
+    finally:
+        connection.close()
+
+
+def incremental_vacuum(db_filename, pages_per_step=256, pause=0.05, local=nullcontext):
+    """
+    Devuelve las páginas libres al sistema de a pages_per_step por vez.
+    Solo tiene efecto con auto_vacuum = INCREMENTAL. Retorna páginas liberadas.
+    local(): contexto de cada paso con commit (ver models.events.local_writes).
+    """
+    connection = _connect(db_filename)
+    freed = 0
+    try:
+        if _pragma(connection, 'auto_vacuum') != 2:
+            return 0
+        while True:
+            free = _pragma(connection, 'freelist_count')
+            if not free:
+                break
+            with local():
+                connection.execute(f"PRAGMA incremental_vacuum({int(pages_per_step)})").fetchall()
+                connection.commit()
+            freed += free - _pragma(connection, 'freelist_count')
+            time.sleep(pause)
+    finally:
+        connection.close()
+    return freed
+
+
+def optimize(db_filename, full=False):
+    """
+    Actualiza las estadísticas del planificador. Por defecto PRAGMA optimize
+    con analysis_limit (acotado); full=True corre ANALYZE completo.
+    """
+    connection = _connect(db_filename)
+    try:
+        if full:
+            connection.execute("ANALYZE")
+        else:
+            connection.execute("PRAGMA analysis_limit = 1000")
+            connection.execute("PRAGMA optimize")
+        connection.commit()
+    finally:
+        connection.close()
+
+
+class MaintenanceService:
+    """
+    Ejecuta las tareas de mantenimiento (de a una) y registra cada corrida.
+    start() las programa en un hilo en segundo plano:
+    - copia de seguridad una vez por día (se guardan las últimas `keep`);
+    - PRAGMA optimize una vez por día;
+    - incremental_vacuum cuando la fragmentación supera FRAGMENTATION_LIMIT;
+    - actualización de las vistas de reportes cada REPORTS_EVERY.
+    """
+
+    BACKUP_EVERY = datetime.timedelta(days=1)
+    OPTIMIZE_EVERY = datetime.timedelta(days=1)
+    REPORTS_EVERY = datetime.timedelta(hours=1)
+    FRAGMENTATION_LIMIT = 0.2
+
+    def __init__(self, db, backup_dir=None, keep=7, pages_per_step=256, pause=0.05):
+        self.db = db
+        main = Path(db.db_filename)
+        self.backup_dir = Path(backup_dir) if backup_dir else main.parent / 'backups'
+        self.keep = keep
+        self.pages_per_step = pages_per_step
+        self.pause = pause
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _record(self, task, started, success, message):
+        session = self.db.Session()
+        try:
+            session.add(MaintenanceRun(
+                task=task,
+                started_at=started.isoformat(timespec='seconds'),
+                seconds=(datetime.datetime.now() - started).total_seconds(),
+                success=1 if success else 0,
+                message=message,
+            ))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error recording maintenance run: {e}")
+        finally:
+            session.close()
+
+    def _run(self, task, job):
+        """Corre job() -> mensaje bajo el lock y lo registra. Retorna (success, message)"""
+        with self._lock:
+            started = datetime.datetime.now()
+            try:
+                message = job()
+                success = True
+            except Exception as e:
+                print(f"Error in maintenance task {task}: {e}")
+                message = f"Error: {e}"
+                success = False
+            self._record(task, started, success, message)
+            return success, message
+
+    def last_run(self, task):
+        """Fecha de la última corrida exitosa de la tarea, o None"""
+        session = self.db.Session()
+        try:
+            row = session.query(MaintenanceRun.started_at).filter_by(
+                task=task, success=1
+            ).order_by(MaintenanceRun.id.desc()).first()
+            return datetime.datetime.fromisoformat(row[0]) if row else None
+        finally:
+            session.close()
+
+    def run_backup(self, target_dir=None, vacuum=False, progress=None):
+        """
+        Copia la base (y los archivos de años archivados) a una carpeta nueva.
+        vacuum=True usa VACUUM INTO (copia compactada, en un solo paso).
+        """
+        from models.archive import ArchiveModel
+
+        def job():
+            main = Path(self.db.db_filename)
+            stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+            folder = Path(target_dir) if target_dir else self.backup_dir / f"{main.stem}_{stamp}"
+            folder.mkdir(parents=True, exist_ok=True)
+
+            if vacuum:
+                vacuum_into(main, folder / main.name)
+            else:
+                backup(main, folder / main.name, self.pages_per_step, self.pause, progress)
+
+            # Los años archivados no cambian: alcanza con copiar el archivo
+            session = self.db.Session()
+            try:
+                archives = list(ArchiveModel(self.db, session).iter_archive_files())
+            finally:
+                session.close()
+            for _, path in archives:
+                if path.exists():
+                    shutil.copy2(path, folder / path.name)
+
+            if not target_dir:
+                self._prune_backups()
+            return f"Copia guardada en {folder}"
+
+        return self._run('vacuum_into' if vacuum else 'backup', job)
+
+    def _prune_backups(self):
+        """Borra las carpetas de copia más viejas, dejando las últimas `keep`"""
+        stem = Path(self.db.db_filename).stem
+        folders = sorted(p for p in self.backup_dir.glob(f"{stem}_*") if p.is_dir())
+        for folder in folders[:-self.keep] if self.keep else []:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    def run_compact(self):
+        def job():
+            before = get_report(self.db.db_filename)
+            if before['auto_vacuum'] != 'incremental':
+                return (f"auto_vacuum es '{before['auto_vacuum']}': no se puede compactar en línea "
+                        f"({before['free_pages']:,} páginas libres)")
+            freed = incremental_vacuum(
+                self.db.db_filename, self.pages_per_step, self.pause, lambda: local_writes(self.db)
+            )
+            return f"{freed:,} páginas liberadas"
+
+        return self._run('incremental_vacuum', job)
+
+    def run_optimize(self, full=False):
+        def job():
+            with local_writes(self.db):
+                optimize(self.db.db_filename, full)
+            return "ANALYZE completo" if full else "PRAGMA optimize"
+
+        return self._run('analyze' if full else 'optimize', job)
+
+    def run_reports(self, full=False):
+        """Actualiza las vistas materializadas de reportes (ver models.reports)"""
+        from models.reports import ReportModel
+
+        def job():
+            session = self.db.Session()
+            try:
+                success, message = ReportModel(self.db, session).refresh(full)
+            finally:
+                session.close()
+            if not success:
+                raise RuntimeError(message)
+            return message
+
+        return self._run('reports_full' if full else 'reports', job)
+
+    def run_due(self):
+        """Corre las tareas que ya tocan. Retorna la lista de (tarea, success, message)"""
+        now = datetime.datetime.now()
+        results = []
+
+        last = self.last_run('backup')
+        if last is None or now - last >= self.BACKUP_EVERY:
+            results.append(('backup',) + self.run_backup())
+
+        last = self.last_run('optimize')
+        if last is None or now - last >= self.OPTIMIZE_EVERY:
+            results.append(('optimize',) + self.run_optimize())
+
+        last = self.last_run('reports')
+        if last is None or now - last >= self.REPORTS_EVERY:
+            results.append(('reports',) + self.run_reports())
+
+        report = get_report(self.db.db_filename)
+        if report['auto_vacuum'] == 'incremental' and report['fragmentation'] > self.FRAGMENTATION_LIMIT:
+            results.append(('incremental_vacuum',) + self.run_compact())
+
+        return results
+
+    def start(self, check_every=3600, first_delay=60):
+        """Revisa cada check_every segundos (en un hilo) si hay tareas pendientes"""
+        if self._thread is not None:
+            return
+
+        def loop():
+            if self._stop.wait(first_delay):
+                return
+            while True:
+                self.run_due()
+                if self._stop.wait(check_every):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name='maintenance', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,176 @@
+"""
+Métricas de rendimiento en memoria, una instancia por base (get_metrics).
+
+Los modelos y el controlador las actualizan mientras trabajan:
+- observe(nombre, segundos): duración de una consulta u operación; se
+  guardan las últimas SAMPLES de cada una para calcular p50 / p95 (el
+  decorador timed lo hace para un método entero);
+- increment(nombre): contadores (commits, búsquedas...).
+
+Registrar cuesta un perf_counter y un append, así que queda siempre
+activo. Los cálculos (percentiles, tamaños de archivo, memoria) se hacen
+recién en snapshot(), cuando alguien los mira (ver gui/diagnostics.py).
+"""
+import functools
+import os
+import sys
+import threading
+import time
+import weakref
+from collections import deque
+from sqlalchemy import event
+
+# Un registro por instancia de Database
+_registries = weakref.WeakKeyDictionary()
+_registries_lock = threading.Lock()
+
+
+def percentile(ordered, fraction):
+    """Percentil (0..1) de una lista ya ordenada, por el rango más cercano"""
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def process_memory():
+    """Memoria residente del proceso en bytes, o None si no se puede saber"""
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [
+                (field, ctypes.c_size_t) for field in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                    'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                    'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage',
+                )
+            ]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.WorkingSetSize
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Máximo alcanzado (no el actual); en macOS viene en bytes, en el resto en KiB
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class MetricsRegistry:
+    """Contadores y duraciones recientes de una base"""
+
+    # Duraciones guardadas por nombre para los percentiles
+    SAMPLES = 1000
+
+    def __init__(self, db):
+        self.db = db
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._samples = {}
+        self._calls = {}
+
+        # Commits de cualquier conexión del engine principal (ventanas,
+        # PaymentWriter, mantenimiento)
+        event.listen(db.engine, 'commit', lambda connection: self.increment('commits'))
+
+    def increment(self, name: str, amount: int = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.SAMPLES)
+                self._calls[name] = 0
+            samples.append(seconds)
+            self._calls[name] += 1
+
+    def counter(self, name: str):
+        return self._counters.get(name, 0)
+
+    def timings(self):
+        """{nombre: (llamadas, p50, p95, máximo)} en segundos, sobre las últimas SAMPLES"""
+        with self._lock:
+            samples = {name: sorted(values) for name, values in self._samples.items()}
+            calls = dict(self._calls)
+        return {
+            name: (calls[name], percentile(ordered, 0.5), percentile(ordered, 0.95), ordered[-1])
+            for name, ordered in samples.items()
+        }
+
+    def storage(self):
+        """Tamaño en bytes de la base y de su WAL (0 si no hay)"""
+        if self.db.db_filename == ':memory:':
+            return {'database': 0, 'wal': 0}
+        sizes = {}
+        for key, path in (('database', self.db.db_filename), ('wal', self.db.db_filename + '-wal')):
+            try:
+                sizes[key] = os.path.getsize(path)
+            except OSError:
+                sizes[key] = 0
+        return sizes
+
+    def snapshot(self):
+        """
+        Estado actual: counters, timings (ver timings()), storage, memory
+        (residente y bloques de Python), caches {nombre: (aciertos, consultas)}
+        y uptime en segundos.
+        """
+        from models.money import format_cents
+        from models.name_index import _indexes
+
+        with self._lock:
+            counters = dict(self._counters)
+        info = format_cents.cache_info()
+        caches = {'amounts': (info.hits, info.hits + info.misses)}
+        index = _indexes.get(self.db)
+        if index is not None:
+            caches['names'] = (index.found, index.searches)
+        return {
+            'counters': counters,
+            'timings': self.timings(),
+            'storage': self.storage(),
+            'memory': {'resident': process_memory(), 'blocks': sys.getallocatedblocks()},
+            'caches': caches,
+            'uptime': time.monotonic() - self.started,
+        }
+
+
+def get_metrics(db):
+    """Obtiene (o crea) el registro de métricas de una base"""
+    registry = _registries.get(db)
+    if registry is None:
+        # Los modelos corren también en otros hilos (ver async_dal)
+        with _registries_lock:
+            registry = _registries.get(db)
+            if registry is None:
+                registry = MetricsRegistry(db)
+                _registries[db] = registry
+    return registry
+
+
+def timed(name: str):
+    """Decorador para métodos de modelos/controladores (con self.db): registra la duración"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                get_metrics(self.db).observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
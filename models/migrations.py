@@ -0,0 +1,128 @@
+"""
+Migraciones de esquema para bases existentes.
+
+La versión del esquema se guarda en PRAGMA user_version. Una base nueva se
+crea directamente con el esquema actual (create_all) y queda marcada con la
+última versión; una base existente aplica en orden las migraciones que le
+falten, cada una en su propia transacción.
+"""
+from sqlalchemy import text
+
+
+def get_schema_version(connection):
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def set_schema_version(connection, version):
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def migrate_amount_to_cents(connection):
+    """payments.amount (REAL) -> payments.amount_cents (INTEGER)"""
+    # legacy_alter_table evita que SQLite reescriba la FK de clients.last_payment_id
+    # para que apunte a la tabla renombrada
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    connection.exec_driver_sql("ALTER TABLE payments RENAME TO payments_old")
+    connection.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+
+    # DDL explícito (y no Payment.__table__) para que la migración no cambie
+    # cuando el modelo agregue columnas en versiones posteriores
+    connection.exec_driver_sql("""
+        CREATE TABLE payments (
+            id INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            date VARCHAR NOT NULL,
+            amount_cents INTEGER NOT NULL,
+            month INTEGER NOT NULL,
+            year INTEGER NOT NULL,
+            description VARCHAR,
+            PRIMARY KEY (id),
+            CONSTRAINT _client_month_year_uc UNIQUE (client_id, month, year),
+            FOREIGN KEY(client_id) REFERENCES clients (id)
+        )
+    """)
+    connection.execute(text("""
+        INSERT INTO payments (id, client_id, date, amount_cents, month, year, description)
+        SELECT id, client_id, date, CAST(ROUND(amount * 100) AS INTEGER), month, year, description
+        FROM payments_old
+    """))
+    connection.exec_driver_sql("DROP TABLE payments_old")
+
+
+def add_sort_indexes(connection):
+    """Índices para ordenar la tabla de pagos de un mes/año desde la base"""
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_payments_period_amount ON payments (year, month, amount_cents)"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_payments_period_date ON payments (year, month, date)"
+    )
+
+
+def add_row_versions(connection):
+    """Columna version en payments y clients (escrituras condicionadas, ver PaymentModel)"""
+    connection.exec_driver_sql("ALTER TABLE payments ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    connection.exec_driver_sql("ALTER TABLE clients ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+def add_month_index(connection):
+    """
+    payments.month_index (year * 12 + month - 1) como columna generada
+    virtual: no ocupa lugar en la tabla y se mantiene sola; el índice
+    (client_id, month_index) resuelve "último pago" y la secuencia de meses.
+    """
+    connection.exec_driver_sql(
+        "ALTER TABLE payments ADD COLUMN month_index INTEGER "
+        "GENERATED ALWAYS AS (year * 12 + month - 1) VIRTUAL"
+    )
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_payments_client_month_index ON payments (client_id, month_index)"
+    )
+
+
+def add_report_triggers(connection):
+    """
+    Triggers de payments que anotan los meses a recalcular en las vistas de
+    reportes (ver models.reports); las tablas las crea create_all.
+    """
+    from models.reports import create_report_triggers
+
+    create_report_triggers(connection)
+
+
+# (versión, función) en orden; cada función recibe una conexión en transacción
+MIGRATIONS = [
+    (1, migrate_amount_to_cents),
+    (2, add_sort_indexes),
+    (3, add_row_versions),
+    (4, add_month_index),
+    (5, add_report_triggers),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def run_migrations(engine):
+    """Aplica las migraciones pendientes. Retorna la lista de versiones aplicadas."""
+    applied = []
+    with engine.connect() as connection:
+        current = get_schema_version(connection)
+
+    for version, migration in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.connect() as connection:
+            # pysqlite no abre transacción antes de DDL; BEGIN explícito para
+            # que la migración sea todo o nada
+            connection.exec_driver_sql("BEGIN")
+            try:
+                migration(connection)
+                set_schema_version(connection, version)
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        applied.append(version)
+        print(f"Migración de esquema aplicada: versión {version} ({migration.__name__})")
+
+    return applied
@@ -0,0 +1,43 @@
+"""
+Montos en centavos (enteros).
+
+Los pagos se guardan como centavos para que sumas y restas sean exactas;
+estas funciones convierten desde el texto que escribe el usuario y hacia
+el formato que se muestra en pantalla.
+"""
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from functools import lru_cache
+
+
+def to_cents(value):
+    """
+    Convierte un monto (texto, int, float o Decimal) a centavos.
+    Lanza ValueError si el valor no es un número.
+    """
+    try:
+        amount = Decimal(str(value).strip().replace(',', '.'))
+    except InvalidOperation:
+        raise ValueError(f"Monto inválido: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Monto inválido: {value!r}")
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def cents_to_text(cents):
+    """Centavos -> texto editable sin separador de miles ('1234.50')"""
+    sign = '-' if cents < 0 else ''
+    units, rest = divmod(abs(int(cents)), 100)
+    return f"{sign}{units}.{rest:02d}"
+
+
+@lru_cache(maxsize=4096)
+def format_cents(cents):
+    """
+    Centavos -> texto de moneda ('$1,234.50').
+    Los montos se repiten mucho (cuotas fijas), por eso se cachea.
+    """
+    if cents is None:
+        cents = 0
+    sign = '-' if cents < 0 else ''
+    units, rest = divmod(abs(int(cents)), 100)
+    return f"{sign}${units:,}.{rest:02d}"
@@ -0,0 +1,47 @@
+"""
+Aritmética de meses.
+
+Un mes se representa con un entero, month_index = year * 12 + (month - 1):
+meses consecutivos son enteros consecutivos, así "mes siguiente", "meses de
+atraso" u ordenar por período son operaciones con un solo número en lugar
+de pares (año, mes) con casos especiales para diciembre.
+
+La misma expresión está en la base como columna generada e indexada
+(payments.month_index, ver MONTH_INDEX_SQL).
+"""
+import datetime
+
+# Expresión SQL de payments.month_index (columna generada)
+MONTH_INDEX_SQL = "year * 12 + month - 1"
+
+
+def month_index(year: int, month: int):
+    """(2026, 1) -> 24312"""
+    return int(year) * 12 + (int(month) - 1)
+
+
+def from_index(index: int):
+    """Índice de mes -> (año, mes)"""
+    year, month = divmod(int(index), 12)
+    return year, month + 1
+
+
+def add_months(year: int, month: int, count: int):
+    """(año, mes) desplazado count meses (count puede ser negativo)"""
+    return from_index(month_index(year, month) + count)
+
+
+def next_month(year: int, month: int):
+    """(año, mes) siguiente: (2025, 12) -> (2026, 1)"""
+    return add_months(year, month, 1)
+
+
+def months_between(year_from: int, month_from: int, year_to: int, month_to: int):
+    """Meses desde (year_from, month_from) hasta (year_to, month_to)"""
+    return month_index(year_to, month_to) - month_index(year_from, month_from)
+
+
+def current_index(today=None):
+    """Índice del mes actual (o del de today)"""
+    today = today or datetime.date.today()
+    return month_index(today.year, today.month)
@@ -0,0 +1,242 @@
+"""
+Índice de nombres de clientes para el autocompletado.
+
+Uno solo por base, compartido por todas las ventanas (get_name_index). Se
+carga una vez y se mantiene con los eventos ClientCreated / ClientDeleted.
+
+- _keys: nombres normalizados (minúsculas, sin acentos) ordenados; el id
+  de un nombre es su posición, así recorrer ids en orden es recorrer en
+  orden alfabético.
+- _words: (palabra, id) ordenado, para "empieza con" en cualquier palabra.
+- _postings: trigrama -> ids (array ordenado), para "contiene".
+
+Las altas posteriores a la carga van a una lista chica (_added) que se
+recorre entera; las bajas marcan el id como borrado. Cuando se juntan
+REBUILD_AT cambios se vuelve a armar todo.
+
+search() devuelve primero los nombres que empiezan con el texto, después
+los que tienen una palabra que empieza con el texto y al final los que lo
+contienen en cualquier lugar.
+"""
+import threading
+import unicodedata
+import weakref
+from array import array
+from collections import defaultdict
+from bisect import bisect_left
+
+# Un índice por instancia de Database
+_indexes = weakref.WeakKeyDictionary()
+
+
+class _StripMarks(dict):
+    """Tabla para str.translate que quita las marcas (acentos) de NFKD"""
+
+    def __missing__(self, codepoint):
+        value = None if unicodedata.combining(chr(codepoint)) else codepoint
+        self[codepoint] = value
+        return value
+
+
+_STRIP_MARKS = _StripMarks()
+
+
+def normalize(text: str):
+    """Minúsculas y sin acentos ('García' -> 'garcia')"""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    return unicodedata.normalize('NFKD', text).translate(_STRIP_MARKS)
+
+
+def trigrams(key: str):
+    return {key[i:i + 3] for i in range(len(key) - 2)}
+
+
+class NameIndex:
+    """Búsqueda de los K mejores nombres para un texto"""
+
+    REBUILD_AT = 2000
+
+    def __init__(self, names=()):
+        self._lock = threading.RLock()
+        self.loaded = False
+        # Búsquedas y cuántas encontraron algún nombre (ver models.metrics)
+        self.searches = 0
+        self.found = 0
+        self._build(names)
+
+    def _build(self, names):
+        pairs = sorted((normalize(name), name) for name in set(names))
+        self._keys = [key for key, _ in pairs]
+        self._names = [name for _, name in pairs]
+        self._removed = set()
+        self._added = []
+
+        words = []
+        postings = defaultdict(list)
+        for name_id, key in enumerate(self._keys):
+            words.extend((word, name_id) for word in key.split()[1:])
+            for gram in {key[i:i + 3] for i in range(len(key) - 2)}:
+                postings[gram].append(name_id)
+        words.sort()
+        self._words = words
+        self._postings = {gram: array('i', ids) for gram, ids in postings.items()}
+
+    def load(self, names):
+        with self._lock:
+            self._build(names)
+            self.loaded = True
+
+    def __len__(self):
+        return len(self._keys) - len(self._removed) + len(self._added)
+
+    def names(self):
+        """Todos los nombres, en orden alfabético (normalizado)"""
+        with self._lock:
+            live = [(key, name) for name_id, (key, name) in enumerate(zip(self._keys, self._names))
+                    if name_id not in self._removed]
+            live.extend((normalize(name), name) for name in self._added)
+            return [name for _, name in sorted(live)]
+
+    def _find_id(self, name):
+        key = normalize(name)
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and self._keys[position] == key:
+            if self._names[position] == name:
+                return position
+            position += 1
+        return None
+
+    def add(self, name: str):
+        with self._lock:
+            name_id = self._find_id(name)
+            if name_id is not None:
+                self._removed.discard(name_id)
+            elif name not in self._added:
+                self._added.append(name)
+            self._maybe_rebuild()
+
+    def remove(self, name: str):
+        with self._lock:
+            if name in self._added:
+                self._added.remove(name)
+                return
+            name_id = self._find_id(name)
+            if name_id is not None:
+                self._removed.add(name_id)
+            self._maybe_rebuild()
+
+    def _maybe_rebuild(self):
+        if len(self._added) + len(self._removed) >= self.REBUILD_AT:
+            self._build(self.names())
+
+    def search(self, text: str, limit: int = 10):
+        """Hasta limit nombres que contienen text, los más relevantes primero"""
+        query = normalize(text).strip()
+        if not query:
+            return []
+        with self._lock:
+            # (rango, clave, nombre): 0 empieza con, 1 una palabra empieza con, 2 contiene
+            found = {}
+
+            def take(name_id, rank):
+                if name_id in self._removed or name_id in found:
+                    return
+                found[name_id] = (rank, self._keys[name_id], self._names[name_id])
+
+            keys = self._keys
+            position = bisect_left(keys, query)
+            while position < len(keys) and keys[position].startswith(query) and len(found) < limit:
+                take(position, 0)
+                position += 1
+
+            if len(found) < limit:
+                words = self._words
+                position = bisect_left(words, (query,))
+                while position < len(words) and words[position][0].startswith(query) and len(found) < limit:
+                    take(words[position][1], 1)
+                    position += 1
+
+            if len(found) < limit:
+                for name_id in self._contains(query):
+                    take(name_id, 2)
+                    if len(found) >= limit:
+                        break
+
+            results = list(found.values())
+            results.extend(self._search_added(query))
+            results.sort()
+            self.searches += 1
+            if results:
+                self.found += 1
+            return [name for _, _, name in results[:limit]]
+
+    def _contains(self, query):
+        """Ids (en orden alfabético) de los nombres que contienen query"""
+        keys = self._keys
+        if len(query) < 3:
+            # Sin trigramas: se recorre en orden y se corta al llegar a limit
+            return (name_id for name_id, key in enumerate(keys) if query in key)
+        lists = [self._postings.get(gram) for gram in trigrams(query)]
+        if any(ids is None for ids in lists):
+            return iter(())
+        shortest = min(lists, key=len)
+        return (name_id for name_id in shortest if query in keys[name_id])
+
+    def _search_added(self, query):
+        results = []
+        for name in self._added:
+            key = normalize(name)
+            if key.startswith(query):
+                rank = 0
+            elif any(word.startswith(query) for word in key.split()[1:]):
+                rank = 1
+            elif query in key:
+                rank = 2
+            else:
+                continue
+            results.append((rank, key, name))
+        return results
+
+
+def _shared_index(db):
+    index = _indexes.get(db)
+    if index is None:
+        from models.events import ClientCreated, ClientDeleted, ExternalChange
+
+        index = NameIndex()
+        _indexes[db] = index
+
+        def on_event(event):
+            if isinstance(event, ClientCreated):
+                index.add(event.name)
+            elif isinstance(event, ClientDeleted):
+                index.remove(event.name)
+            elif isinstance(event, ExternalChange):
+                # Otro proceso cambió la base: se recarga en el próximo uso
+                index.loaded = False
+
+        db.events.subscribe(on_event, (ClientCreated, ClientDeleted, ExternalChange))
+    return index
+
+
+def get_name_index(db):
+    """
+    Obtiene el índice compartido de una base. Se carga la primera vez que se
+    pide (salvo que ya se haya cargado con preload_name_index) y se
+    actualiza con los eventos de la base.
+    """
+    index = _shared_index(db)
+    if not index.loaded:
+        from models.client import ClientModel
+        index.load(ClientModel(db).get_all_names())
+    return index
+
+
+def preload_name_index(db, names):
+    """Carga el índice con nombres ya consultados (por ejemplo en paralelo)"""
+    index = _shared_index(db)
+    if not index.loaded:
+        index.load(names)
+    return index
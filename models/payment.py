@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, UniqueConstraint, func, extract, cast
+from sqlalchemy import (
+    Column, Integer, String, ForeignKey, UniqueConstraint, Index, Computed, func, case, extract, cast, tuple_, select, union_all, literal,
+    bindparam
+)
 from sqlalchemy.orm import relationship
 import datetime
 import sys
@@ -6,6 +9,9 @@ from pathlib import Path
 
 sys.path.append(str(Path(__file__).parent.parent))
 from models.database import Base
+from models.archive import ArchiveModel, ArchivedTotal, archive_payments_table
+from models.months import MONTH_INDEX_SQL
+from models.metrics import timed
 
 
 class Payment(Base):
@@ -15,26 +21,54 @@ class Payment(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     client_id = Column(Integer, ForeignKey('clients.id'), nullable=False)
     date = Column(String, nullable=False)
-    amount = Column(Float, nullable=False)
+    amount_cents = Column(Integer, nullable=False)  # Monto en centavos
     month = Column(Integer, nullable=False)
     year = Column(Integer, nullable=False)
     description = Column(String, nullable=True)
+    # Aumenta con cada modificación; las escrituras desde la pantalla la
+    # comparan con la versión que se leyó (ver update_payment)
+    version = Column(Integer, nullable=False, default=1, server_default='1')
+    # Período como un solo entero (ver models.months); la calcula SQLite
+    month_index = Column(Integer, Computed(MONTH_INDEX_SQL, persisted=False))
 
     # Relación con Client
     client = relationship('Client', back_populates='payments', foreign_keys=[client_id])
 
-    # Constraint de unicidad
+    # Constraint de unicidad e índices para ordenar dentro de un mes/año
+    # (SQLite agrega el id al final de cada índice, así que también sirven
+    # para el desempate por id)
     __table_args__ = (
         UniqueConstraint('client_id', 'month', 'year', name='_client_month_year_uc'),
+        Index('ix_payments_period_amount', 'year', 'month', 'amount_cents'),
+        Index('ix_payments_period_date', 'year', 'month', 'date'),
+        Index('ix_payments_client_month_index', 'client_id', 'month_index'),
     )
 
 
+class VersionConflict(Exception):
+    """La fila cambió (otra ventana u otra sucursal) desde que se leyó su versión"""
+
+    def __init__(self, table, row_id):
+        super().__init__(f"{table} {row_id} fue modificado por otro usuario")
+        self.table = table
+        self.row_id = row_id
+
+
+# Sentencias ya armadas de las lecturas frecuentes, por forma del filtro
+# (qué filtros vienen, orden, cursor, archivos adjuntos). Los valores van
+# como parámetros: cada llamada reutiliza la sentencia y su SQL compilado
+# en lugar de volver a construir la consulta (ver benchmark.py)
+_statements = {}
+
+
 class PaymentModel:
     """Modelo para operaciones CRUD de pagos"""
 
-    def __init__(self, db):
+    def __init__(self, db, session=None):
         self.db = db
-        self.session = db.get_session()
+        # Por defecto se usa la sesión compartida; los trabajos en segundo
+        # plano pasan una sesión propia
+        self.session = session if session is not None else db.get_session()
 
     def get_payment_by_id(self, payment_id: int):
         """Obtiene un pago por ID. Retorna diccionario con datos o None."""
@@ -42,11 +76,13 @@ class PaymentModel:
 
         result = self.session.query(
             Client.name,
-            Payment.amount,
+            Payment.amount_cents,
             Payment.month,
             Payment.year,
             Payment.client_id,
-            Payment.description
+            Payment.description,
+            Payment.date,
+            Payment.version
         ).join(
             Client, Payment.client_id == Client.id
         ).filter(
@@ -56,26 +92,55 @@ class PaymentModel:
         if result:
             return {
                 'name': result[0],
-                'amount': result[1],
+                'amount_cents': result[1],
                 'month': result[2],
                 'year': result[3],
                 'client_id': result[4],
-                'description': result[5]
+                'description': result[5],
+                'date': result[6],
+                'version': result[7]
             }
         return None
 
+    def get_payment_row(self, payment_id: int):
+        """Obtiene un pago con las mismas columnas que get_payments_page, o None."""
+        from models.client import Client
+
+        return self.session.query(
+            Payment.id.label('PagoID'),
+            Client.name.label('Cliente'),
+            Payment.amount_cents.label('Monto'),
+            Payment.date.label('Fecha de Pago'),
+            Payment.description.label('Descripcion'),
+            Payment.month.label('Mes'),
+            Payment.year.label('Año'),
+            Payment.version.label('Versión')
+        ).join(
+            Client, Payment.client_id == Client.id
+        ).filter(
+            Payment.id == payment_id
+        ).first()
+
+    @timed('payments.check_duplicate_payment')
     def check_duplicate_payment(self, client_id: int, month: int, year: int, exclude_id: int = None):
         """Verifica si existe un pago duplicado."""
-        query = self.session.query(Payment).filter_by(
-            client_id=client_id,
-            month=month,
-            year=year
-        )
+        key = ('duplicate', bool(exclude_id))
+        statement = _statements.get(key)
+        if statement is None:
+            payments = Payment.__table__
+            statement = select(payments.c.id).where(
+                payments.c.client_id == bindparam('client_id'),
+                payments.c.month == bindparam('month'),
+                payments.c.year == bindparam('year'),
+            )
+            if exclude_id:
+                statement = statement.where(payments.c.id != bindparam('exclude_id'))
+            statement = _statements[key] = statement.limit(1)
 
+        params = {'client_id': client_id, 'month': month, 'year': year}
         if exclude_id:
-            query = query.filter(Payment.id != exclude_id)
-
-        return query.first() is not None
+            params['exclude_id'] = exclude_id
+        return self.session.execute(statement, params).first() is not None
 
     def get_last_payment_info(self, payment_id: int):
         """Obtiene mes y año del último pago."""
@@ -84,18 +149,24 @@ class PaymentModel:
             return payment.month, payment.year
         return None, None
 
-    def create_payment(self, client_id: int, amount: float, month: int, year: int, description: str = ""):
-        """Crea un nuevo pago. Retorna el ID del pago creado o None si falla."""
+    def create_payment(self, client_id: int, amount_cents: int, month: int, year: int, description: str = ""):
+        """Crea un nuevo pago (monto en centavos). Retorna el ID del pago creado o None si falla."""
         try:
             today = datetime.date.today().isoformat()
             payment = Payment(
                 client_id=client_id,
                 date=today,
-                amount=amount,
+                amount_cents=amount_cents,
                 month=month,
                 year=year,
                 description=description
             )
+            # Los ids nuevos quedan por encima de los ya archivados
+            archived_max = ArchiveModel(self.db, self.session).max_archived_id()
+            if archived_max:
+                current_max = self.session.query(func.max(Payment.id)).scalar() or 0
+                if current_max < archived_max:
+                    payment.id = archived_max + 1
             self.session.add(payment)
             self.session.commit()
             return payment.id
@@ -104,45 +175,69 @@ class PaymentModel:
             print(f"Error creating payment: {e}")
             return None
 
-    def update_payment(self, payment_id: int, amount: float, month: int, year: int, description: str = ""):
-        """Actualiza un pago existente."""
+    def get_payment_version(self, payment_id: int):
+        """Versión actual de un pago, o None si no existe."""
+        return self.session.query(Payment.version).filter_by(id=payment_id).scalar()
+
+    def update_payment(self, payment_id: int, amount_cents: int, month: int, year: int, description: str = "",
+                       expected_version: int = None):
+        """
+        Actualiza un pago existente (monto en centavos).
+        Con expected_version es un compare-and-swap: solo actualiza si la
+        versión no cambió desde que se leyó y, si cambió, lanza
+        VersionConflict. Cada actualización aumenta la versión.
+        """
         try:
-            payment = self.session.query(Payment).filter_by(id=payment_id).first()
-            if payment:
-                payment.amount = amount
-                payment.month = month
-                payment.year = year
-                payment.description = description
+            query = self.session.query(Payment).filter(Payment.id == payment_id)
+            if expected_version is not None:
+                query = query.filter(Payment.version == expected_version)
+            updated = query.update({
+                Payment.amount_cents: amount_cents,
+                Payment.month: month,
+                Payment.year: year,
+                Payment.description: description,
+                Payment.version: Payment.version + 1,
+            }, synchronize_session='fetch')
+            if updated:
                 self.session.commit()
                 return True
-            return False
+            self.session.rollback()
         except Exception as e:
             self.session.rollback()
             print(f"Error updating payment: {e}")
             return False
+        if expected_version is not None and self.get_payment_version(payment_id) is not None:
+            raise VersionConflict('payments', payment_id)
+        return False
 
-    def delete_payment(self, payment_id: int):
-        """Elimina un pago y retorna el client_id asociado."""
+    def delete_payment(self, payment_id: int, expected_version: int = None):
+        """
+        Elimina un pago y retorna el client_id asociado.
+        Con expected_version solo lo elimina si no cambió (ver update_payment).
+        """
         try:
-            payment = self.session.query(Payment).filter_by(id=payment_id).first()
-            if payment:
-                client_id = payment.client_id
-                self.session.delete(payment)
+            query = self.session.query(Payment).filter(Payment.id == payment_id)
+            if expected_version is not None:
+                query = query.filter(Payment.version == expected_version)
+            client_id = query.with_entities(Payment.client_id).scalar()
+            if client_id is not None and query.delete(synchronize_session='fetch'):
                 self.session.commit()
                 return client_id
-            return None
+            self.session.rollback()
         except Exception as e:
             self.session.rollback()
             print(f"Error deleting payment: {e}")
             return None
+        if expected_version is not None and self.get_payment_version(payment_id) is not None:
+            raise VersionConflict('payments', payment_id)
+        return None
 
     def get_latest_payment_for_client(self, client_id: int):
         """Obtiene el ID del pago más reciente de un cliente."""
         payment = self.session.query(Payment.id).filter_by(
             client_id=client_id
         ).order_by(
-            Payment.year.desc(),
-            Payment.month.desc(),
+            Payment.month_index.desc(),
             Payment.id.desc()
         ).first()
 
@@ -165,6 +260,7 @@ class PaymentModel:
             client = self.session.query(Client).filter_by(id=client_id).first()
             if client:
                 client.last_payment_id = latest_payment_id
+                client.version = Client.version + 1
                 self.session.commit()
                 return True
             return False
@@ -181,42 +277,357 @@ class PaymentModel:
         latest = self.session.query(Payment.id).filter_by(
             client_id=client_id
         ).order_by(
-            Payment.year.desc(),
-            Payment.month.desc(),
+            Payment.month_index.desc(),
             Payment.id.desc()
         ).first()
 
         return latest and latest.id == payment_id
 
-    def get_payments_filtered(self, name: str = None, month: int = None, year: int = None):
-        """Obtiene pagos filtrados por nombre, mes y año."""
+    def _payments_schemas(self, year=None):
+        """
+        Adjunta los archivos del año (o de todos los años archivados) y
+        retorna sus esquemas; () si no hay ninguno.
+        """
+        archive_model = ArchiveModel(self.db, self.session)
+        archived = archive_model.get_archived_years()
+        if not archived:
+            return ()
+        years = [int(year)] if year else list(archived)
+        return tuple(archive_model.attach(years, archived))
+
+    def _payments_source(self):
+        """
+        Tabla de donde leer los pagos: payments si no hay años archivados;
+        si no, la unión con los archivos adjuntos.
+        """
+        return self._payments_table(self._payments_schemas())
+
+    @staticmethod
+    def _payments_table(schemas=(), by_year=False):
+        """
+        payments, o su unión con los archivos de schemas. by_year filtra
+        cada parte por el parámetro :year (antes de unir, así cada archivo
+        usa su índice).
+        """
+        if not schemas:
+            return Payment.__table__
+
+        def columns(table, version):
+            c = table.c
+            return [c.id, c.client_id, c.date, c.amount_cents, c.month, c.year, c.description, version]
+
+        # Los archivos no tienen versión: sus pagos no se modifican
+        selects = [select(*columns(Payment.__table__, Payment.__table__.c.version))]
+        selects += [
+            select(*columns(archive_payments_table(schema), literal(1).label('version'))) for schema in schemas
+        ]
+        if by_year:
+            selects = [s.where(s.selected_columns.year == bindparam('year')) for s in selects]
+        return union_all(*selects).subquery('payments')
+
+    @staticmethod
+    def _sort_expressions(payments):
+        """Expresión de orden de cada columna de get_payments_filtered"""
         from models.client import Client
 
-        query = self.session.query(
-            Payment.id.label('PagoID'),
-            Client.name.label('Cliente'),
-            Payment.amount.label('Monto'),
-            Payment.date.label('Fecha de Pago'),
-            Payment.description.label('Descripcion')
-        ).join(
-            Client, Payment.client_id == Client.id
-        )
+        return [
+            payments.c.id,
+            Client.name,
+            payments.c.amount_cents,
+            payments.c.date,
+            func.coalesce(payments.c.description, ''),
+        ]
+
+    @staticmethod
+    def sort_key(row, sort_column: int):
+        """Clave de orden de una fila, igual a la que usa get_payments_page"""
+        value = row[sort_column]
+        if sort_column == 4 and value is None:
+            value = ''
+        return value, row[0]
+
+    @classmethod
+    def _payments_filtered_statement(cls, schemas=(), by_name=False, by_month=False, by_year=False,
+                                     sort_column: int = 1, descending: bool = False, paged=False,
+                                     for_edit: bool = False, limited=False):
+        """
+        Sentencia de pagos filtrados por nombre, mes y año, ordenada por la
+        columna sort_column y luego por id (orden estable ante empates).
+        Incluye los archivos de schemas. Los valores de los filtros son
+        parámetros (ver _payments_filtered_params) y la sentencia se arma
+        una sola vez por combinación.
+        paged agrega la condición de "después de :after_value, :after_id"
+        (ver get_payments_page) y limited el LIMIT :limit.
+        for_edit agrega al final el mes y año pagados y la versión (no se
+        muestran ni se exportan; sirven para editar el pago sin volver a
+        consultarlo).
+        """
+        key = ('filtered', schemas, by_name, by_month, by_year, sort_column, descending, paged, for_edit, limited)
+        statement = _statements.get(key)
+        if statement is not None:
+            return statement
 
+        from models.client import Client
+
+        payments = cls._payments_table(schemas, by_year)
+        columns = [
+            payments.c.id.label('PagoID'),
+            Client.name.label('Cliente'),
+            payments.c.amount_cents.label('Monto'),
+            payments.c.date.label('Fecha de Pago'),
+            payments.c.description.label('Descripcion')
+        ]
+        if for_edit:
+            columns += [
+                payments.c.month.label('Mes'), payments.c.year.label('Año'), payments.c.version.label('Versión')
+            ]
+        statement = select(*columns).join_from(payments, Client, payments.c.client_id == Client.id)
+
+        if by_name:
+            statement = statement.where(Client.name.like(bindparam('name')))
+        if by_month:
+            statement = statement.where(payments.c.month == bindparam('month'))
+        if by_year:
+            statement = statement.where(payments.c.year == bindparam('year'))
+
+        sort_expression = cls._sort_expressions(payments)[sort_column]
+        if paged:
+            key_columns = tuple_(sort_expression, payments.c.id)
+            after = tuple_(
+                bindparam('after_value', type_=sort_expression.type), bindparam('after_id', type_=Integer)
+            )
+            statement = statement.where(key_columns < after if descending else key_columns > after)
+        if descending:
+            statement = statement.order_by(sort_expression.desc(), payments.c.id.desc())
+        else:
+            statement = statement.order_by(sort_expression.asc(), payments.c.id.asc())
+        if limited:
+            statement = statement.limit(bindparam('limit', type_=Integer))
+
+        _statements[key] = statement
+        return statement
+
+    @staticmethod
+    def _payments_filtered_params(name=None, month=None, year=None, after=None, limit=None):
+        """Parámetros de _payments_filtered_statement (solo los de los filtros presentes)"""
+        params = {}
         if name:
-            query = query.filter(Client.name.like(f"%{name}%"))
+            params['name'] = f"%{name}%"
         if month:
-            query = query.filter(Payment.month == month)
+            params['month'] = month
         if year:
-            query = query.filter(Payment.year == year)
+            params['year'] = int(year)
+        if after is not None:
+            params['after_value'], params['after_id'] = after
+        if limit is not None:
+            params['limit'] = limit
+        return params
+
+    def _payments_filtered(self, name: str = None, month: int = None, year: int = None,
+                           sort_column: int = 1, descending: bool = False, after=None,
+                           for_edit: bool = False, limit: int = None, execution_options=None):
+        """Ejecuta _payments_filtered_statement para estos filtros. Retorna el Result"""
+        statement = self._payments_filtered_statement(
+            self._payments_schemas(year), bool(name), bool(month), bool(year),
+            sort_column, descending, after is not None, for_edit, limit is not None
+        )
+        params = self._payments_filtered_params(name, month, year, after, limit)
+        return self.session.execute(statement, params, execution_options=execution_options or {})
+
+    @timed('payments.get_payments_page')
+    def get_payments_page(self, name: str = None, month: int = None, year: int = None,
+                          sort_column: int = 1, descending: bool = False, after=None, limit: int = 500):
+        """
+        Una página de pagos filtrados (paginación por clave).
+        after es la clave (sort_key) de la última fila ya cargada; la página
+        empieza justo después, sin OFFSET.
+        Cada fila trae las columnas de get_payments_filtered más mes, año y versión.
+        """
+        return self._payments_filtered(name, month, year, sort_column, descending, after, True, limit).all()
+
+    @timed('payments.get_payments_filtered')
+    def get_payments_filtered(self, name: str = None, month: int = None, year: int = None):
+        """Obtiene pagos filtrados por nombre, mes y año."""
+        return self._payments_filtered(name, month, year).all()
+
+    def iter_payments_filtered(self, name: str = None, month: int = None, year: int = None,
+                               chunk_size: int = 1000):
+        """
+        Igual que get_payments_filtered pero recorre el resultado por bloques
+        de chunk_size filas sin cargarlo entero en memoria.
+        """
+        return self._payments_filtered(name, month, year, execution_options={'yield_per': chunk_size})
+
+    @staticmethod
+    def _month_index_column(payments):
+        """month_index de la fuente de pagos (ver _payments_source)"""
+        if payments is Payment.__table__:
+            return payments.c.month_index
+        # Los archivos no tienen la columna generada
+        return payments.c.year * 12 + payments.c.month - 1
+
+    def _gaps_select(self, client_id: int = None, until: int = None):
+        """
+        Huecos (meses sin pago) de cada cliente, con una sola pasada de una
+        función de ventana sobre (client_id, month_index) y sin traer los
+        pagos a Python. Incluye los años archivados.
+
+        Cada pago se compara con el siguiente del mismo cliente (LEAD, que
+        con el índice ix_payments_client_month_index no necesita ordenar):
+        si hay más de un mes entre los dos, falta lo del medio. Con until
+        (índice de mes, ver models.months), también falta lo que va del
+        último pago hasta until.
+        """
+        from models.client import Client
 
-        query = query.order_by(Client.name.asc())
+        payments = self._payments_source()
+        index = self._month_index_column(payments)
+        ordered = select(
+            payments.c.client_id,
+            index.label('month_index'),
+            func.lead(index).over(partition_by=payments.c.client_id, order_by=index).label('next_index'),
+        )
+        if client_id is not None:
+            ordered = ordered.where(payments.c.client_id == client_id)
+        ordered = ordered.subquery('ordered')
+
+        if until is None:
+            gap_end = ordered.c.next_index - 1
+            condition = ordered.c.next_index - ordered.c.month_index > 1
+        else:
+            gap_end = case((ordered.c.next_index.is_(None), until), else_=ordered.c.next_index - 1)
+            condition = (ordered.c.next_index - ordered.c.month_index > 1) | (
+                ordered.c.next_index.is_(None) & (ordered.c.month_index < until)
+            )
+        gap_start = ordered.c.month_index + 1
+        return select(
+            ordered.c.client_id,
+            Client.name,
+            gap_start.label('first_missing'),
+            gap_end.label('last_missing'),
+            (gap_end - gap_start + 1).label('missing'),
+        ).join(Client, Client.id == ordered.c.client_id).where(condition)
 
-        return query.all()
+    def iter_gaps(self, client_id: int = None, until: int = None, chunk_size: int = 1000):
+        """
+        Recorre los huecos de un cliente (o de todos), por bloques de
+        chunk_size filas. Cada fila: (client_id, nombre, primer mes faltante,
+        último mes faltante, cantidad de meses), con los meses como índice
+        (ver models.months.from_index). Ordenado por cliente y mes.
+        """
+        query = self._gaps_select(client_id, until)
+        query = query.order_by(query.selected_columns.client_id, query.selected_columns.first_missing)
+        return self.session.execute(query.execution_options(yield_per=chunk_size))
 
+    @timed('payments.get_gap_summary')
+    def get_gap_summary(self, until: int = None, limit: int = None, client_id: int = None):
+        """
+        Un resumen por cliente con huecos, de más a menos meses faltantes:
+        (client_id, nombre, huecos, meses faltantes, primer mes faltante,
+        último mes faltante). Se agrupa en la base. Con client_id, solo la
+        fila de ese cliente (ninguna si no tiene huecos).
+        """
+        gaps = self._gaps_select(client_id, until).subquery('gaps')
+        query = select(
+            gaps.c.client_id,
+            gaps.c.name,
+            func.count().label('gaps'),
+            func.sum(gaps.c.missing).label('missing'),
+            func.min(gaps.c.first_missing).label('first_missing'),
+            func.max(gaps.c.last_missing).label('last_missing'),
+        ).group_by(gaps.c.client_id, gaps.c.name).order_by(
+            func.sum(gaps.c.missing).desc(), gaps.c.name
+        )
+        if limit:
+            query = query.limit(limit)
+        return self.session.execute(query).all()
+
+    @staticmethod
+    def history_sort_key(row, sort_column: int = 1):
+        """Clave de una fila de get_client_history (el cursor de la página siguiente)"""
+        return row[1], row[0]
+
+    @timed('payments.get_client_history')
+    def get_client_history(self, client_id: int, cursor=None, limit: int = 100):
+        """
+        Historial de pagos de un cliente, del período más reciente al más
+        antiguo, por páginas (paginación por clave sobre
+        ix_payments_client_month_index; incluye los años archivados).
+
+        Cada fila: (PagoID, Período, Monto, Fecha de Pago, Descripcion,
+        Versión), con el período como índice de mes (ver models.months).
+        cursor es history_sort_key de la última fila ya cargada.
+
+        Retorna (filas, resumen). En la primera página (sin cursor) el
+        resumen sale de la misma consulta, con funciones de ventana sobre
+        todos los pagos del cliente: {'total_cents', 'months', 'streak',
+        'first_month', 'last_month'}; streak son los meses seguidos pagos
+        hasta el último. En las páginas siguientes el resumen es None.
+        """
+        payments = self._payments_source()
+        index = self._month_index_column(payments)
+        columns = [
+            payments.c.id.label('PagoID'),
+            index.label('Período'),
+            payments.c.amount_cents.label('Monto'),
+            payments.c.date.label('Fecha de Pago'),
+            payments.c.description.label('Descripcion'),
+            payments.c.version.label('Versión'),
+        ]
+        if cursor is not None:
+            query = select(*columns).where(
+                payments.c.client_id == client_id, tuple_(index, payments.c.id) < tuple_(*cursor)
+            ).order_by(index.desc(), payments.c.id.desc()).limit(limit)
+            return self.session.execute(query).all(), None
+
+        # Posición desde el último período: los meses de la racha son los
+        # que cumplen período == último - posición + 1
+        ranked = select(
+            *columns,
+            func.row_number().over(order_by=(index.desc(), payments.c.id.desc())).label('position'),
+            func.max(index).over().label('last_month'),
+        ).where(payments.c.client_id == client_id).subquery('ranked')
+        c = ranked.c
+        in_streak = case((c['Período'] == c.last_month - c.position + 1, 1), else_=0)
+        query = select(
+            *(c[column.name] for column in columns),
+            func.sum(c['Monto']).over().label('total_cents'),
+            func.count().over().label('months'),
+            func.sum(in_streak).over().label('streak'),
+            func.min(c['Período']).over().label('first_month'),
+            c.last_month,
+        ).order_by(c['Período'].desc(), c['PagoID'].desc()).limit(limit)
+        result = self.session.execute(query).all()
+
+        width = len(columns)
+        if result:
+            total_cents, months, streak, first_month, last_month = result[0][width:]
+        else:
+            total_cents, months, streak, first_month, last_month = 0, 0, 0, None, None
+        stats = {
+            'total_cents': total_cents,
+            'months': months,
+            'streak': streak,
+            'first_month': first_month,
+            'last_month': last_month,
+        }
+        return [tuple(row[:width]) for row in result], stats
+
+    @timed('payments.get_distinct_years')
     def get_distinct_years(self):
-        """Obtiene años distintos de los pagos."""
-        years = self.session.query(Payment.year).distinct().order_by(Payment.year.desc()).all()
-        return [year[0] for year in years]
+        """Obtiene años distintos de los pagos (incluye los archivados)."""
+        years = {year[0] for year in self.session.query(Payment.year).distinct()}
+        years.update(ArchiveModel(self.db, self.session).get_archived_years())
+        return sorted(years, reverse=True)
+
+    def _archived_totals(self, year=None):
+        """{(año, mes): centavos} de lo archivado (por fecha de pago)"""
+        query = self.session.query(ArchivedTotal.year, ArchivedTotal.month, ArchivedTotal.total_cents).filter(
+            ArchivedTotal.payments > 0
+        )
+        if year is not None:
+            query = query.filter(ArchivedTotal.year == int(year))
+        return {(y, m): total for y, m, total in query}
 
     def get_monthly_stats(self, year: str):
         """Obtiene estadísticas mensuales para un año."""
@@ -226,7 +637,7 @@ class PaymentModel:
 
         results = self.session.query(
             month_column,
-            func.sum(Payment.amount).label('Total Recaudado')
+            func.sum(Payment.amount_cents).label('Total Recaudado')
         ).filter(
             extract('year', Payment.date) == year,
             Payment.date.isnot(None)
@@ -236,7 +647,44 @@ class PaymentModel:
             month_column
         ).all()
 
-        return results
+        archived = self._archived_totals(year)
+        if not archived:
+            return results
+        totals = {month: total for month, total in results}
+        for (_, month), total in archived.items():
+            totals[month] = totals.get(month, 0) + total
+        return sorted(totals.items())
+
+    @timed('payments.get_all_monthly_stats')
+    def get_all_monthly_stats(self):
+        """
+        Obtiene el total recaudado por (año, mes) de todos los años en una sola
+        consulta agrupada. Retorna filas (Año, Mes, Total Recaudado) ordenadas.
+        """
+        from sqlalchemy import func, extract, cast, Integer
+
+        year_column = cast(extract('year', Payment.date), Integer).label('Año')
+        month_column = cast(extract('month', Payment.date), Integer).label('Mes')
+
+        results = self.session.query(
+            year_column,
+            month_column,
+            func.sum(Payment.amount_cents).label('Total Recaudado')
+        ).filter(
+            Payment.date.isnot(None)
+        ).group_by(
+            year_column, month_column
+        ).order_by(
+            year_column, month_column
+        ).all()
+
+        archived = self._archived_totals()
+        if not archived:
+            return results
+        totals = {(y, m): total for y, m, total in results}
+        for key, total in archived.items():
+            totals[key] = totals.get(key, 0) + total
+        return [(y, m, total) for (y, m), total in sorted(totals.items())]
 
     def get_years_from_dates(self):
         """Obtiene años distintos desde payment_date."""
@@ -252,7 +700,9 @@ class PaymentModel:
             desc(year_column)
         ).all()
 
-        return [str(int(year[0])) for year in years if year[0]]
+        years = {int(year[0]) for year in years if year[0]}
+        years.update(year for year, _ in self._archived_totals())
+        return [str(year) for year in sorted(years, reverse=True)]
 
     def is_latest_payment(self, payment_id: int, client_id: int):
         """Verifica si un pago es el más reciente del cliente."""
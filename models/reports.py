@@ -0,0 +1,484 @@
+"""
+Vistas materializadas para el cierre mensual.
+
+Cada vista es una consulta agrupada por período pagado (año, mes) cuyo
+resultado se guarda en su propia tabla resumen, así las pantallas y la
+consola la leen sin recorrer payments:
+
+- report_description_totals: total y cantidad de pagos por descripción;
+- report_tier_totals: total y cantidad de pagos por tramo de monto
+  (AMOUNT_TIERS);
+- report_client_activity: clientes que pagaron el mes y cuántos de ellos
+  pagaban por primera vez (el resto son recurrentes).
+
+Las medidas son sumas y conteos, así se actualizan por partes:
+
+- Pagos nuevos: report_views guarda por vista el mayor payments.id ya
+  incluido (high_water_mark); refresh() agrega solo los pagos de id mayor y
+  suma el resultado a lo que ya estaba (INSERT ... ON CONFLICT DO UPDATE).
+- Ediciones y bajas: unos triggers sobre payments anotan en
+  report_dirty_periods los meses afectados (y los del primer pago del
+  cliente, si pudo cambiar); refresh() vuelve a calcular solo esos meses.
+- Una vista nueva, o refresh(full=True) (por ejemplo si se cambian los
+  tramos), se arma completa en una tabla temporal sin bloquear a los que
+  escriben, y se copia al final.
+
+Se incluyen los años archivados. El final de refresh() corre con el lock
+de escritura (BEGIN IMMEDIATE): lo resumido y la marca quedan
+consistentes. Lo programa MaintenanceService (ver REPORTS_EVERY) y también
+se puede correr con cli.py reports refresh.
+"""
+import datetime
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy import (
+    Column, Integer, String, Float, Table, MetaData, DDL, event, func, case, select, exists, not_, or_, union_all, tuple_, delete
+)
+from sqlalchemy.dialects.sqlite import insert
+from models.database import Base
+from models.archive import ArchiveModel, archive_payments_table
+from models.payment import Payment
+from models.events import local_writes
+from models.money import format_cents
+
+# Tramos de monto: (desde, en centavos, nombre). Si se cambian, correr
+# refresh(full=True)
+AMOUNT_TIERS = [
+    (0, 'Menos de $10,000'),
+    (1_000_000, '$10,000 a $25,000'),
+    (2_500_000, '$25,000 a $50,000'),
+    (5_000_000, 'Más de $50,000'),
+]
+
+
+class ReportView(Base):
+    """Estado de cada vista materializada"""
+    __tablename__ = 'report_views'
+
+    name = Column(String, primary_key=True)
+    # Mayor payments.id ya incluido
+    high_water_mark = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(String, nullable=False)
+    seconds = Column(Float, nullable=False, default=0)
+    rows = Column(Integer, nullable=False, default=0)
+    # Fecha del último armado completo
+    rebuilt_at = Column(String, nullable=True)
+
+
+class ReportDirtyPeriod(Base):
+    """
+    Meses a recalcular en la próxima actualización (los anotan los
+    triggers). client_scope = 1: solo cambió cuál es el primer pago de un
+    cliente (afecta solo a las vistas con client_history).
+    """
+    __tablename__ = 'report_dirty_periods'
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    client_scope = Column(Integer, primary_key=True, autoincrement=False, default=0)
+
+
+class DescriptionTotal(Base):
+    """Total pagado por (año, mes, descripción)"""
+    __tablename__ = 'report_description_totals'
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    description = Column(String, primary_key=True)
+    total_cents = Column(Integer, nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
+
+
+class TierTotal(Base):
+    """Total pagado por (año, mes, tramo de monto); tier es el 'desde' del tramo"""
+    __tablename__ = 'report_tier_totals'
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    tier = Column(Integer, primary_key=True, autoincrement=False)
+    total_cents = Column(Integer, nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
+
+
+class ClientActivity(Base):
+    """Clientes que pagaron cada mes y cuántos pagaban por primera vez"""
+    __tablename__ = 'report_client_activity'
+
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    clients = Column(Integer, nullable=False, default=0)
+    new_clients = Column(Integer, nullable=False, default=0)
+
+
+# Mes del pago (para todas las vistas)
+_MARK_PERIOD = """
+        INSERT OR IGNORE INTO report_dirty_periods (year, month, client_scope)
+        VALUES ({row}.year, {row}.month, 0);
+"""
+
+# Los dos primeros meses pagos del cliente: si cambió cuál es su primer
+# pago, el anterior y el nuevo están entre esos dos
+_MARK_FIRST_PAYMENTS = """
+        INSERT OR IGNORE INTO report_dirty_periods (year, month, client_scope)
+        SELECT year, month, 1 FROM payments
+        WHERE client_id = {row}.client_id {condition}
+        ORDER BY month_index LIMIT 2;
+"""
+
+_NEW_IS_FIRST = (
+    "AND NOT EXISTS (SELECT 1 FROM payments "
+    "WHERE client_id = NEW.client_id AND month_index < NEW.year * 12 + NEW.month - 1)"
+)
+
+_PERIOD_OR_CLIENT_CHANGED = (
+    "AND (OLD.client_id <> NEW.client_id OR OLD.month <> NEW.month OR OLD.year <> NEW.year)"
+)
+
+REPORT_TRIGGERS = [
+    f"""
+    CREATE TRIGGER IF NOT EXISTS payments_report_insert AFTER INSERT ON payments
+    BEGIN
+        -- id reutilizado (por debajo de lo ya resumido): no lo ve la marca
+        INSERT OR IGNORE INTO report_dirty_periods (year, month, client_scope)
+        SELECT NEW.year, NEW.month, 0
+        WHERE NEW.id <= (SELECT coalesce(min(high_water_mark), 0) FROM report_views);
+        -- pago anterior al que era el primero del cliente
+        {_MARK_FIRST_PAYMENTS.format(row='NEW', condition=_NEW_IS_FIRST)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS payments_report_update
+    AFTER UPDATE OF client_id, amount_cents, month, year, description ON payments
+    BEGIN
+        {_MARK_PERIOD.format(row='OLD')}
+        {_MARK_PERIOD.format(row='NEW')}
+        {_MARK_FIRST_PAYMENTS.format(row='OLD', condition=_PERIOD_OR_CLIENT_CHANGED)}
+        {_MARK_FIRST_PAYMENTS.format(row='NEW', condition=_PERIOD_OR_CLIENT_CHANGED)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS payments_report_delete AFTER DELETE ON payments
+    BEGIN
+        {_MARK_PERIOD.format(row='OLD')}
+        {_MARK_FIRST_PAYMENTS.format(row='OLD', condition='')}
+    END
+    """,
+]
+
+
+def create_report_triggers(connection):
+    """Crea los triggers de payments que anotan los meses a recalcular"""
+    for statement in REPORT_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+# Bases nuevas (las existentes los crean con la migración add_report_triggers)
+for _statement in REPORT_TRIGGERS:
+    event.listen(Payment.__table__, 'after_create', DDL(_statement))
+
+
+def tier_label(tier):
+    """Nombre del tramo cuyo 'desde' es tier"""
+    for low, name in AMOUNT_TIERS:
+        if low == tier:
+            return name
+    return f"Desde {format_cents(tier)}"
+
+
+def _month_index(table):
+    if table is Payment.__table__:
+        return table.c.month_index
+    return table.c.year * 12 + table.c.month - 1
+
+
+def _description_totals(payments, tables):
+    description = func.coalesce(payments.c.description, '')
+    return select(
+        payments.c.year, payments.c.month, description.label('description'),
+        func.sum(payments.c.amount_cents).label('total_cents'), func.count().label('payments'),
+    ).group_by(payments.c.year, payments.c.month, description)
+
+
+def _tier_totals(payments, tables):
+    tier = case(
+        *[(payments.c.amount_cents >= low, low) for low, _ in reversed(AMOUNT_TIERS[1:])],
+        else_=AMOUNT_TIERS[0][0],
+    )
+    return select(
+        payments.c.year, payments.c.month, tier.label('tier'),
+        func.sum(payments.c.amount_cents).label('total_cents'), func.count().label('payments'),
+    ).group_by(payments.c.year, payments.c.month, tier)
+
+
+def _client_activity(payments, tables):
+    # Primer pago: no hay otro del mismo cliente en un mes anterior (en
+    # ninguna de las tablas; cada una por su índice de cliente)
+    earlier = [
+        exists().where(table.c.client_id == payments.c.client_id, _month_index(table) < payments.c.month_index)
+        for table in tables
+    ]
+    is_first = not_(or_(*earlier))
+    return select(
+        payments.c.year, payments.c.month,
+        func.count().label('clients'),
+        func.sum(case((is_first, 1), else_=0)).label('new_clients'),
+    ).group_by(payments.c.year, payments.c.month)
+
+
+class MaterializedView:
+    """
+    Definición de una vista: tabla resumen, columnas clave (año y mes
+    primero), medidas que se suman y aggregate(payments, tables) -> SELECT
+    agrupado con las claves y las medidas en ese orden. payments es una
+    subconsulta con id, client_id, amount_cents, month, year, description y
+    month_index; tables son todas las tablas de pagos (principal y archivos).
+    client_history: el resultado de un mes depende de los otros pagos del
+    cliente (por ejemplo, si es su primer pago).
+    """
+
+    def __init__(self, name, title, model, keys, measures, aggregate, client_history=False):
+        self.name = name
+        self.title = title
+        self.table = model.__table__
+        self.keys = keys
+        self.measures = measures
+        self.aggregate = aggregate
+        self.client_history = client_history
+
+
+VIEWS = [
+    MaterializedView('description_totals', "Totales por descripción", DescriptionTotal,
+                     ('year', 'month', 'description'), ('total_cents', 'payments'), _description_totals),
+    MaterializedView('tier_totals', "Totales por tramo de monto", TierTotal,
+                     ('year', 'month', 'tier'), ('total_cents', 'payments'), _tier_totals),
+    MaterializedView('client_activity', "Clientes nuevos y recurrentes", ClientActivity,
+                     ('year', 'month'), ('clients', 'new_clients'), _client_activity, client_history=True),
+]
+
+
+class ReportModel:
+    """Actualiza y consulta las vistas materializadas"""
+
+    def __init__(self, db, session=None):
+        self.db = db
+        self.session = session if session is not None else db.get_session()
+
+    def _payment_tables(self, session):
+        """
+        payments y las tablas de todos los años archivados (adjunta los
+        archivos). Si no se pueden adjuntar todos, attach lanza ValueError y
+        refresh falla: sin algún año los totales quedarían mal.
+        """
+        archive_model = ArchiveModel(self.db, session)
+        archived = archive_model.get_archived_years()
+        schemas = archive_model.attach(archived, archived)
+        return [Payment.__table__] + [archive_payments_table(schema) for schema in schemas]
+
+    @staticmethod
+    def _rows(tables, condition):
+        """Pagos de todas las tablas que cumplen condition(tabla), como subconsulta"""
+        selects = [
+            select(
+                table.c.id, table.c.client_id, table.c.amount_cents, table.c.month, table.c.year,
+                table.c.description, _month_index(table).label('month_index'),
+            ).where(condition(table))
+            for table in tables
+        ]
+        return (selects[0] if len(selects) == 1 else union_all(*selects)).subquery('rows')
+
+    @staticmethod
+    def _insert(view, query, add=False, target=None):
+        """
+        INSERT del SELECT de la vista (en su tabla o en target); add=True
+        suma a las filas que ya existen
+        """
+        columns = list(view.keys) + list(view.measures)
+        statement = insert(view.table if target is None else target).from_select(columns, query)
+        if add:
+            statement = statement.on_conflict_do_update(
+                index_elements=list(view.keys),
+                set_={measure: view.table.c[measure] + statement.excluded[measure] for measure in view.measures},
+            )
+        return statement
+
+    @staticmethod
+    def _build_table(view):
+        """Tabla temporal con las columnas de la vista (ver refresh)"""
+        return Table(
+            f"report_build_{view.name}", MetaData(),
+            *[Column(column.name, column.type) for column in view.table.c],
+            prefixes=['TEMPORARY'],
+        )
+
+    def refresh(self, full=False):
+        """
+        Actualiza todas las vistas (con su propia sesión: se puede llamar
+        desde cualquier hilo). Retorna (success, message).
+        """
+        started = time.perf_counter()
+        session = self.db.Session()
+        try:
+            # ATTACH no se puede dentro de una transacción: antes del BEGIN
+            tables = self._payment_tables(session)
+            connection = session.connection()
+
+            # Armados completos: se calculan en tablas temporales sobre una
+            # foto de la base, sin el lock de escritura (pueden tardar); lo
+            # que cambie mientras tanto entra después por la marca y por
+            # report_dirty_periods
+            connection.exec_driver_sql("BEGIN")
+            built = set(session.execute(select(ReportView.name)).scalars())
+            built_upto = session.execute(select(func.max(Payment.id))).scalar() or 0
+            builds = {}
+            for view in VIEWS:
+                if not full and view.name in built:
+                    continue
+                build = self._build_table(view)
+                build.drop(connection, checkfirst=True)
+                build.create(connection)
+                rows = self._rows(tables, lambda table: table.c.id <= built_upto)
+                connection.execute(self._insert(view, view.aggregate(rows, tables), target=build))
+                builds[view.name] = build
+            with local_writes(self.db):
+                connection.exec_driver_sql("COMMIT")
+
+            # IMMEDIATE: lo que sigue es corto y no puede perderse ningún cambio
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+            session.expire_all()
+            upto = session.execute(select(func.max(Payment.id))).scalar() or 0
+            dirty_count = session.query(ReportDirtyPeriod.year, ReportDirtyPeriod.month).distinct().count()
+            now = datetime.datetime.now().isoformat(timespec='seconds')
+
+            added = 0
+            for view in VIEWS:
+                view_started = time.perf_counter()
+                build = builds.get(view.name)
+                if build is not None:
+                    session.execute(delete(view.table))
+                    session.execute(insert(view.table).from_select(list(view.table.c.keys()), select(build)))
+                    build.drop(connection)
+                    state = session.merge(ReportView(
+                        name=view.name, high_water_mark=built_upto, refreshed_at=now, rebuilt_at=now
+                    ))
+                else:
+                    state = session.get(ReportView, view.name)
+
+                # Pagos nuevos: siempre en la tabla principal
+                hwm = state.high_water_mark
+                if upto > hwm:
+                    rows = self._rows(tables[:1], lambda table: (table.c.id > hwm) & (table.c.id <= upto))
+                    session.execute(self._insert(view, view.aggregate(rows, tables), add=True))
+                    added = max(added, upto - hwm)
+
+                # Meses anotados por los triggers
+                dirty = select(ReportDirtyPeriod.year, ReportDirtyPeriod.month)
+                if not view.client_history:
+                    dirty = dirty.where(ReportDirtyPeriod.client_scope == 0)
+                if dirty_count:
+                    period = tuple_(view.table.c.year, view.table.c.month)
+                    session.execute(delete(view.table).where(period.in_(dirty)))
+                    rows = self._rows(
+                        tables,
+                        lambda table: tuple_(table.c.year, table.c.month).in_(dirty) & (table.c.id <= upto)
+                    )
+                    session.execute(self._insert(view, view.aggregate(rows, tables)))
+
+                state.high_water_mark = max(hwm, upto)
+                state.refreshed_at = now
+                state.seconds = time.perf_counter() - view_started
+                state.rows = session.execute(select(func.count()).select_from(view.table)).scalar()
+
+            session.execute(delete(ReportDirtyPeriod))
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            print(f"Error refreshing reports: {e}")
+            return False, f"Error al actualizar los reportes: {e}"
+        finally:
+            session.close()
+
+        elapsed = time.perf_counter() - started
+        detail = f"{added:,} pagos nuevos, {dirty_count} meses recalculados"
+        if builds:
+            detail = f"{len(builds)} armadas de nuevo, {detail}"
+        return True, f"Reportes actualizados ({detail}) en {elapsed:.2f} s"
+
+    def get_status(self):
+        """
+        Antigüedad de cada vista: lista de dicts con name, title,
+        refreshed_at, rebuilt_at, seconds, rows, pending (pagos nuevos sin
+        incluir), dirty_periods (meses a recalcular) y stale.
+        """
+        states = {state.name: state for state in self.session.query(ReportView)}
+        dirty_periods = self.session.query(ReportDirtyPeriod).count()
+        status = []
+        for view in VIEWS:
+            state = states.get(view.name)
+            if state is None:
+                status.append({
+                    'name': view.name, 'title': view.title, 'refreshed_at': None, 'rebuilt_at': None,
+                    'seconds': None, 'rows': 0, 'pending': None, 'dirty_periods': dirty_periods, 'stale': True,
+                })
+                continue
+            pending = self.session.query(func.count(Payment.id)).filter(
+                Payment.id > state.high_water_mark
+            ).scalar()
+            status.append({
+                'name': view.name, 'title': view.title, 'refreshed_at': state.refreshed_at,
+                'rebuilt_at': state.rebuilt_at, 'seconds': state.seconds, 'rows': state.rows,
+                'pending': pending, 'dirty_periods': dirty_periods, 'stale': bool(pending or dirty_periods),
+            })
+        return status
+
+    def get_periods(self):
+        """(año, mes) con pagos según las vistas, del más reciente al más antiguo"""
+        return [
+            (year, month) for year, month in self.session.query(ClientActivity.year, ClientActivity.month)
+            .order_by(ClientActivity.year.desc(), ClientActivity.month.desc())
+        ]
+
+    def get_description_totals(self, year: int, month: int):
+        """(descripción, total en centavos, pagos) del mes, de mayor a menor total"""
+        return self.session.query(
+            DescriptionTotal.description, DescriptionTotal.total_cents, DescriptionTotal.payments
+        ).filter_by(year=year, month=month).order_by(
+            DescriptionTotal.total_cents.desc(), DescriptionTotal.description
+        ).all()
+
+    def get_tier_totals(self, year: int, month: int):
+        """(tramo, total en centavos, pagos) del mes, en el orden de AMOUNT_TIERS"""
+        rows = self.session.query(
+            TierTotal.tier, TierTotal.total_cents, TierTotal.payments
+        ).filter_by(year=year, month=month).order_by(TierTotal.tier).all()
+        return [(tier_label(tier), total, payments) for tier, total, payments in rows]
+
+    def get_client_activity(self, year: int = None):
+        """(año, mes, clientes, nuevos, recurrentes) por mes (de un año o de todos)"""
+        query = self.session.query(
+            ClientActivity.year, ClientActivity.month, ClientActivity.clients, ClientActivity.new_clients
+        )
+        if year:
+            query = query.filter(ClientActivity.year == year)
+        return [
+            (y, m, clients, new, clients - new)
+            for y, m, clients, new in query.order_by(ClientActivity.year, ClientActivity.month)
+        ]
+
+
+def refresh_in_background(db, full=False):
+    """Corre ReportModel.refresh en un hilo aparte. Retorna un Future con (success, message)"""
+    future = Future()
+
+    def run():
+        session = db.Session()
+        try:
+            future.set_result(ReportModel(db, session).refresh(full))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            session.close()
+
+    threading.Thread(target=run, name='reports-refresh', daemon=True).start()
+    return future
@@ -0,0 +1,170 @@
+"""
+Contenedor columnar para resultados grandes.
+
+En lugar de una lista de tuplas (o Row de SQLAlchemy) guarda una columna por
+campo: enteros en array('q'), fechas ISO como ordinales en array('i') y el
+resto como códigos en array('i') que apuntan a un diccionario de valores
+únicos (nombres de clientes, descripciones, meses...). Se comporta como una
+secuencia de tuplas, así los modelos de Qt lo usan igual que antes.
+"""
+import datetime
+import sys
+from array import array
+from itertools import islice
+
+# Tipos de columna
+INT = 'int'        # Entero no nulo (ids, centavos)
+DATE = 'date'      # Texto 'YYYY-MM-DD'
+VALUE = 'value'    # Cualquier valor hasheable, internado
+
+# Códigos reservados en columnas DATE
+_NULL_DATE = -1
+
+
+class ColumnarRows:
+    """Secuencia de filas guardada por columnas"""
+
+    def __init__(self, columns, rows=()):
+        """columns: lista de (nombre, tipo), como en las exportaciones"""
+        self.names = tuple(name for name, _ in columns)
+        self.kinds = tuple(kind for _, kind in columns)
+        self._columns = []
+        self._values = []    # Por columna: lista de valores únicos (VALUE) o de fechas no ISO (DATE)
+        self._codes = []     # Por columna: valor -> código (en DATE, texto -> ordinal ya calculado)
+        for kind in self.kinds:
+            if kind == INT:
+                self._columns.append(array('q'))
+            elif kind in (DATE, VALUE):
+                self._columns.append(array('i'))
+            else:
+                raise ValueError(f"Tipo de columna no soportado: {kind}")
+            self._values.append([])
+            self._codes.append({})
+        self.extend(rows)
+
+    def _encode(self, col, value):
+        kind = self.kinds[col]
+        if kind == INT:
+            return value
+        codes = self._codes[col]
+        code = codes.get(value)
+        if code is not None:
+            return code
+        if kind == DATE:
+            if value is None:
+                return _NULL_DATE
+            try:
+                code = datetime.date.fromisoformat(value).toordinal()
+            except (TypeError, ValueError):
+                # Fecha con otro formato: se guarda tal cual aparte
+                self._values[col].append(value)
+                code = -1 - len(self._values[col])
+        else:
+            code = len(self._values[col])
+            self._values[col].append(value)
+        codes[value] = code
+        return code
+
+    def _decode(self, col, code):
+        kind = self.kinds[col]
+        if kind == INT:
+            return code
+        if kind == DATE:
+            if code == _NULL_DATE:
+                return None
+            if code < _NULL_DATE:
+                return self._values[col][-2 - code]
+            return datetime.date.fromordinal(code).isoformat()
+        return self._values[col][code]
+
+    def _position(self, position):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("fila fuera de rango")
+        return position
+
+    def __len__(self):
+        return len(self._columns[0]) if self._columns else 0
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self[i] for i in range(*position.indices(len(self)))]
+        position = self._position(position)
+        return tuple(
+            self._decode(col, column[position]) for col, column in enumerate(self._columns)
+        )
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __setitem__(self, position, row):
+        position = self._position(position)
+        for col, column in enumerate(self._columns):
+            column[position] = self._encode(col, row[col])
+
+    def __delitem__(self, position):
+        position = self._position(position)
+        for column in self._columns:
+            del column[position]
+
+    def insert(self, position, row):
+        for col, column in enumerate(self._columns):
+            column.insert(position, self._encode(col, row[col]))
+
+    def append(self, row):
+        for col, column in enumerate(self._columns):
+            column.append(self._encode(col, row[col]))
+
+    def extend(self, rows, chunk_size=10000):
+        """Agrega filas por bloques, columna por columna"""
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            for col, values in enumerate(zip(*chunk)):
+                if self.kinds[col] == INT:
+                    self._columns[col].extend(values)
+                else:
+                    codes, encode = self._codes[col], self._encode
+                    self._columns[col].extend(
+                        codes[value] if value in codes else encode(col, value) for value in values
+                    )
+
+    def value_at(self, position, col):
+        """Un solo valor, sin armar la tupla de la fila"""
+        return self._decode(col, self._columns[col][self._position(position)])
+
+    def find(self, col, value):
+        """Primera fila cuya columna (INT o VALUE) vale value, o -1 (búsqueda en C)"""
+        if self.kinds[col] == VALUE:
+            value = self._codes[col].get(value)
+            if value is None:
+                return -1
+        elif self.kinds[col] != INT:
+            raise ValueError("find solo admite columnas INT o VALUE")
+        try:
+            return self._columns[col].index(value)
+        except ValueError:
+            return -1
+
+    def memory_report(self):
+        """
+        Bytes usados por columna (arrays + diccionarios de valores) y total.
+        Los valores internados se cuentan una vez aunque se repitan en muchas filas.
+        """
+        report = {'rows': len(self)}
+        total = sys.getsizeof(self)
+        for col, column in enumerate(self._columns):
+            size = sys.getsizeof(column)
+            values = self._values[col]
+            if values:
+                size += sys.getsizeof(values) + sum(sys.getsizeof(v) for v in values)
+                size += sys.getsizeof(self._codes[col])
+            report[self.names[col]] = size
+            total += size
+        report['total'] = total
+        report['bytes_per_row'] = total / len(self) if len(self) else 0.0
+        return report
@@ -0,0 +1,521 @@
+"""
+Replicación entre sucursales por registro de cambios.
+
+Cada escritura del PaymentController deja una fila en change_log con la
+clave natural del pago (nombre del cliente, mes, año): los ids de cada base
+son distintos, la clave natural no. Cada sucursal tiene un site_id y numera
+sus cambios (origin, origin_seq).
+
+Sincronizar es intercambiar lotes: cada base manda lo que la otra no tiene
+según su vector {sitio: último origin_seq recibido}, así el costo depende de
+la cantidad de cambios y no del tamaño de la base. Los lotes son JSON
+comprimido con zlib y viajan por archivo o por socket.
+
+Conflictos sobre la misma clave: gana el cambio más reciente (changed_at,
+y el site_id como desempate). sync_versions guarda la versión vigente de
+cada clave. Los cambios aplicados se vuelven a registrar con su origen
+original, así llegan también a una tercera sucursal.
+"""
+import datetime
+import json
+import socket
+import struct
+import uuid
+import zlib
+
+from sqlalchemy import Column, Integer, String, UniqueConstraint, func, insert, select, update, delete, text
+from models.database import Base
+from models.archive import ArchiveModel
+
+BATCH_FORMAT = 1
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+
+class ChangeLog(Base):
+    """Cambios sobre los pagos, en el orden en que se hicieron en su sucursal"""
+    __tablename__ = 'change_log'
+
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    origin = Column(String, nullable=False)
+    origin_seq = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)
+    client_name = Column(String, nullable=False)
+    month = Column(Integer, nullable=False)
+    year = Column(Integer, nullable=False)
+    amount_cents = Column(Integer, nullable=True)
+    date = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    changed_at = Column(String, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('origin', 'origin_seq', name='_origin_seq_uc'),
+    )
+
+
+class SyncVersion(Base):
+    """Versión vigente de cada clave (cliente, mes, año) para resolver conflictos"""
+    __tablename__ = 'sync_versions'
+
+    client_name = Column(String, primary_key=True)
+    month = Column(Integer, primary_key=True, autoincrement=False)
+    year = Column(Integer, primary_key=True, autoincrement=False)
+    changed_at = Column(String, nullable=False)
+    origin = Column(String, nullable=False)
+
+
+class SyncSite(Base):
+    """Sucursales conocidas (la local tiene is_local = 1)"""
+    __tablename__ = 'sync_sites'
+
+    site_id = Column(String, primary_key=True)
+    is_local = Column(Integer, nullable=False, default=0)
+    # Último origin_seq de ese sitio que tiene esta base
+    applied_seq = Column(Integer, nullable=False, default=0)
+    # Vector de lo que ese sitio ya tenía en su último lote (JSON)
+    peer_vector = Column(String, nullable=True)
+    last_sync = Column(String, nullable=True)
+
+
+def _now():
+    return datetime.datetime.now().isoformat(timespec='microseconds')
+
+
+class ChangeLogModel:
+    """Registro de cambios locales"""
+
+    def __init__(self, db, session=None):
+        self.db = db
+        self.session = session if session is not None else db.get_session()
+
+    def _local_site(self):
+        site = self.session.query(SyncSite).filter_by(is_local=1).first()
+        if site is None:
+            site = SyncSite(site_id=uuid.uuid4().hex[:12], is_local=1, applied_seq=0)
+            self.session.add(site)
+            self.session.flush()
+        return site
+
+    def local_site_id(self):
+        site_id = self._local_site().site_id
+        self.session.commit()
+        return site_id
+
+    def set_local_site_id(self, site_id: str):
+        """
+        Cambia el nombre de la sucursal local (por ejemplo 'centro').
+        Solo se puede antes de registrar cambios.
+        Retorna (success: bool, message: str)
+        """
+        site = self._local_site()
+        if site.applied_seq:
+            self.session.rollback()
+            return False, "La sucursal ya tiene cambios registrados; no se puede renombrar."
+        if self.session.query(SyncSite).filter_by(site_id=site_id).first() is not None:
+            self.session.rollback()
+            return False, f"Ya existe una sucursal '{site_id}'."
+        site.site_id = site_id
+        self.session.commit()
+        return True, f"Sucursal local: {site_id}"
+
+    def vector(self):
+        """{sitio: último origin_seq que tiene esta base}"""
+        return {site_id: seq for site_id, seq in self.session.query(SyncSite.site_id, SyncSite.applied_seq)}
+
+    def capture_existing(self):
+        """
+        Registra como cambios locales los pagos que todavía no tienen versión
+        (los que ya estaban antes de activar la replicación), para que el
+        primer lote los lleve. Retorna la cantidad registrada.
+        """
+        try:
+            site = self._local_site()
+            changed_at = _now()
+            params = {'origin': site.site_id, 'base': site.applied_seq, 'changed_at': changed_at}
+            pending = """
+                FROM payments p
+                JOIN clients c ON c.id = p.client_id
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM sync_versions v
+                    WHERE v.client_name = c.name AND v.month = p.month AND v.year = p.year
+                )
+            """
+            count = self.session.execute(text(f"SELECT COUNT(*) {pending}")).scalar()
+            if count:
+                self.session.execute(text(f"""
+                    INSERT INTO change_log (origin, origin_seq, op, client_name, month, year,
+                                            amount_cents, date, description, changed_at)
+                    SELECT :origin, :base + ROW_NUMBER() OVER (ORDER BY p.id), 'upsert', c.name,
+                           p.month, p.year, p.amount_cents, p.date, p.description, :changed_at
+                    {pending}
+                """), params)
+                self.session.execute(text("""
+                    INSERT OR REPLACE INTO sync_versions (client_name, month, year, changed_at, origin)
+                    SELECT client_name, month, year, changed_at, origin
+                    FROM change_log WHERE origin = :origin AND origin_seq > :base
+                """), params)
+                site.applied_seq += count
+            self.session.commit()
+            return count
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error capturing existing payments: {e}")
+            return 0
+
+    def _record(self, op, name, month, year, amount_cents=None, date=None, description=None):
+        try:
+            site = self._local_site()
+            site.applied_seq += 1
+            changed_at = _now()
+            self.session.add(ChangeLog(
+                origin=site.site_id, origin_seq=site.applied_seq, op=op, client_name=name,
+                month=month, year=year, amount_cents=amount_cents, date=date,
+                description=description, changed_at=changed_at,
+            ))
+            self.session.merge(SyncVersion(
+                client_name=name, month=month, year=year, changed_at=changed_at, origin=site.site_id
+            ))
+            self.session.commit()
+            return True
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error recording change: {e}")
+            return False
+
+    def record_upsert(self, name, month, year, amount_cents, date, description):
+        return self._record(UPSERT, name, month, year, amount_cents, date, description)
+
+    def record_delete(self, name, month, year):
+        return self._record(DELETE, name, month, year)
+
+
+class SyncEngine:
+    """Arma y aplica lotes de cambios entre bases"""
+
+    CHUNK = 500
+
+    def __init__(self, db, session=None):
+        self.db = db
+        self.session = session if session is not None else db.get_session()
+        self.change_log = ChangeLogModel(db, self.session)
+
+    # Armado de lotes
+
+    def _peer_vector(self, peer_site):
+        if peer_site is None:
+            return {}
+        row = self.session.query(SyncSite.peer_vector).filter_by(site_id=peer_site).first()
+        return json.loads(row[0]) if row and row[0] else {}
+
+    def make_batch(self, peer_vector=None, peer_site=None):
+        """
+        Lote comprimido con los cambios que el otro sitio no tiene.
+        peer_vector es su vector; si no se conoce, se usa el último que mandó
+        peer_site (o todo el registro si nunca sincronizaron).
+        Retorna (bytes, cantidad de cambios)
+        """
+        if peer_vector is None:
+            peer_vector = self._peer_vector(peer_site)
+        local_site = self.change_log.local_site_id()
+
+        changes = []
+        for origin, applied_seq in sorted(self.change_log.vector().items()):
+            since = peer_vector.get(origin, 0)
+            if applied_seq <= since:
+                continue
+            rows = self.session.query(
+                ChangeLog.origin, ChangeLog.origin_seq, ChangeLog.op, ChangeLog.client_name,
+                ChangeLog.month, ChangeLog.year, ChangeLog.amount_cents, ChangeLog.date,
+                ChangeLog.description, ChangeLog.changed_at
+            ).filter(
+                ChangeLog.origin == origin, ChangeLog.origin_seq > since
+            ).order_by(ChangeLog.origin_seq)
+            changes.extend(list(row) for row in rows)
+
+        payload = {
+            'format': BATCH_FORMAT,
+            'site': local_site,
+            'vector': self.change_log.vector(),
+            'changes': changes,
+        }
+        return zlib.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8')), len(changes)
+
+    # Aplicación de lotes
+
+    def apply_batch(self, data: bytes):
+        """
+        Aplica un lote en una sola transacción.
+        Retorna (success: bool, message: str)
+        """
+        try:
+            payload = json.loads(zlib.decompress(data).decode('utf-8'))
+        except (zlib.error, ValueError) as e:
+            return False, f"Lote inválido: {e}"
+        if payload.get('format') != BATCH_FORMAT:
+            return False, "Formato de lote no soportado."
+
+        archive_model = ArchiveModel(self.db, self.session)
+        archived_years = set(archive_model.get_archived_years())
+        try:
+            local_site = self.change_log._local_site().site_id
+            if payload['site'] == local_site:
+                self.session.rollback()
+                return False, "El lote es de esta misma sucursal."
+            counts, affected_clients = self._apply_changes(payload['changes'], local_site, archived_years)
+
+            peer = self.session.get(SyncSite, payload['site'])
+            if peer is None:
+                peer = SyncSite(site_id=payload['site'], is_local=0, applied_seq=0)
+                self.session.add(peer)
+            peer.peer_vector = json.dumps(payload['vector'])
+            peer.last_sync = _now()
+
+            self._refresh_last_payments(affected_clients)
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            print(f"Error applying sync batch: {e}")
+            return False, f"No se pudo aplicar el lote: {e}"
+
+        self._remove_clients_without_payments(affected_clients, archive_model)
+        from models.due_list import DueListModel
+        DueListModel(self.db, self.session).refresh_clients(sorted(affected_clients))
+
+        from models.events import ExternalChange
+        self.session.expire_all()
+        self.db.events.publish(ExternalChange())
+        return True, (
+            f"{counts['applied']:,} cambios aplicados, {counts['lost']:,} conflictos resueltos a favor "
+            f"de esta base, {counts['duplicate']:,} ya recibidos, {counts['archived']:,} en años archivados"
+        )
+
+    def _apply_changes(self, changes, local_site, archived_years):
+        from models.client import Client
+        from models.payment import Payment
+
+        payments = Payment.__table__
+        clients = Client.__table__
+        counts = {'applied': 0, 'lost': 0, 'duplicate': 0, 'archived': 0}
+        affected_clients = set()
+        vector = self.change_log.vector()
+        sites = {}
+        client_ids = {}
+        log_rows = []
+
+        next_id = max(
+            self.session.query(func.max(Payment.id)).scalar() or 0,
+            ArchiveModel(self.db, self.session).max_archived_id(),
+        ) + 1
+
+        def client_id_for(name, create):
+            if name not in client_ids:
+                client_ids[name] = self.session.execute(
+                    select(clients.c.id).where(clients.c.name == name)
+                ).scalar()
+            if client_ids[name] is None and create:
+                client_ids[name] = self.session.execute(
+                    insert(clients).values(name=name, last_payment_id=None)
+                ).inserted_primary_key[0]
+            return client_ids[name]
+
+        for origin, origin_seq, op, name, month, year, amount_cents, date, description, changed_at in changes:
+            if origin_seq <= vector.get(origin, 0) or origin == local_site:
+                counts['duplicate'] += 1
+                continue
+            vector[origin] = origin_seq
+            sites[origin] = origin_seq
+
+            current = self.session.execute(
+                select(SyncVersion.changed_at, SyncVersion.origin).where(
+                    SyncVersion.client_name == name, SyncVersion.month == month, SyncVersion.year == year
+                )
+            ).first()
+            if current is not None and tuple(current) >= (changed_at, origin):
+                counts['lost'] += 1
+                continue
+            if year in archived_years:
+                counts['archived'] += 1
+                continue
+
+            client_id = client_id_for(name, create=(op == UPSERT))
+            payment_id = None
+            if client_id is not None:
+                payment_id = self.session.execute(
+                    select(payments.c.id).where(
+                        payments.c.client_id == client_id,
+                        payments.c.month == month,
+                        payments.c.year == year,
+                    )
+                ).scalar()
+
+            if op == UPSERT:
+                values = {'amount_cents': amount_cents, 'date': date, 'description': description}
+                if payment_id is None:
+                    self.session.execute(insert(payments).values(
+                        id=next_id, client_id=client_id, month=month, year=year, **values
+                    ))
+                    next_id += 1
+                else:
+                    # Aumenta la versión: una edición abierta en otra ventana
+                    # sobre el valor anterior da conflicto (ver PaymentModel)
+                    self.session.execute(update(payments).where(payments.c.id == payment_id).values(
+                        version=payments.c.version + 1, **values
+                    ))
+            elif payment_id is not None:
+                self.session.execute(
+                    update(clients).where(clients.c.last_payment_id == payment_id)
+                    .values(last_payment_id=None, version=clients.c.version + 1)
+                )
+                self.session.execute(delete(payments).where(payments.c.id == payment_id))
+
+            if client_id is not None:
+                affected_clients.add(client_id)
+            self.session.merge(SyncVersion(
+                client_name=name, month=month, year=year, changed_at=changed_at, origin=origin
+            ))
+            log_rows.append({
+                'origin': origin, 'origin_seq': origin_seq, 'op': op, 'client_name': name,
+                'month': month, 'year': year, 'amount_cents': amount_cents, 'date': date,
+                'description': description, 'changed_at': changed_at,
+            })
+            counts['applied'] += 1
+
+        if log_rows:
+            self.session.execute(insert(ChangeLog.__table__), log_rows)
+        for site_id, seq in sites.items():
+            site = self.session.get(SyncSite, site_id)
+            if site is None:
+                self.session.add(SyncSite(site_id=site_id, is_local=0, applied_seq=seq))
+            else:
+                site.applied_seq = max(site.applied_seq, seq)
+        return counts, affected_clients
+
+    def _refresh_last_payments(self, client_ids):
+        """Recalcula clients.last_payment_id de los clientes tocados (por bloques)"""
+        from models.client import Client
+        from models.payment import Payment
+
+        clients = Client.__table__
+        payments = Payment.__table__
+        latest = select(payments.c.id).where(
+            payments.c.client_id == clients.c.id
+        ).order_by(
+            payments.c.month_index.desc(), payments.c.id.desc()
+        ).limit(1).scalar_subquery()
+
+        ids = sorted(client_ids)
+        for start in range(0, len(ids), self.CHUNK):
+            self.session.execute(
+                update(clients).where(clients.c.id.in_(ids[start:start + self.CHUNK]))
+                .values(last_payment_id=latest, version=clients.c.version + 1)
+            )
+
+    def _remove_clients_without_payments(self, client_ids, archive_model):
+        """
+        Igual que al borrar desde la aplicación: si al cliente le quedan pagos
+        archivados se restaura el último; si no, se borra el cliente.
+        """
+        from models.client import Client, ClientModel
+        from models.payment import PaymentModel
+
+        orphans = [
+            client_id for (client_id,) in self.session.query(Client.id).filter(
+                Client.id.in_(client_ids), Client.last_payment_id.is_(None)
+            )
+        ] if client_ids else []
+        client_model = ClientModel(self.db, self.session)
+        payment_model = PaymentModel(self.db, self.session)
+        for client_id in orphans:
+            if archive_model.restore_latest_payment(client_id):
+                payment_model.update_client_last_payment(client_id)
+            else:
+                client_model.delete_client(client_id)
+
+    # Transportes
+
+    def export_file(self, path, peer_site=None):
+        """Escribe un lote para peer_site. Retorna (success: bool, message: str)"""
+        try:
+            data, count = self.make_batch(peer_site=peer_site)
+            with open(path, 'wb') as f:
+                f.write(data)
+        except Exception as e:
+            print(f"Error exporting sync batch: {e}")
+            return False, f"No se pudo exportar el lote: {e}"
+        return True, f"{count:,} cambios exportados a {path} ({len(data):,} bytes)"
+
+    def import_file(self, path):
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            return False, f"No se pudo leer el lote: {e}"
+        return self.apply_batch(data)
+
+    @staticmethod
+    def _send(sock, data: bytes):
+        sock.sendall(struct.pack('>I', len(data)) + data)
+
+    @staticmethod
+    def _receive(sock):
+        def read(size):
+            chunks = []
+            while size:
+                chunk = sock.recv(min(size, 1 << 16))
+                if not chunk:
+                    raise ConnectionError("Conexión cerrada durante la sincronización")
+                chunks.append(chunk)
+                size -= len(chunk)
+            return b''.join(chunks)
+
+        (size,) = struct.unpack('>I', read(4))
+        return read(size)
+
+    def exchange(self, sock: socket.socket, initiator: bool):
+        """
+        Sincroniza en los dos sentidos por un socket ya conectado. Un lado
+        llama con initiator=True y el otro con False (para no mandar los dos
+        a la vez). Cada lado manda su vector y recibe solo lo que le falta.
+        Retorna (success: bool, message: str) del lote recibido.
+        """
+        hello = json.dumps(self.change_log.vector()).encode('utf-8')
+        if initiator:
+            self._send(sock, hello)
+            peer_vector = json.loads(self._receive(sock))
+            self._send(sock, self.make_batch(peer_vector)[0])
+            return self.apply_batch(self._receive(sock))
+        peer_vector = json.loads(self._receive(sock))
+        self._send(sock, hello)
+        result = self.apply_batch(self._receive(sock))
+        self._send(sock, self.make_batch(peer_vector)[0])
+        return result
+
+
+def sync_databases(db_a, db_b):
+    """
+    Sincroniza dos bases locales por un par de sockets (la misma conversación
+    que entre dos sucursales por red). Retorna los resultados de cada lado.
+    """
+    import threading
+
+    sock_a, sock_b = socket.socketpair()
+    results = {}
+
+    def responder():
+        session = db_b.Session()
+        try:
+            results['b'] = SyncEngine(db_b, session).exchange(sock_b, initiator=False)
+        except Exception as e:
+            results['b'] = (False, f"Error: {e}")
+        finally:
+            session.close()
+            sock_b.close()
+
+    thread = threading.Thread(target=responder)
+    thread.start()
+    try:
+        results['a'] = SyncEngine(db_a).exchange(sock_a, initiator=True)
+    finally:
+        sock_a.close()
+        thread.join()
+    return results['a'], results['b']
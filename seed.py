@@ -8,6 +8,8 @@ import time
 from models.database import create_connection, initialize_db
 from models.payment import Payment
 from models.client import Client
+from models.money import format_cents
+from models.months import month_index, next_month
 
 # Nombres comunes para generar clientes
 FIRST_NAMES = [
@@ -78,12 +80,8 @@ def generate_client_name(existing_names):
 def generate_payment_date(year, month):
     """Genera una fecha aleatoria dentro del mes especificado"""
     # Determinar el último día del mes
-    if month == 12:
-        next_month = datetime.date(year + 1, 1, 1)
-    else:
-        next_month = datetime.date(year, month + 1, 1)
-
-    last_day = (next_month - datetime.timedelta(days=1)).day
+    following = datetime.date(*next_month(year, month), 1)
+    last_day = (following - datetime.timedelta(days=1)).day
 
     # Generar un día aleatorio (más probabilidad en los primeros 15 días)
     if random.random() < 0.7:
@@ -219,15 +217,12 @@ def generate_seed_data(num_clients=500):
 
         for _ in range(num_months):
             # No generar pagos futuros
-            if year > current_year or (year == current_year and month > current_month):
+            if month_index(year, month) > month_index(current_year, current_month):
                 break
 
             # Decidir si se salta este mes
             if random.random() < skip_probability:
-                month += 1
-                if month > 12:
-                    month = 1
-                    year += 1
+                year, month = next_month(year, month)
                 continue
 
             # Generar monto aleatorio
@@ -264,7 +259,7 @@ def generate_seed_data(num_clients=500):
             payment = Payment(
                 client_id=client.id,
                 date=payment_date.isoformat(),
-                amount=amount,
+                amount_cents=amount * 100,
                 month=month,
                 year=year,
                 description=description
@@ -278,10 +273,7 @@ def generate_seed_data(num_clients=500):
             consecutive_months += 1
 
             # Avanzar al siguiente mes
-            month += 1
-            if month > 12:
-                month = 1
-                year += 1
+            year, month = next_month(year, month)
 
         if payments_created > 0:
             clients_created += 1
@@ -319,8 +311,7 @@ def generate_seed_data(num_clients=500):
         latest_payment = session.query(Payment).filter_by(
             client_id=client.id
         ).order_by(
-            Payment.year.desc(),
-            Payment.month.desc(),
+            Payment.month_index.desc(),
             Payment.id.desc()
         ).first()
         
@@ -400,7 +391,7 @@ def show_statistics():
         newest = session.query(func.max(extract('year', Payment.date))).scalar()
 
         # Calcular total recaudado
-        total_amount = session.query(func.sum(Payment.amount)).scalar() or 0
+        total_amount = session.query(func.sum(Payment.amount_cents)).scalar() or 0
 
         # Promedio de pagos por cliente
         avg_payments = total_payments / total_clients if total_clients > 0 else 0
@@ -411,7 +402,7 @@ def show_statistics():
         print(f"Total de clientes: {total_clients}")
         print(f"Total de pagos: {total_payments}")
         print(f"Promedio de pagos por cliente: {avg_payments:.1f}")
-        print(f"Total recaudado: ${total_amount:,.2f}")
+        print(f"Total recaudado: {format_cents(total_amount)}")
         if oldest and newest:
             print(f"Rango de años: {int(oldest)} - {int(newest)}")
         print("="*70)